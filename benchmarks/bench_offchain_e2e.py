@@ -0,0 +1,304 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Benchmarks throughput of offchain payments between local VASPs end to end.
+
+Each VASP runs an `offchain.http_server.Server` for inbound requests, an `offchain.dispatcher.Dispatcher` for
+outbound commands, an `offchain.scheduler.Scheduler` for follow up actions and an in memory command store. VASPs
+find each other by the stand-in JSON-RPC server of `diem.testing`, which responds accounts, currencies and
+metadata, and accepts submitted transactions without executing them.
+
+Every payment runs the `S_INIT -> R_SEND -> READY` flow: the sender sends the initial command, the receiver
+evaluates the sender's KYC data and sends its KYC data and recipient signature, then the sender evaluates the
+receiver's KYC data, sends ready for settlement, and submits the travel rule transaction. Run from the
+repository root:
+
+```
+python benchmarks/bench_offchain_e2e.py --payments 500 --concurrency 50 --vasps 2
+```
+
+It reports payments and commands per second, payment latency, latency of each stage of processing inbound
+requests (see `offchain.tracing`), and errors.
+"""
+
+from diem import diem_types, identifier, jsonrpc, offchain, stdlib, utils, LocalAccount
+from diem.offchain.dispatcher import Dispatcher
+from diem.offchain.scheduler import Job, Scheduler
+from diem.offchain.store import InMemoryCommandStore
+from diem.offchain.tracing import LatencyExporter, percentile
+from diem.testing import JsonRpcServer
+from diem.serde_types import uint64
+import argparse, itertools, json, logging, threading, time, typing
+
+CURRENCY: str = "XUS"
+AMOUNT: int = 1_000_000_000_000
+CHAIN_ID: int = 2
+
+
+class Stats:
+    """Stats records payment latencies and errors of all VASPs"""
+
+    def __init__(self, concurrency: int) -> None:
+        self.payment_secs: typing.List[float] = []
+        self.errors: typing.Dict[str, int] = {}
+        self.inbound_requests = 0
+        self._started: typing.Dict[str, float] = {}
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+
+    def start(self, reference_id: str) -> None:
+        self._slots.acquire()
+        with self._lock:
+            self._started[reference_id] = time.perf_counter()
+
+    def complete(self, reference_id: str) -> None:
+        with self._lock:
+            self.payment_secs.append(time.perf_counter() - self._started.pop(reference_id))
+            self._done.notify_all()
+        self._slots.release()
+
+    def fail(self, reference_id: str, error: str) -> None:
+        with self._lock:
+            self.errors[error] = self.errors.get(error, 0) + 1
+            if self._started.pop(reference_id, None) is not None:
+                self._done.notify_all()
+                self._slots.release()
+
+    def error(self, error: str) -> None:
+        with self._lock:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def inbound(self) -> None:
+        with self._lock:
+            self.inbound_requests += 1
+
+    def wait(self, timeout: float) -> bool:
+        with self._lock:
+            return self._done.wait_for(lambda: not self._started, timeout)
+
+
+class Vasp:
+    """Vasp is a VASP offchain service of a parent VASP account and a child VASP account holding user funds"""
+
+    def __init__(self, name: str, ledger: JsonRpcServer, stats: Stats, tracer: LatencyExporter, workers: int) -> None:
+        self.name = name
+        self.stats = stats
+        self.parent = LocalAccount.generate()
+        self.child = LocalAccount.generate()
+        self.rpc = jsonrpc.Client(ledger.url)
+        self.client = offchain.Client(
+            self.parent.account_address, self.rpc, identifier.TDM, supported_currency_codes=[CURRENCY], tracer=tracer
+        )
+        self.store = InMemoryCommandStore()
+        self.server = offchain.http_server.Server(self.process_inbound_request, workers=workers)
+        self.dispatcher = Dispatcher(self.send_command, identifier.TDM, workers=workers)
+        self.scheduler = Scheduler(
+            {
+                offchain.Action.EVALUATE_KYC_DATA: self.evaluate_kyc_data,
+                offchain.Action.SUBMIT_TXN: self.submit_txn,
+            },
+            workers=workers,
+            max_attempts=1,
+        )
+        self._seq = itertools.count()
+        ledger.add_parent_vasp(f"http://localhost:{self.server.port}", self.parent)
+        ledger.add_child_vasp(self.parent, self.child)
+
+    def start(self) -> None:
+        self.server.start()
+        self.scheduler.start()
+
+    def shutdown(self) -> None:
+        self.dispatcher.shutdown()
+        self.scheduler.shutdown()
+        self.server.shutdown(timeout=1)
+
+    def account_id(self) -> str:
+        return self.child.account_identifier(identifier.gen_subaddress())
+
+    def kyc_data(self) -> offchain.KycDataObject:
+        return offchain.individual_kyc_data(
+            given_name=self.name,
+            surname="Smith",
+            address=offchain.AddressObject(city="San Francisco", country="US"),
+        )
+
+    def pay(self, receiver: "Vasp") -> None:
+        command = offchain.PaymentCommand.init(
+            self.account_id(), self.kyc_data(), receiver.account_id(), AMOUNT, CURRENCY
+        )
+        self.stats.start(command.reference_id())
+        self.save_outbound(command)
+
+    def process_inbound_request(
+        self, x_request_id: str, request_sender_address: str, request_bytes: bytes
+    ) -> typing.Tuple[int, bytes]:
+        self.stats.inbound()
+        try:
+            command = self.client.process_inbound_request(request_sender_address, request_bytes, x_request_id)
+            self.store.save(command)
+            action = command.follow_up_action()
+            if action:
+                self.scheduler.enqueue(action, command.reference_id())
+            resp = offchain.reply_request(command.id())
+            code = 200
+        except offchain.Error as e:
+            self.stats.error(f"inbound {e.obj.code}")
+            resp = offchain.reply_request(None, e.obj)
+            code = 400
+        return (code, offchain.jws.serialize(resp, self.parent.compliance_key.sign))
+
+    def send_command(self, command: offchain.Command) -> offchain.CommandResponseObject:
+        x_request_id = f"{self.name}-{next(self._seq)}"
+        return self.client.send_request(
+            command.my_address(),
+            command.opponent_address(),
+            offchain.jws.serialize(command.new_request(), self.parent.compliance_key.sign),
+            x_request_id=x_request_id,
+        )
+
+    def save_outbound(self, command: offchain.Command) -> None:
+        self.store.save(command)
+        self.dispatcher.submit(command).add_done_callback(lambda f: self._sent(command, f.exception()))
+
+    def evaluate_kyc_data(self, job: Job) -> None:
+        command = typing.cast(offchain.PaymentCommand, self.store.get(job.reference_id))
+        if command.is_receiver():
+            sig_msg = command.travel_rule_metadata_signature_message(identifier.TDM)
+            new_command = command.new_command(
+                recipient_signature=self.parent.compliance_key.sign(sig_msg).hex(),
+                kyc_data=self.kyc_data(),
+                status=offchain.Status.ready_for_settlement,
+            )
+        else:
+            new_command = command.new_command(status=offchain.Status.ready_for_settlement)
+        self.save_outbound(new_command)
+
+    def submit_txn(self, job: Job) -> None:
+        command = typing.cast(offchain.PaymentCommand, self.store.get(job.reference_id))
+        script = stdlib.encode_peer_to_peer_with_metadata_script(
+            currency=utils.currency_code(command.payment.action.currency),
+            payee=command.receiver_account_address(identifier.TDM),
+            amount=uint64(command.payment.action.amount),
+            metadata=command.travel_rule_metadata(identifier.TDM),
+            metadata_signature=bytes.fromhex(str(command.payment.recipient_signature)),
+        )
+        txn = self.child.sign(
+            diem_types.RawTransaction(  # pyre-ignore
+                sender=self.child.account_address,
+                sequence_number=uint64(0),
+                payload=diem_types.TransactionPayload__Script(value=script),
+                max_gas_amount=uint64(1_000_000),
+                gas_unit_price=uint64(0),
+                gas_currency_code=CURRENCY,
+                expiration_timestamp_secs=uint64(int(time.time()) + 30),
+                chain_id=diem_types.ChainId.from_int(CHAIN_ID),
+            )
+        )
+        self.rpc.submit(txn)
+        self.stats.complete(job.reference_id)
+
+    def _sent(self, command: offchain.Command, error: typing.Optional[BaseException]) -> None:
+        if error is not None:
+            self.stats.fail(command.reference_id(), f"send {type(error).__name__}")
+            return
+        action = command.follow_up_action()
+        if action:
+            self.scheduler.enqueue(action, command.reference_id())
+
+
+def run(payments: int, concurrency: int, vasps: int, workers: int, timeout: float) -> typing.Dict[str, typing.Any]:
+    tracer = LatencyExporter()
+    stats = Stats(concurrency)
+    with JsonRpcServer() as ledger:
+        services = [Vasp(f"vasp{i}", ledger, stats, tracer, workers) for i in range(vasps)]
+        for vasp in services:
+            vasp.start()
+        try:
+            start = time.perf_counter()
+            for i in range(payments):
+                services[i % vasps].pay(services[(i + 1) % vasps])
+            completed = stats.wait(timeout)
+            seconds = time.perf_counter() - start
+            dead_letters = sum(len(vasp.scheduler.dead_letters()) for vasp in services)
+            dispatchers = [vasp.dispatcher.metrics() for vasp in services]
+        finally:
+            for vasp in services:
+                vasp.shutdown()
+
+    payment_secs = sorted(stats.payment_secs)
+    stages = tracer.summary()
+    sent = sum(m.sent for m in dispatchers)
+    return {
+        "payments": payments,
+        "concurrency": concurrency,
+        "vasps": vasps,
+        "completed": len(payment_secs),
+        "timed_out": not completed,
+        "seconds": seconds,
+        "payments_per_sec": len(payment_secs) / seconds,
+        "commands_per_sec": sent / seconds,
+        "payment_latency_ms": {f"p{p}": percentile(payment_secs, p) * 1000 for p in (50, 90, 99)},
+        "commands": {
+            "sent": sent,
+            "failed": sum(m.failed for m in dispatchers),
+            "retries": sum(m.retries for m in dispatchers),
+            "inbound_requests": stats.inbound_requests,
+            "average_queue_ms": _average(dispatchers, "queue_seconds") * 1000,
+            "average_send_ms": _average(dispatchers, "send_seconds") * 1000,
+        },
+        "errors": dict(stats.errors, dead_letters=dead_letters) if dead_letters else dict(stats.errors),
+        "error_rate": (payments - len(payment_secs)) / payments,
+        "ledger_calls": dict(ledger.calls),
+        "inbound_stages_ms": {
+            name: dict(
+                count=s.count,
+                errors=s.errors,
+                mean=s.mean_secs * 1000,
+                **{f"p{p:g}": v * 1000 for p, v in s.percentiles.items()},
+            )
+            for name, s in stages.items()
+        },
+        "inbound_stages_table": tracer.format_summary(),
+    }
+
+
+def _average(metrics: typing.List[typing.Any], field: str) -> float:
+    completed = sum(m.completed() for m in metrics)
+    return sum(getattr(m, field) for m in metrics) / completed if completed else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payments", type=int, default=200, help="number of payments")
+    parser.add_argument("--concurrency", type=int, default=20, help="max number of payments in progress")
+    parser.add_argument("--vasps", type=int, default=2, help="number of VASPs, payments are sent round robin")
+    parser.add_argument("--workers", type=int, default=8, help="number of workers of each VASP component")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds waiting for payments completed")
+    parser.add_argument("--output", help="JSON file path for saving results")
+    args = parser.parse_args()
+    if args.vasps < 2:
+        parser.error("--vasps should be at least 2")
+    # errors are counted in the report
+    logging.getLogger("diem.offchain").setLevel(logging.CRITICAL)
+
+    result = run(args.payments, args.concurrency, args.vasps, args.workers, args.timeout)
+    table = result.pop("inbound_stages_table")
+    print(f"payments:           {result['completed']}/{result['payments']} in {result['seconds']:.2f}s")
+    print(f"payments/s:         {result['payments_per_sec']:,.1f}")
+    print(f"commands/s:         {result['commands_per_sec']:,.1f}")
+    latency = ", ".join(f"{k} {v:.1f}ms" for k, v in result["payment_latency_ms"].items())
+    print(f"payment latency:    {latency}")
+    print(f"error rate:         {result['error_rate']:.2%} {result['errors'] or ''}")
+    print(f"commands:           {result['commands']}")
+    print(f"ledger calls:       {result['ledger_calls']}")
+    print(f"\ninbound request stages (ms):\n{table}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Benchmarks JWS serialization and deserialization of an offchain payment command request.
+
+Run from the repository root:
+
+```
+python benchmarks/bench_offchain_jws.py --number 10000
+```
+"""
+
+from bench_offchain_types import bench, sample_request
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from diem import offchain, utils, LocalAccount
+import argparse
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=10_000, help="number of iterations of each benchmark")
+    args = parser.parse_args()
+
+    account = LocalAccount.generate()
+    public_key = account.compliance_key.public_key()
+    public_key_hex = account.compliance_public_key_bytes.hex()
+    request = sample_request()
+    msg = offchain.jws.serialize(request, account.compliance_key.sign)
+    assert offchain.jws.deserialize(msg, offchain.CommandRequestObject, public_key.verify) == request
+
+    bench("jws.deserialize_bytes", args.number, lambda: offchain.jws.deserialize_bytes(msg))
+    bench("jws.deserialize_string", args.number, lambda: offchain.jws.deserialize_string(msg))
+    bench(
+        "jws.deserialize(CommandRequestObject)",
+        args.number,
+        lambda: offchain.jws.deserialize(msg, offchain.CommandRequestObject, public_key.verify),
+    )
+    bench(
+        "jws.serialize(CommandRequestObject)",
+        args.number,
+        lambda: offchain.jws.serialize(request, account.compliance_key.sign),
+    )
+    bench(
+        "Ed25519PublicKey.from_public_bytes",
+        args.number,
+        lambda: Ed25519PublicKey.from_public_bytes(bytes.fromhex(public_key_hex)),
+    )
+    bench("utils.ed25519_public_key_from_hex", args.number, lambda: utils.ed25519_public_key_from_hex(public_key_hex))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Benchmarks memory of payment commands decoded from offchain requests with full KYC data.
+
+Run from the repository root:
+
+```
+python benchmarks/bench_offchain_memory.py --number 100000
+```
+"""
+
+from bench_offchain_types import sample_request
+from diem import identifier, offchain, LocalAccount
+import argparse, dataclasses, gc, random, time, tracemalloc, typing, uuid
+
+
+def requests_json(number: int, users: int) -> typing.List[str]:
+    """returns requests of payments between a pool of users of two VASPs"""
+
+    request = sample_request()
+    payment = typing.cast(offchain.PaymentCommandObject, request.command).payment
+    senders = [LocalAccount.generate().account_identifier(identifier.gen_subaddress()) for _ in range(users)]
+    receivers = [LocalAccount.generate().account_identifier(identifier.gen_subaddress()) for _ in range(users)]
+    rand = random.Random(0)
+    ret = []
+    for i in range(number):
+        new_payment = dataclasses.replace(
+            payment,
+            reference_id=str(uuid.uuid4()),
+            sender=dataclasses.replace(payment.sender, address=rand.choice(senders)),
+            receiver=dataclasses.replace(payment.receiver, address=rand.choice(receivers)),
+            action=dataclasses.replace(payment.action, amount=rand.randrange(1, 1_000_000_000_000)),
+        )
+        ret.append(offchain.to_json(offchain.new_payment_request(new_payment)))
+    return ret
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100_000, help="number of payment commands")
+    parser.add_argument("--users", type=int, default=1_000, help="number of users of each VASP")
+    args = parser.parse_args()
+
+    data = requests_json(args.number, args.users)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    commands = []
+    for request_json in data:
+        request = offchain.from_json(request_json, offchain.CommandRequestObject)
+        payment = typing.cast(offchain.PaymentCommandObject, request.command).payment
+        commands.append(
+            offchain.PaymentCommand(my_actor_address=payment.receiver.address, payment=payment, inbound=True)
+        )
+    seconds = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"decoded {len(commands):,} payment commands in {seconds:.2f}s")
+    print(f"memory: {current / (1 << 20):,.1f} MiB, {current / len(commands):,.0f} bytes per command")
+    print(f"peak memory: {peak / (1 << 20):,.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
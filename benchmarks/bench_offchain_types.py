@@ -0,0 +1,102 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Benchmarks encoding and decoding offchain payment command requests with full KYC data.
+
+Run from the repository root:
+
+```
+python benchmarks/bench_offchain_types.py --number 20000
+```
+"""
+
+from diem import offchain, LocalAccount
+import argparse, dataclasses, json, time, typing
+
+
+def full_kyc_data(given_name: str) -> offchain.KycDataObject:
+    return offchain.individual_kyc_data(
+        given_name=given_name,
+        surname="Smith",
+        address=offchain.AddressObject(
+            city="San Francisco",
+            country="US",
+            line1="1 Market Street",
+            line2="Suite 1000",
+            postal_code="94105",
+            state="CA",
+        ),
+        dob="1990-01-01",
+        place_of_birth=offchain.AddressObject(city="Sunnyvale", country="US", state="CA"),
+        national_id=offchain.NationalIdObject(id_value="123-45-6789", country="US", type="SSN"),
+    )
+
+
+def sample_request() -> offchain.CommandRequestObject:
+    sender = LocalAccount.generate()
+    receiver = LocalAccount.generate()
+    payment = offchain.new_payment_object(
+        sender.account_identifier(bytes.fromhex("1122334455667788")),
+        full_kyc_data("Alice"),
+        receiver.account_identifier(bytes.fromhex("8877665544332211")),
+        1_000_000_000,
+        "XUS",
+        description="payment with full kyc data",
+    )
+    payment = offchain.PaymentObject(
+        reference_id=payment.reference_id,
+        sender=offchain.replace_payment_actor(payment.sender, metadata=["invoice-1234"]),
+        receiver=offchain.replace_payment_actor(
+            payment.receiver, status=offchain.Status.ready_for_settlement, kyc_data=full_kyc_data("Bob")
+        ),
+        action=payment.action,
+        recipient_signature="ab" * 64,
+        description=payment.description,
+    )
+    return offchain.new_payment_request(payment)
+
+
+def bench(name: str, number: int, fn: typing.Callable[[], typing.Any]) -> float:  # pyre-ignore
+    fn()
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    seconds = time.perf_counter() - start
+    print(f"{name:<40} {number / seconds:>12,.0f} ops/s {seconds / number * 1e6:>10.2f} us/op")
+    return seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=10_000, help="number of iterations of each benchmark")
+    args = parser.parse_args()
+
+    request = sample_request()
+    request_json = offchain.to_json(request)
+    request_dict = json.loads(request_json)
+    assert offchain.from_dict(request_dict, None) == request
+
+    bench("from_dict(CommandRequestObject)", args.number, lambda: offchain.from_dict(request_dict, None))
+    bench("from_json(CommandRequestObject)", args.number, lambda: offchain.from_json(request_json))
+    bench("to_dict(CommandRequestObject)", args.number, lambda: offchain.to_dict(request))
+    bench("to_json(CommandRequestObject)", args.number, lambda: offchain.to_json(request))
+
+    payment = typing.cast(offchain.PaymentCommandObject, request.command).payment
+    new_payment = dataclasses.replace(
+        payment, sender=offchain.replace_payment_actor(payment.sender, status=offchain.Status.ready_for_settlement)
+    )
+    decoded_payment = offchain.from_dict(offchain.to_dict(payment), offchain.PaymentObject)
+    bench(
+        "validate_write_once_fields(replaced)",
+        args.number,
+        lambda: offchain.validate_write_once_fields("payment", new_payment, payment),
+    )
+    bench(
+        "validate_write_once_fields(decoded)",
+        args.number,
+        lambda: offchain.validate_write_once_fields("payment", decoded_payment, payment),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Benchmarks SDK hot paths, saves results as JSON and compares them with a baseline.
+
+All benchmarks run in process without network. Run from the repository root:
+
+```
+# save results as the baseline
+python benchmarks/bench_sdk.py --output benchmarks/baseline.json
+
+# compare with the baseline after changes, exits with 1 if any benchmark is slower than the threshold
+python benchmarks/bench_sdk.py --output benchmarks/results.json --baseline benchmarks/baseline.json
+
+# run benchmarks with names containing "jws"
+python benchmarks/bench_sdk.py -k jws
+```
+
+The result of a benchmark is the best of `--repeat` runs of `--number` iterations, which is less noisy than the
+mean for comparing runs on the same machine.
+"""
+
+from bench_offchain_types import sample_request
+from diem.testing import Factory
+from diem import diem_types, identifier, jsonrpc, offchain, stdlib, txnmetadata, utils, LocalAccount
+from diem.serde_types import uint64
+import argparse, dataclasses, json, platform, sys, time, typing
+
+DEFAULT_NUMBER: int = 2_000
+DEFAULT_REPEAT: int = 5
+DEFAULT_THRESHOLD: float = 0.1
+
+Benchmark = typing.Callable[[], typing.Any]
+
+# benchmark name => function creating the benchmark function
+BENCHMARKS: typing.Dict[str, typing.Callable[[], Benchmark]] = {}
+
+
+def benchmark(name: str) -> typing.Callable[[typing.Callable[[], Benchmark]], typing.Callable[[], Benchmark]]:
+    """registers a function creating the benchmark function, setup runs once before the benchmark"""
+
+    def register(setup: typing.Callable[[], Benchmark]) -> typing.Callable[[], Benchmark]:
+        if name in BENCHMARKS:
+            raise ValueError(f"duplicated benchmark name: {name}")
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def sample_signed_txn() -> diem_types.SignedTransaction:
+    sender = LocalAccount.generate()
+    receiver = LocalAccount.generate()
+    metadata, sig_msg = txnmetadata.travel_rule("ref_id", sender.account_address, 1_000_000)
+    script = stdlib.encode_peer_to_peer_with_metadata_script(
+        currency=utils.currency_code("XUS"),
+        payee=receiver.account_address,
+        amount=uint64(1_000_000),
+        metadata=metadata,
+        metadata_signature=receiver.compliance_key.sign(sig_msg),
+    )
+    return sender.sign(Factory().new_raw_transaction(sender, 42, script))
+
+
+@benchmark("bcs.serialize(SignedTransaction)")
+def bcs_serialize_signed_txn() -> Benchmark:
+    txn = sample_signed_txn()
+    return txn.bcs_serialize
+
+
+@benchmark("bcs.deserialize(SignedTransaction)")
+def bcs_deserialize_signed_txn() -> Benchmark:
+    txn_bytes = sample_signed_txn().bcs_serialize()
+    return lambda: diem_types.SignedTransaction.bcs_deserialize(txn_bytes)
+
+
+@benchmark("bcs.serialize(Metadata)")
+def bcs_serialize_metadata() -> Benchmark:
+    metadata = diem_types.Metadata.bcs_deserialize(sample_travel_rule_metadata())
+    return metadata.bcs_serialize
+
+
+@benchmark("bcs.deserialize(Metadata)")
+def bcs_deserialize_metadata() -> Benchmark:
+    metadata_bytes = sample_travel_rule_metadata()
+    return lambda: diem_types.Metadata.bcs_deserialize(metadata_bytes)
+
+
+@benchmark("bcs.serialize(Script)")
+def bcs_serialize_script() -> Benchmark:
+    script = sample_script()
+    return script.bcs_serialize
+
+
+@benchmark("bcs.deserialize(Script)")
+def bcs_deserialize_script() -> Benchmark:
+    script_bytes = sample_script().bcs_serialize()
+    return lambda: diem_types.Script.bcs_deserialize(script_bytes)
+
+
+@benchmark("utils.transaction_hash")
+def transaction_hash() -> Benchmark:
+    txn = sample_signed_txn()
+    return lambda: utils.transaction_hash(txn)
+
+
+@benchmark("LocalAccount.sign")
+def local_account_sign() -> Benchmark:
+    txn = sample_signed_txn()
+    account = LocalAccount.generate()
+    return lambda: account.sign(txn.raw_txn)
+
+
+@benchmark("identifier.encode_account")
+def encode_account() -> Benchmark:
+    address = LocalAccount.generate().account_address
+    subaddress = bytes.fromhex("1122334455667788")
+    return lambda: identifier.encode_account(address, subaddress, identifier.TDM)
+
+
+@benchmark("identifier.decode_account")
+def decode_account() -> Benchmark:
+    account_id = LocalAccount.generate().account_identifier(bytes.fromhex("1122334455667788"))
+    return lambda: identifier.decode_account(account_id, identifier.TDM)
+
+
+@benchmark("identifier.decode_intent")
+def decode_intent() -> Benchmark:
+    account_id = LocalAccount.generate().account_identifier(bytes.fromhex("1122334455667788"))
+    intent = identifier.encode_intent(account_id, "XUS", 1_000_000)
+    return lambda: identifier.decode_intent(intent, identifier.TDM)
+
+
+@benchmark("jws.serialize(CommandRequestObject)")
+def jws_serialize() -> Benchmark:
+    account = LocalAccount.generate()
+    request = sample_request()
+    return lambda: offchain.jws.serialize(request, account.compliance_key.sign)
+
+
+@benchmark("jws.deserialize(CommandRequestObject)")
+def jws_deserialize() -> Benchmark:
+    account = LocalAccount.generate()
+    msg = offchain.jws.serialize(sample_request(), account.compliance_key.sign)
+    verify = account.compliance_key.public_key().verify
+    return lambda: offchain.jws.deserialize(msg, offchain.CommandRequestObject, verify)
+
+
+@benchmark("offchain.to_json(CommandRequestObject)")
+def to_json() -> Benchmark:
+    request = sample_request()
+    return lambda: offchain.to_json(request)
+
+
+@benchmark("offchain.from_json(CommandRequestObject)")
+def from_json() -> Benchmark:
+    request_json = offchain.to_json(sample_request())
+    return lambda: offchain.from_json(request_json, offchain.CommandRequestObject)
+
+
+@benchmark("PaymentCommand.state")
+def payment_command_state() -> Benchmark:
+    payment = sample_payment()
+    # the matched state is cached on the command object, hence a new command is created for each call
+    return lambda: offchain.PaymentCommand(
+        my_actor_address=payment.sender.address, payment=payment, inbound=True
+    ).state()
+
+
+@benchmark("PaymentCommand.validate")
+def payment_command_validate() -> Benchmark:
+    payment = sample_payment()
+    initial = dataclasses.replace(
+        payment,
+        receiver=offchain.PaymentActorObject(
+            address=payment.receiver.address, status=offchain.StatusObject(status=offchain.Status.none)
+        ),
+        recipient_signature=None,
+    )
+    prior = offchain.PaymentCommand(my_actor_address=payment.sender.address, payment=initial, inbound=False)
+    # validates the receiver's update of the initial payment on the sender side
+    return lambda: offchain.PaymentCommand(
+        my_actor_address=payment.sender.address, payment=payment, inbound=True
+    ).validate(prior)
+
+
+@benchmark("txnmetadata.travel_rule")
+def travel_rule() -> Benchmark:
+    address = LocalAccount.generate().account_address
+    return lambda: txnmetadata.travel_rule("ref_id", address, 1_000_000)
+
+
+@benchmark("columnar.to_columns(100 Transaction)")
+def columnar_to_columns() -> Benchmark:
+    sender = LocalAccount.generate().account_address
+    txns = []
+    for version in range(100):
+        txn = jsonrpc.Transaction(version=version, gas_used=1000)
+        txn.transaction.type = "user"
+        txn.transaction.sender = sender.to_hex()
+        txn.transaction.sequence_number = version
+        script = txn.transaction.script
+        script.type = "peer_to_peer_with_metadata"
+        script.currency = "XUS"
+        script.amount = 1_000_000
+        script.receiver = LocalAccount.generate().account_address.to_hex()
+        script.metadata = txnmetadata.travel_rule(f"ref_id_{version}", sender, 1_000_000)[0].hex()
+        txns.append(txn)
+    return lambda: jsonrpc.columnar.to_columns(txns)
+
+
+def sample_travel_rule_metadata() -> bytes:
+    metadata, _ = txnmetadata.travel_rule("ref_id", LocalAccount.generate().account_address, 1_000_000)
+    return metadata
+
+
+def sample_script() -> diem_types.Script:
+    return typing.cast(diem_types.TransactionPayload__Script, sample_signed_txn().raw_txn.payload).value
+
+
+def sample_payment() -> offchain.PaymentObject:
+    """returns payment that the receiver is ready for settlement"""
+
+    return typing.cast(offchain.PaymentCommandObject, sample_request().command).payment
+
+
+def run(fn: Benchmark, number: int, repeat: int) -> typing.Dict[str, float]:
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    best = min(times)
+    return {
+        "us_per_op": best * 1e6,
+        "mean_us_per_op": sum(times) / len(times) * 1e6,
+        "ops_per_sec": 1 / best,
+    }
+
+
+def run_all(
+    number: int, repeat: int, keyword: typing.Optional[str] = None
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if keyword and keyword.lower() not in name.lower():
+            continue
+        results[name] = run(setup(), number, repeat)
+        r = results[name]
+        print(f"{name:<45} {r['ops_per_sec']:>12,.0f} ops/s {r['us_per_op']:>10.2f} us/op", flush=True)
+    return results
+
+
+def compare(
+    baseline: typing.Dict[str, typing.Any], results: typing.Dict[str, typing.Any], threshold: float
+) -> typing.List[str]:
+    """prints changes of the results compared with the baseline, returns names of regressed benchmarks
+
+    A benchmark is regressed if its time per op is more than `threshold` (ratio) slower than the baseline.
+    """
+
+    regressions = []
+    print(f"\n{'benchmark':<45} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for name, r in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<45} {'-':>12} {r['us_per_op']:>12.2f} {'new':>8}")
+            continue
+        change = r["us_per_op"] / base["us_per_op"] - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        mark = " !" if regressed else ""
+        print(f"{name:<45} {base['us_per_op']:>12.2f} {r['us_per_op']:>12.2f} {change:>+8.1%}{mark}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=DEFAULT_NUMBER, help="number of iterations of each run")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="number of runs of each benchmark")
+    parser.add_argument("-k", "--keyword", help="only run benchmarks with names containing the keyword")
+    parser.add_argument("--output", help="JSON file path for saving results")
+    parser.add_argument("--baseline", help="JSON file path of baseline results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="ratio of slowdown compared with baseline that is considered as regression",
+    )
+    parser.add_argument("--list", action="store_true", help="list benchmark names")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+
+    results = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "number": args.number,
+        "repeat": args.repeat,
+        "results": run_all(args.number, args.repeat, args.keyword),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {regressions}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -140,7 +140,9 @@ class WalletApp:
                     offchain.ErrorCode.missing_http_header, "missing %s" % offchain.X_REQUEST_ID
                 )
 
-            inbound_command = self.offchain_client.process_inbound_request(request_sender_address, request_bytes)
+            inbound_command = self.offchain_client.process_inbound_request(
+                request_sender_address, request_bytes, x_request_id=x_request_id
+            )
             cid = inbound_command.id()
             self.save_command(inbound_command)
             resp = offchain.reply_request(cid)
@@ -24,6 +24,7 @@ setup(
     include_package_data=True,  # see MANIFEST.in
     zip_safe=True,
     install_requires=["requests>=2.20.0", "cryptography>=2.8", "numpy>=1.18", "protobuf>=3.12.4"],
+    extras_require={"async": ["aiohttp>=3.6"]},
     setup_requires=[
         # Setuptools 18.0 properly handles Cython extensions.
         "setuptools>=18.0",
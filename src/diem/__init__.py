@@ -5,4 +5,4 @@
 
 from .utils import InvalidAccountAddressError, InvalidSubAddressError
 from .auth_key import AuthKey
-from .local_account import LocalAccount
+from .local_account import LocalAccount, LocalAccountPool
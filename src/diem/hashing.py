@@ -0,0 +1,99 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides Diem crypto hashing functions for creating signing messages and transaction hashes.
+
+A Diem crypto hash of a type is `sha3_256(sha3_256(b"DIEM::" + <type name>) + <bcs bytes>)`.
+The seed of each type name is computed once, and the sha3 state fed with the seed is cached and
+copied for every message, so hashing a message only costs hashing the message bytes.
+
+```python
+
+>>> from diem import hashing
+>>> txn_hash = hashing.transaction_hash_from_bytes(signed_txn.bcs_serialize())
+
+```
+"""
+
+import functools, hashlib, typing
+
+from . import diem_types
+
+DIEM_HASH_PREFIX: bytes = b"DIEM::"
+RAW_TRANSACTION: bytes = b"RawTransaction"
+TRANSACTION: bytes = b"Transaction"
+
+# BCS variant index of `diem_types.Transaction__UserTransaction`, it is less than 0x80,
+# hence the uleb128 encoding is the single byte.
+_USER_TRANSACTION_PREFIX: bytes = bytes([diem_types.Transaction__UserTransaction.INDEX])
+
+
+@functools.lru_cache(maxsize=None)
+def hash_seed(typ: bytes) -> bytes:
+    """returns `sha3_256(b"DIEM::" + typ)`, the result is cached by the given type name"""
+
+    return hashlib.sha3_256(DIEM_HASH_PREFIX + typ).digest()
+
+
+@functools.lru_cache(maxsize=None)
+def _seeded_hasher(typ: bytes) -> typing.Any:  # pyre-ignore
+    hasher = hashlib.sha3_256()
+    hasher.update(hash_seed(typ))
+    return hasher
+
+
+def new_hasher(typ: bytes) -> typing.Any:  # pyre-ignore
+    """returns a new `hashlib.sha3_256` object that is already fed with the hash seed of the given type name"""
+
+    return _seeded_hasher(typ).copy()
+
+
+def raw_transaction_signing_msg(raw_txn_bytes: bytes) -> bytes:
+    """create signing message from given BCS serialized `diem_types.RawTransaction` bytes"""
+
+    return hash_seed(RAW_TRANSACTION) + raw_txn_bytes
+
+
+def transaction_hash(txn: diem_types.SignedTransaction) -> str:
+    """create transaction hash from given `diem_types.SignedTransaction`
+
+    This hash string matches jsonrpc.Transaction#hash returned from Diem JSON-RPC API.
+    """
+
+    return transaction_hash_from_bytes(txn.bcs_serialize())
+
+
+def transaction_hash_from_bytes(signed_txn_bytes: bytes) -> str:
+    """create transaction hash from BCS serialized `diem_types.SignedTransaction` bytes
+
+    The signed transaction bytes are hashed as `diem_types.Transaction__UserTransaction` without
+    deserializing and re-serializing the transaction.
+    """
+
+    hasher = new_hasher(TRANSACTION)
+    hasher.update(_USER_TRANSACTION_PREFIX)
+    hasher.update(signed_txn_bytes)
+    return hasher.hexdigest()
+
+
+def transaction_hashes(
+    txns: typing.Iterable[typing.Union[diem_types.SignedTransaction, bytes, str]],
+) -> typing.List[str]:
+    """create transaction hashes for given signed transactions, results are in the same order
+
+    A signed transaction can be given as `diem_types.SignedTransaction`, BCS serialized bytes or
+    hex-encoded BCS serialized bytes (e.g. the value for `jsonrpc.Client#submit`).
+    """
+
+    seeded = _seeded_hasher(TRANSACTION).copy()
+    seeded.update(_USER_TRANSACTION_PREFIX)
+    ret = []
+    for txn in txns:
+        if isinstance(txn, diem_types.SignedTransaction):
+            txn = txn.bcs_serialize()
+        elif isinstance(txn, str):
+            txn = bytes.fromhex(txn)
+        hasher = seeded.copy()
+        hasher.update(txn)
+        ret.append(hasher.hexdigest())
+    return ret
@@ -37,6 +37,9 @@ from .client import (
     WaitForTransactionTimeout,
     AccountNotFoundError,
 )
+from .metrics import ClientHooks, MetricsHooks, Registry
+from .ledger_store import LedgerStore
+from . import metrics, ledger_store, columnar
 from .jsonrpc_pb2 import (
     Amount,
     Metadata,
@@ -10,12 +10,14 @@ import requests
 import threading
 import typing
 import random
+import itertools
 from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
 
 from .. import diem_types, utils
 from . import jsonrpc_pb2 as rpc
 from . import constants
+from .metrics import ClientHooks
 
 
 DEFAULT_CONNECT_TIMEOUT_SECS: float = 5.0
@@ -147,28 +149,27 @@ class RequestWithBackups(RequestStrategy):
     def send_request(
         self, client: "Client", request: typing.Dict[str, typing.Any], ignore_stale_response: bool
     ) -> typing.Dict[str, typing.Any]:
+        backup_url = random.choice(self._backups)
         primary = self._executor.submit(client._send_http_request, client._url, request, ignore_stale_response)
-        backup = self._executor.submit(
-            client._send_http_request, random.choice(self._backups), request, ignore_stale_response
-        )
+        backup = self._executor.submit(client._send_http_request, backup_url, request, ignore_stale_response)
 
         if self._fallback:
-            return self._fallback_to_backup(primary, backup)
-        return self._first_success(primary, backup)
-
-    def _fallback_to_backup(self, primary: Future, backup: Future) -> typing.Dict[str, typing.Any]:
-        try:
-            return primary.result()
-        except Exception:
-            return backup.result()
-
-    def _first_success(self, primary: Future, backup: Future) -> typing.Dict[str, typing.Any]:
+            selected = self._fallback_to_backup(primary, backup)
+        else:
+            selected = self._first_success(primary, backup)
+        ret = selected.result()
+        if client._hooks is not None:
+            is_primary = selected is primary
+            client._hooks.response_selected(request["method"], client._url if is_primary else backup_url, is_primary)
+        return ret
+
+    def _fallback_to_backup(self, primary: Future, backup: Future) -> Future:
+        return backup if primary.exception() else primary
+
+    def _first_success(self, primary: Future, backup: Future) -> Future:
         futures = as_completed({primary, backup})
         first = next(futures)
-        try:
-            return first.result()
-        except Exception:
-            return next(futures).result()
+        return next(futures) if first.exception() else first
 
 
 class Client:
@@ -184,7 +185,10 @@ class Client:
         timeout: typing.Optional[typing.Tuple[float, float]] = None,
         retry: typing.Optional[Retry] = None,
         rs: typing.Optional[RequestStrategy] = None,
+        hooks: typing.Optional[ClientHooks] = None,
     ) -> None:
+        """`hooks` receives request events for instrumentation, see `jsonrpc.metrics` for details"""
+
         self._url: str = server_url
         self._session: requests.Session = session or requests.Session()
         self._timeout: typing.Tuple[float, float] = timeout or (DEFAULT_CONNECT_TIMEOUT_SECS, DEFAULT_TIMEOUT_SECS)
@@ -192,6 +196,7 @@ class Client:
         self._lock = threading.Lock()
         self._retry: Retry = retry or Retry(DEFAULT_MAX_RETRIES, DEFAULT_RETRY_DELAY, StaleResponseError)
         self._rs: RequestStrategy = rs or RequestStrategy()
+        self._hooks: typing.Optional[ClientHooks] = hooks
 
     # high level functions
 
@@ -229,7 +234,7 @@ class Client:
         account = self.must_get_account(account_address)
 
         if account.role.compliance_key and account.role.base_url:
-            key = Ed25519PublicKey.from_public_bytes(bytes.fromhex(account.role.compliance_key))
+            key = utils.ed25519_public_key_from_hex(account.role.compliance_key)
             return (account.role.base_url, key)
         if account.role.parent_vasp_address:
             return self.get_base_url_and_compliance_key(account.role.parent_vasp_address)
@@ -508,9 +513,21 @@ class Client:
         Should only be called by get methods.
         """
 
-        return self._retry.execute(
-            lambda: self.execute_without_retry(method, params, result_parser, ignore_stale_response)
-        )
+        hooks = self._hooks
+        if hooks is None:
+            return self._retry.execute(
+                lambda: self.execute_without_retry(method, params, result_parser, ignore_stale_response)
+            )
+
+        attempts = itertools.count(1)
+
+        def execute():  # pyre-ignore
+            attempt = next(attempts)
+            if attempt > 1:
+                hooks.retry(method, attempt)
+            return self.execute_without_retry(method, params, result_parser, ignore_stale_response)
+
+        return self._retry.execute(execute)
 
     # pyre-ignore
     def execute_without_retry(
@@ -533,6 +550,29 @@ class Client:
         Raises NetworkError if send http request failed, or received server response status is not 200.
         """
 
+        hooks = self._hooks
+        if hooks is None:
+            return self._execute_without_retry(method, params, result_parser, ignore_stale_response)
+
+        hooks.request_start(method)
+        start = time.perf_counter()
+        error = None
+        try:
+            return self._execute_without_retry(method, params, result_parser, ignore_stale_response)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            hooks.request_end(method, time.perf_counter() - start, error)
+
+    # pyre-ignore
+    def _execute_without_retry(
+        self,
+        method: str,
+        params: typing.List[typing.Any],  # pyre-ignore
+        result_parser: typing.Optional[typing.Callable] = None,  # pyre-ignore
+        ignore_stale_response: typing.Optional[bool] = None,
+    ):
         request = {
             "jsonrpc": "2.0",
             "id": 1,
@@ -547,7 +587,13 @@ class Client:
 
             if "result" in json:
                 if result_parser:
-                    return result_parser(json["result"])
+                    if self._hooks is None:
+                        return result_parser(json["result"])
+                    start = time.perf_counter()
+                    try:
+                        return result_parser(json["result"])
+                    finally:
+                        self._hooks.parse(method, time.perf_counter() - start)
                 return
 
             raise InvalidServerResponse(f"No error or result in response: {json}")
@@ -562,8 +608,13 @@ class Client:
         request: typing.Dict[str, typing.Any],
         ignore_stale_response: bool,
     ) -> typing.Dict[str, typing.Any]:
+        hooks = self._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
         response = self._session.post(url, json=request, timeout=self._timeout)
         response.raise_for_status()
+        if hooks is not None:
+            bytes_sent = len(response.request.body or b"") if response.request else 0
+            hooks.http_request(request["method"], url, time.perf_counter() - start, bytes_sent, len(response.content))
         try:
             json = response.json()
         except ValueError as e:
@@ -577,6 +628,8 @@ class Client:
                 json.get("diem_ledger_timestampusec"),
             )
         except StaleResponseError as e:
+            if hooks is not None:
+                hooks.stale_response(request["method"], url, ignore_stale_response)
             if not ignore_stale_response:
                 raise e
 
@@ -0,0 +1,221 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides columnar export of transactions for analytics.
+
+`to_columns` converts a batch of `jsonrpc.Transaction` into NumPy arrays, one array per column. Only reading the
+protobuf fields is done per transaction; hex addresses and metadata bytes of the batch are decoded at once, and
+the metadata type and travel rule reference id are sliced out of the metadata bytes by array operations.
+
+`export` writes batches of a transaction stream into a directory, one `.npy` file per column per batch, which can
+be loaded memory-mapped for fast scans of the columns needed:
+
+```python
+
+>>> from diem import jsonrpc
+>>> from diem.jsonrpc import columnar
+>>> client = jsonrpc.Client(url)
+>>> columnar.export(columnar.transactions(client, start_version=0), "txns")
+>>> columns = columnar.read("txns", ["sender", "currency", "amount"])
+>>> columns["amount"][columns["currency"] == b"XUS"].sum()
+
+```
+
+Columns:
+
+- `version` (uint64): transaction version.
+- `sender` (V16): sender account address bytes, zeros for non user transactions.
+- `sequence_number` (uint64): sender account sequence number.
+- `gas_used` (uint64)
+- `currency` (S): currency code of the peer to peer script, empty for other transactions.
+- `amount` (uint64): amount of the peer to peer script.
+- `receiver` (V16): receiver account address bytes of the peer to peer script.
+- `metadata_type` (int8): `diem_types.Metadata` variant index of the peer to peer script metadata, -1 if there
+  is no metadata.
+- `reference_id` (S): off-chain reference id of travel rule metadata, empty for other metadata.
+"""
+
+from .client import Client
+from . import jsonrpc_pb2 as rpc
+from .. import diem_types
+
+import itertools, os, typing, uuid
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE: int = 100_000
+DEFAULT_PAGE_SIZE: int = 1000
+
+COLUMNS: typing.Tuple[str, ...] = (
+    "version",
+    "sender",
+    "sequence_number",
+    "gas_used",
+    "currency",
+    "amount",
+    "receiver",
+    "metadata_type",
+    "reference_id",
+)
+
+ADDRESS_DTYPE: np.dtype = np.dtype("V16")
+NO_METADATA: int = -1
+
+_ZERO_ADDRESS_HEX: str = "00" * 16
+_TRAVEL_RULE_METADATA: int = diem_types.Metadata.VARIANTS.index(diem_types.Metadata__TravelRuleMetadata)
+
+Columns = typing.Dict[str, np.ndarray]
+
+
+def to_columns(txns: typing.Sequence[rpc.Transaction]) -> Columns:
+    """convert transactions into columns of NumPy arrays, see module doc for the columns"""
+
+    n = len(txns)
+    data = [t.transaction for t in txns]
+    scripts = [d.script for d in data]
+    return {
+        "version": np.fromiter((t.version for t in txns), dtype=np.uint64, count=n),
+        "sender": _addresses([d.sender for d in data]),
+        "sequence_number": np.fromiter((d.sequence_number for d in data), dtype=np.uint64, count=n),
+        "gas_used": np.fromiter((t.gas_used for t in txns), dtype=np.uint64, count=n),
+        "currency": np.array([s.currency.encode() for s in scripts], dtype=np.bytes_),
+        "amount": np.fromiter((s.amount for s in scripts), dtype=np.uint64, count=n),
+        "receiver": _addresses([s.receiver for s in scripts]),
+        **_metadata_columns([s.metadata for s in scripts]),
+    }
+
+
+def transactions(
+    client: Client, start_version: int, end_version: typing.Optional[int] = None, page_size: int = DEFAULT_PAGE_SIZE
+) -> typing.Iterator[rpc.Transaction]:
+    """iterate transactions from `start_version` until `end_version` (exclusive) or the latest version
+
+    The `client` can be a `jsonrpc.Client` or a `jsonrpc.LedgerStore`.
+    """
+
+    version = start_version
+    while end_version is None or version < end_version:
+        limit = page_size if end_version is None else min(page_size, end_version - version)
+        txns = client.get_transactions(version, limit)
+        if not txns:
+            return
+        yield from txns
+        version = txns[-1].version + 1
+
+
+def export(txns: typing.Iterable[rpc.Transaction], directory: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """write transactions into the directory as columnar batches, returns number of exported transactions"""
+
+    writer = ColumnarWriter(directory)
+    total = 0
+    it = iter(txns)
+    while True:
+        batch = list(itertools.islice(it, batch_size))
+        if not batch:
+            return total
+        writer.write(to_columns(batch))
+        total += len(batch)
+
+
+class ColumnarWriter:
+    """ColumnarWriter writes batches of columns into sub-directories of the directory, named by batch index
+
+    A batch is written into a temporary directory and then renamed, so that readers never see partial batches.
+    New batches are appended after the batches existing in the directory.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.batches: int = len(_batch_dirs(directory))
+
+    def write(self, columns: Columns) -> str:
+        path = os.path.join(self.directory, "%08d" % self.batches)
+        tmp = os.path.join(self.directory, f".tmp-{uuid.uuid4()}")
+        os.makedirs(tmp)
+        for name, array in columns.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        os.rename(tmp, path)
+        self.batches += 1
+        return path
+
+
+def read_batches(
+    directory: str, columns: typing.Optional[typing.Sequence[str]] = None, mmap_mode: typing.Optional[str] = "r"
+) -> typing.Iterator[Columns]:
+    """iterate batches of the columns in the directory, arrays are memory-mapped unless `mmap_mode` is None"""
+
+    for path in _batch_dirs(directory):
+        yield {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in columns or COLUMNS}
+
+
+def read(directory: str, columns: typing.Optional[typing.Sequence[str]] = None) -> Columns:
+    """read the columns of all batches in the directory, each column is concatenated into one array"""
+
+    names = columns or COLUMNS
+    batches = list(read_batches(directory, names))
+    if not batches:
+        return {name: np.array([], dtype=_empty_dtype(name)) for name in names}
+    return {name: np.concatenate([batch[name] for batch in batches]) for name in names}
+
+
+def _addresses(hexes: typing.List[str]) -> np.ndarray:
+    # all hex addresses are decoded by one call, missing addresses are zeros
+    joined = "".join(h if h else _ZERO_ADDRESS_HEX for h in hexes)
+    return np.frombuffer(bytes.fromhex(joined), dtype=ADDRESS_DTYPE)
+
+
+def _metadata_columns(hexes: typing.List[str]) -> Columns:
+    n = len(hexes)
+    lengths = np.fromiter((len(h) // 2 for h in hexes), dtype=np.int64, count=n)
+    buf = np.frombuffer(bytes.fromhex("".join(hexes)), dtype=np.uint8)
+    offsets = np.cumsum(lengths) - lengths
+    metadata_type = np.full(n, NO_METADATA, dtype=np.int8)
+    has_metadata = lengths > 0
+    metadata_type[has_metadata] = buf[offsets[has_metadata]]
+
+    # BCS of travel rule metadata with reference id: [variant, version 0, option some 1, uleb128 length, utf8...];
+    # reference ids shorter than 128 bytes have single byte length, they are sliced by array operations.
+    travel_rule = np.flatnonzero((metadata_type == _TRAVEL_RULE_METADATA) & (lengths >= 4))
+    start = offsets[travel_rule]
+    simple = (buf[start + 1] == 0) & (buf[start + 2] == 1) & (buf[start + 3] < 128)
+    simple &= start + 4 + buf[start + 3] <= start + lengths[travel_rule]
+    rows = travel_rule[simple]
+    ref_start = start[simple] + 4
+    ref_lengths = buf[ref_start - 1].astype(np.int64)
+    width = int(ref_lengths.max()) if len(rows) else 0
+
+    others = [(i, _reference_id(hexes[i])) for i in travel_rule[~simple]]
+    width = max([width, 1] + [len(ref_id) for _, ref_id in others])
+    reference_id = np.zeros((n, width), dtype=np.uint8)
+    if len(rows):
+        positions = np.arange(width)
+        mask = positions < ref_lengths[:, None]
+        reference_id[rows] = np.where(mask, buf[np.where(mask, ref_start[:, None] + positions, 0)], 0)
+    for i, ref_id in others:
+        reference_id[i, : len(ref_id)] = np.frombuffer(ref_id, dtype=np.uint8)
+    return {"metadata_type": metadata_type, "reference_id": reference_id.view(f"S{width}").reshape(n)}
+
+
+def _reference_id(metadata_hex: str) -> bytes:
+    try:
+        metadata = diem_types.Metadata.bcs_deserialize(bytes.fromhex(metadata_hex))
+    except Exception:
+        return b""
+    ref_id = metadata.value.value.off_chain_reference_id  # pyre-ignore
+    return ref_id.encode() if ref_id else b""
+
+
+def _batch_dirs(directory: str) -> typing.List[str]:
+    names = sorted(name for name in os.listdir(directory) if name.isdigit())
+    return [os.path.join(directory, name) for name in names]
+
+
+def _empty_dtype(name: str) -> np.dtype:
+    return {
+        "sender": ADDRESS_DTYPE,
+        "receiver": ADDRESS_DTYPE,
+        "metadata_type": np.dtype(np.int8),
+        "currency": np.dtype("S1"),
+        "reference_id": np.dtype("S1"),
+    }.get(name, np.dtype(np.uint64))
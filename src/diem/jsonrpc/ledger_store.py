@@ -0,0 +1,315 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides LedgerStore, a local index of transactions and events for serving history queries.
+
+`LedgerStore` keeps transactions (with their events) fetched from a `jsonrpc.Client` in a SQLite database file,
+indexed by version, sender and sequence number, transaction hash, and event key and sequence number. It has the
+same history query methods as `jsonrpc.Client`; a query is served locally when the records it asks for are all
+in the store, otherwise it is sent to the node and the response is added into the store:
+
+```python
+
+>>> from diem import jsonrpc
+>>> client = jsonrpc.Client(url)
+>>> store = jsonrpc.LedgerStore("ledger.db", client, mmap_size=256 * 1024 * 1024)
+>>> store.sync()  # index transactions following the synced version
+>>> store.get_account_transactions(address, 0, 10, include_events=True)
+>>> store.get_events(event_key, 0, 100)
+>>> store.get_transaction_by_hash(txn_hash)
+
+```
+
+Transactions and events are history that never changes once committed, hence a record is never updated after
+it is added. Records are saved as protobuf binary, which is more compact and faster to parse than JSON.
+"""
+
+from dataclasses import dataclass, field
+
+from .client import Client
+from . import jsonrpc_pb2 as rpc
+from .. import diem_types, utils
+
+import sqlite3, threading, typing
+
+DEFAULT_SQLITE_TIMEOUT_SECS: float = 30.0
+DEFAULT_SYNC_LIMIT: int = 1000
+
+_SYNCED_VERSION: str = "synced_version"
+
+Address = typing.Union[diem_types.AccountAddress, str]
+
+
+@dataclass
+class LedgerStoreStats:
+    # queries served by the local records
+    hits: int = field(default=0)
+    # queries sent to the node, as the local records are not complete
+    misses: int = field(default=0)
+
+
+class LedgerStore:
+    """LedgerStore serves transactions and events queries from a SQLite database, and falls back to the client
+
+    1. `get_transactions` is served locally when all versions asked for are found. If some of the leading
+       versions are found, only the remaining versions are fetched from the node.
+    2. `get_account_transactions` and `get_events` are served locally when `limit` records of consecutive sequence
+       numbers from `start` are found; otherwise, e.g. there is a gap or the records may be not synced yet, the
+       query is sent to the node.
+    3. Transactions fetched from the node are always fetched with events, so that the events are indexed.
+
+    `mmap_size` is the bytes of the database file accessed by memory-mapped I/O, 0 for disabling it. Each thread
+    uses its own SQLite connection.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        client: Client,
+        mmap_size: int = 0,
+        timeout: float = DEFAULT_SQLITE_TIMEOUT_SECS,
+    ) -> None:
+        self.path = path
+        self.client = client
+        self.mmap_size = mmap_size
+        self.timeout = timeout
+        self.stats = LedgerStoreStats()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: typing.List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ledger_transactions (
+                version INTEGER PRIMARY KEY,
+                hash TEXT NOT NULL,
+                sender TEXT,
+                sequence_number INTEGER,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ledger_transactions_hash ON ledger_transactions (hash);
+            CREATE UNIQUE INDEX IF NOT EXISTS ledger_transactions_sender
+                ON ledger_transactions (sender, sequence_number) WHERE sender IS NOT NULL;
+            CREATE TABLE IF NOT EXISTS ledger_events (
+                key TEXT NOT NULL,
+                sequence_number INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (key, sequence_number)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS ledger_meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """)
+
+    def add_transactions(self, txns: typing.Sequence[rpc.Transaction]) -> int:
+        """add transactions fetched with events, returns number of transactions not found in the store before"""
+
+        return self._add_transactions(txns, None)
+
+    def _add_transactions(self, txns: typing.Sequence[rpc.Transaction], synced: typing.Optional[int]) -> int:
+        txn_rows = []
+        event_rows = []
+        for txn in txns:
+            user = txn.transaction.type == "user"
+            txn_rows.append(
+                (
+                    txn.version,
+                    txn.hash.lower(),
+                    txn.transaction.sender.lower() if user else None,
+                    txn.transaction.sequence_number if user else None,
+                    txn.SerializeToString(),
+                )
+            )
+            event_rows.extend((e.key, e.sequence_number, e.SerializeToString()) for e in txn.events)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            added = conn.executemany("INSERT OR IGNORE INTO ledger_transactions VALUES (?, ?, ?, ?, ?)", txn_rows)
+            conn.executemany("INSERT OR IGNORE INTO ledger_events VALUES (?, ?, ?)", event_rows)
+            if synced is not None:
+                # never moves backward when syncs run concurrently
+                conn.execute("INSERT OR IGNORE INTO ledger_meta VALUES (?, ?)", (_SYNCED_VERSION, synced))
+                conn.execute("UPDATE ledger_meta SET value = MAX(value, ?) WHERE name = ?", (synced, _SYNCED_VERSION))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return added.rowcount
+
+    def add_events(self, events: typing.Sequence[rpc.Event]) -> None:
+        rows = [(e.key, e.sequence_number, e.SerializeToString()) for e in events]
+        self._conn().executemany("INSERT OR IGNORE INTO ledger_events VALUES (?, ?, ?)", rows)
+
+    def latest_version(self) -> typing.Optional[int]:
+        """returns the latest transaction version in the store, None if the store is empty"""
+
+        return self._conn().execute("SELECT MAX(version) FROM ledger_transactions").fetchone()[0]
+
+    def synced_version(self) -> typing.Optional[int]:
+        """returns the version that all transactions until it are synced, None if nothing is synced
+
+        Unlike `latest_version`, it is not moved by transactions added by the queries falling back to the node.
+        """
+
+        row = self._conn().execute("SELECT value FROM ledger_meta WHERE name = ?", (_SYNCED_VERSION,)).fetchone()
+        return None if row is None else row[0]
+
+    def sync(self, limit: int = DEFAULT_SYNC_LIMIT) -> int:
+        """fetch and add transactions following the synced version, returns number of synced transactions
+
+        Call it repeatedly for following the transaction stream of the chain, it returns 0 when there is no new
+        transaction. Transactions added by queries falling back to the node are fetched again, so that no version
+        is skipped.
+        """
+
+        synced = self.synced_version()
+        start = 0 if synced is None else synced + 1
+        txns = _leading_versions(self.client.get_transactions(start, limit, include_events=True), start)
+        if txns:
+            self._add_transactions(txns, txns[-1].version)
+        return len(txns)
+
+    def get_transactions(
+        self,
+        start_version: int,
+        limit: int,
+        include_events: typing.Optional[bool] = None,
+    ) -> typing.List[rpc.Transaction]:
+        rows = self._conn().execute(
+            "SELECT data FROM ledger_transactions WHERE version >= ? AND version < ? ORDER BY version",
+            (start_version, start_version + limit),
+        )
+        local = _leading(rows, start_version, lambda txn: txn.version)
+        if len(local) < limit:
+            self._record(hit=False)
+            remaining = self.client.get_transactions(start_version + len(local), limit - len(local), True)
+            self.add_transactions(remaining)
+            local.extend(remaining)
+        else:
+            self._record(hit=True)
+        return _transactions(local, include_events)
+
+    def get_account_transaction(
+        self,
+        account_address: Address,
+        sequence: int,
+        include_events: typing.Optional[bool] = None,
+    ) -> typing.Optional[rpc.Transaction]:
+        txns = self.get_account_transactions(account_address, sequence, 1, include_events)
+        return txns[0] if txns else None
+
+    def get_account_transactions(
+        self,
+        account_address: Address,
+        sequence: int,
+        limit: int,
+        include_events: typing.Optional[bool] = None,
+    ) -> typing.List[rpc.Transaction]:
+        address = utils.account_address_hex(account_address).lower()
+        rows = self._conn().execute(
+            "SELECT data FROM ledger_transactions WHERE sender = ? AND sequence_number >= ? AND sequence_number < ?"
+            " ORDER BY sequence_number",
+            (address, sequence, sequence + limit),
+        )
+        local = _leading(rows, sequence, lambda txn: txn.transaction.sequence_number)
+        if len(local) < limit:
+            self._record(hit=False)
+            local = self.client.get_account_transactions(address, sequence, limit, True)
+            self.add_transactions(local)
+        else:
+            self._record(hit=True)
+        return _transactions(local, include_events)
+
+    def get_events(self, event_stream_key: str, start: int, limit: int) -> typing.List[rpc.Event]:
+        rows = self._conn().execute(
+            "SELECT data FROM ledger_events WHERE key = ? AND sequence_number >= ? AND sequence_number < ?"
+            " ORDER BY sequence_number",
+            (event_stream_key, start, start + limit),
+        )
+        events = [rpc.Event.FromString(row[0]) for row in rows]
+        if len(events) == limit and events[-1].sequence_number == start + limit - 1:
+            self._record(hit=True)
+            return events
+        self._record(hit=False)
+        events = self.client.get_events(event_stream_key, start, limit)
+        self.add_events(events)
+        return events
+
+    def get_transaction_by_hash(
+        self, txn_hash: str, include_events: typing.Optional[bool] = None
+    ) -> typing.Optional[rpc.Transaction]:
+        """find transaction by hash in the store
+
+        JSON-RPC has no method for it, hence when it is not found, the store is synced until the transaction is
+        found or all transactions of the chain are synced; None is returned only in the latter case.
+        """
+
+        sql = "SELECT data FROM ledger_transactions WHERE hash = ?"
+        row = self._conn().execute(sql, (txn_hash.lower(),)).fetchone()
+        while row is None and self.sync():
+            row = self._conn().execute(sql, (txn_hash.lower(),)).fetchone()
+        if row is None:
+            return None
+        return _transactions([rpc.Transaction.FromString(row[0])], include_events)[0]
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM ledger_transactions").fetchone()[0]
+
+    def _record(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit mode, the transaction of adding records is managed by BEGIN / COMMIT statements
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+
+def _leading_versions(txns: typing.List[rpc.Transaction], start: int) -> typing.List[rpc.Transaction]:
+    for i, txn in enumerate(txns):
+        if txn.version != start + i:
+            return txns[:i]
+    return txns
+
+
+def _leading(
+    rows: typing.Iterable[typing.Tuple[bytes]], start: int, key: typing.Callable[[rpc.Transaction], int]
+) -> typing.List[rpc.Transaction]:
+    """returns the transactions of consecutive keys from start"""
+
+    ret = []
+    for row in rows:
+        txn = rpc.Transaction.FromString(row[0])
+        if key(txn) != start + len(ret):
+            break
+        ret.append(txn)
+    return ret
+
+
+def _transactions(
+    txns: typing.List[rpc.Transaction], include_events: typing.Optional[bool]
+) -> typing.List[rpc.Transaction]:
+    if not include_events:
+        for txn in txns:
+            del txn.events[:]
+    return txns
@@ -0,0 +1,267 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides instrumentation hooks and metrics for `jsonrpc.Client`.
+
+`ClientHooks` receives events of the client; the client only checks whether hooks is given when it is not
+configured, so there is no cost other than one attribute check per event. `MetricsHooks` records the events
+into a `Registry`, which can be exported in Prometheus text exposition format:
+
+```python
+
+>>> from diem import jsonrpc
+>>> registry = jsonrpc.Registry()
+>>> client = jsonrpc.Client(url, hooks=jsonrpc.MetricsHooks(registry))
+>>> client.get_metadata()
+>>> print(registry.to_prometheus())
+
+```
+"""
+
+import bisect, math, threading, typing
+
+DEFAULT_BUCKETS: typing.Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_PREFIX: str = "diem_jsonrpc"
+
+Labels = typing.Tuple[str, ...]
+
+
+class ClientHooks:
+    """ClientHooks is the base class of `jsonrpc.Client` event hooks, the default implementation does nothing
+
+    Hooks are called by the threads sending requests, hence should be thread-safe and should not block.
+    """
+
+    def request_start(self, method: str) -> None:
+        """called before sending a JSON-RPC request, once for every attempt of `Client#execute` retries"""
+
+    def request_end(self, method: str, duration_secs: float, error: typing.Optional[Exception]) -> None:
+        """called after a JSON-RPC request is done; error is None if it succeeded"""
+
+    def http_request(self, method: str, url: str, duration_secs: float, bytes_sent: int, bytes_received: int) -> None:
+        """called after received a HTTP response from the url"""
+
+    def retry(self, method: str, attempt: int) -> None:
+        """called before retrying a failed request, attempt starts from 2"""
+
+    def stale_response(self, method: str, url: str, ignored: bool) -> None:
+        """called when the response of the url is stale, ignored is True if the response is used"""
+
+    def response_selected(self, method: str, url: str, primary: bool) -> None:
+        """called when `RequestWithBackups` selects the response of primary or backup url"""
+
+    def parse(self, method: str, duration_secs: float) -> None:
+        """called after parsed response result into object"""
+
+
+class Counter:
+    """Counter is a monotonically increasing value by label values"""
+
+    def __init__(self, name: str, help: str, labels: typing.Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels: Labels = tuple(labels)
+        self._values: typing.Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> typing.List[typing.Tuple[str, Labels, Labels, float]]:
+        with self._lock:
+            return [(self.name, self.labels, k, v) for k, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Gauge is a value that can go up and down by label values"""
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    """Histogram counts observed values in buckets by label values"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labels: Labels = tuple(labels)
+        self.buckets: typing.Tuple[float, ...] = tuple(sorted(buckets))
+        # label values => [count of each bucket (not cumulative) and +Inf bucket, sum]
+        self._values: typing.Dict[Labels, typing.List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 2)
+                self._values[label_values] = counts
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, *label_values: str) -> int:
+        counts = self._values.get(label_values)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def sum(self, *label_values: str) -> float:
+        counts = self._values.get(label_values)
+        return counts[-1] if counts else 0.0
+
+    def samples(self) -> typing.List[typing.Tuple[str, Labels, Labels, float]]:
+        ret = []
+        with self._lock:
+            values = sorted((k, list(v)) for k, v in self._values.items())
+        bucket_labels = self.labels + ("le",)
+        for label_values, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                ret.append((f"{self.name}_bucket", bucket_labels, label_values + (_format_value(bound),), cumulative))
+            ret.append((f"{self.name}_sum", self.labels, label_values, counts[-1]))
+            ret.append((f"{self.name}_count", self.labels, label_values, cumulative))
+        return ret
+
+
+Metric = typing.Union[Counter, Gauge, Histogram]
+
+
+class Registry:
+    """Registry keeps metrics by name in the process"""
+
+    def __init__(self) -> None:
+        self._metrics: typing.Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: typing.Sequence[str] = ()) -> Counter:
+        return typing.cast(Counter, self._register(Counter(name, help, labels)))
+
+    def gauge(self, name: str, help: str, labels: typing.Sequence[str] = ()) -> Gauge:
+        return typing.cast(Gauge, self._register(Gauge(name, help, labels)))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return typing.cast(Histogram, self._register(Histogram(name, help, labels, buckets)))
+
+    def get(self, name: str) -> typing.Optional[Metric]:
+        return self._metrics.get(name)
+
+    def to_prometheus(self) -> str:
+        """returns metrics in Prometheus text exposition format"""
+
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {type(metric).__name__.lower()}")
+            for name, labels, label_values, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels, label_values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labels != metric.labels:
+                    raise ValueError(f"metric {metric.name} is registered with different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+class MetricsHooks(ClientHooks):
+    """MetricsHooks records client events into metrics of the registry, metric names are prefixed by `prefix`"""
+
+    def __init__(
+        self,
+        registry: typing.Optional[Registry] = None,
+        prefix: str = DEFAULT_PREFIX,
+        buckets: typing.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.registry: Registry = registry or Registry()
+        r = self.registry
+        self.in_flight: Gauge = r.gauge(f"{prefix}_requests_in_flight", "Requests in flight.", ["method"])
+        self.requests: Counter = r.counter(f"{prefix}_requests_total", "Requests by result.", ["method", "result"])
+        self.duration: Histogram = r.histogram(
+            f"{prefix}_request_duration_seconds", "Request latency, including parsing result.", ["method"], buckets
+        )
+        self.http_duration: Histogram = r.histogram(
+            f"{prefix}_http_request_duration_seconds", "HTTP request latency.", ["method"], buckets
+        )
+        self.bytes_sent: Counter = r.counter(f"{prefix}_sent_bytes_total", "HTTP request body bytes.", ["method"])
+        self.bytes_received: Counter = r.counter(
+            f"{prefix}_received_bytes_total", "HTTP response body bytes.", ["method"]
+        )
+        self.retries: Counter = r.counter(f"{prefix}_retries_total", "Retried requests.", ["method"])
+        self.stale_responses: Counter = r.counter(
+            f"{prefix}_stale_responses_total", "Stale responses.", ["method", "ignored"]
+        )
+        self.selected_responses: Counter = r.counter(
+            f"{prefix}_selected_responses_total", "Responses selected from primary or backup.", ["method", "source"]
+        )
+        self.parse_duration: Histogram = r.histogram(
+            f"{prefix}_parse_duration_seconds", "Time spent in parsing response result.", ["method"], buckets
+        )
+
+    def request_start(self, method: str) -> None:
+        self.in_flight.inc(method)
+
+    def request_end(self, method: str, duration_secs: float, error: typing.Optional[Exception]) -> None:
+        self.in_flight.dec(method)
+        self.requests.inc(method, "success" if error is None else type(error).__name__)
+        self.duration.observe(duration_secs, method)
+
+    def http_request(self, method: str, url: str, duration_secs: float, bytes_sent: int, bytes_received: int) -> None:
+        self.http_duration.observe(duration_secs, method)
+        self.bytes_sent.inc(method, amount=bytes_sent)
+        self.bytes_received.inc(method, amount=bytes_received)
+
+    def retry(self, method: str, attempt: int) -> None:
+        self.retries.inc(method)
+
+    def stale_response(self, method: str, url: str, ignored: bool) -> None:
+        self.stale_responses.inc(method, "true" if ignored else "false")
+
+    def response_selected(self, method: str, url: str, primary: bool) -> None:
+        self.selected_responses.inc(method, "primary" if primary else "backup")
+
+    def parse(self, method: str, duration_secs: float) -> None:
+        self.parse_duration.observe(duration_secs, method)
+
+
+def _format_labels(labels: Labels, values: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in zip(labels, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(float(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
@@ -7,16 +7,45 @@ LocalAccount provides operations we need for creating auth key, account address
 raw transaction.
 """
 
-from . import diem_types, jsonrpc, utils, stdlib, identifier
+from . import diem_types, hashing, jsonrpc, utils, stdlib, identifier
 from .serde_types import uint64
 
 from .auth_key import AuthKey
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
-from typing import Dict, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
 from dataclasses import dataclass, field
 from copy import copy
 import time
 
+DEFAULT_SIGN_MANY_CHUNK_SIZE: int = 1_000
+
+
+@dataclass(frozen=True)
+class _KeyMaterial:
+    """Key material derived from a private key, cached by LocalAccount"""
+
+    private_key: Ed25519PrivateKey
+    private_key_bytes: bytes
+    public_key: Ed25519PublicKey
+    public_key_bytes: bytes
+    auth_key: AuthKey
+    account_address: diem_types.AccountAddress
+
+    @staticmethod
+    def derive(private_key: Ed25519PrivateKey) -> "_KeyMaterial":
+        public_key = private_key.public_key()
+        public_key_bytes = utils.public_key_bytes(public_key)
+        auth_key = AuthKey.from_public_key_bytes(public_key_bytes)
+        return _KeyMaterial(
+            private_key=private_key,
+            private_key_bytes=utils.private_key_bytes(private_key),
+            public_key=public_key,
+            public_key_bytes=public_key_bytes,
+            auth_key=auth_key,
+            account_address=auth_key.account_address(),
+        )
+
 
 @dataclass
 class LocalAccount:
@@ -67,25 +96,40 @@ class LocalAccount:
     txn_gas_unit_price: int = field(default=0)
     txn_expire_duration_secs: int = field(default=30)
 
+    # key material derived from private_key and compliance_key, they are re-derived when the keys are changed.
+    _keys: Optional[_KeyMaterial] = field(default=None, init=False, repr=False, compare=False)
+    _compliance_keys: Optional[_KeyMaterial] = field(default=None, init=False, repr=False, compare=False)
+
     @property
     def auth_key(self) -> AuthKey:
-        return AuthKey.from_public_key(self.public_key)
+        return self._key_material().auth_key
 
     @property
     def account_address(self) -> diem_types.AccountAddress:
-        return self.auth_key.account_address()
+        return self._key_material().account_address
 
     @property
     def public_key_bytes(self) -> bytes:
-        return utils.public_key_bytes(self.public_key)
+        return self._key_material().public_key_bytes
 
     @property
     def public_key(self) -> Ed25519PublicKey:
-        return self.private_key.public_key()
+        return self._key_material().public_key
 
     @property
     def compliance_public_key_bytes(self) -> bytes:
-        return utils.public_key_bytes(self.compliance_key.public_key())
+        keys = self._compliance_keys
+        if keys is None or keys.private_key is not self.compliance_key:
+            keys = _KeyMaterial.derive(self.compliance_key)
+            self._compliance_keys = keys
+        return keys.public_key_bytes
+
+    def _key_material(self) -> _KeyMaterial:
+        keys = self._keys
+        if keys is None or keys.private_key is not self.private_key:
+            keys = _KeyMaterial.derive(self.private_key)
+            self._keys = keys
+        return keys
 
     def account_identifier(self, subaddress: Optional[bytes] = None) -> str:
         return identifier.encode_account(self.account_address, subaddress, self.hrp)
@@ -96,6 +140,61 @@ class LocalAccount:
         signature = self.private_key.sign(utils.raw_transaction_signing_msg(txn))
         return utils.create_signed_transaction(txn, self.public_key_bytes, signature)
 
+    def sign_many(
+        self,
+        txns: Sequence[Union[diem_types.RawTransaction, bytes]],
+        executor: Optional[Executor] = None,
+        chunk_size: int = DEFAULT_SIGN_MANY_CHUNK_SIZE,
+    ) -> List[diem_types.SignedTransaction]:
+        """Create signed transactions for given raw transactions, results are in the same order
+
+        Raw transactions are serialized once in the calling process, then signing messages are chunked
+        and signed by the given executor (e.g. `concurrent.futures.ProcessPoolExecutor`); only the
+        serialized raw transaction bytes and the private key bytes are sent to the workers.
+        A `ProcessPoolExecutor` is created for the call if no executor is given and there are more than
+        `chunk_size` transactions; pass in a long-living executor to avoid the cost of starting processes
+        for every batch.
+
+        Raw transaction can be given as BCS serialized bytes, which skips the serialization in the calling
+        process.
+        """
+
+        raw_txns = [diem_types.RawTransaction.bcs_deserialize(t) if isinstance(t, bytes) else t for t in txns]
+        raw_txns_bytes = [t if isinstance(t, bytes) else t.bcs_serialize() for t in txns]
+        signatures = self._sign_raw_transactions_bytes(raw_txns_bytes, executor, chunk_size)
+        public_key_bytes = self.public_key_bytes
+        return [utils.create_signed_transaction(t, public_key_bytes, sig) for t, sig in zip(raw_txns, signatures)]
+
+    def sign_many_hex(
+        self,
+        txns: Sequence[Union[diem_types.RawTransaction, bytes]],
+        executor: Optional[Executor] = None,
+        chunk_size: int = DEFAULT_SIGN_MANY_CHUNK_SIZE,
+    ) -> List[str]:
+        """Same with `sign_many`, but returns hex-encoded signed transaction bytes, which can be submitted
+        by `jsonrpc.Client#submit` directly.
+        """
+
+        raw_txns_bytes = [t if isinstance(t, bytes) else t.bcs_serialize() for t in txns]
+        signatures = self._sign_raw_transactions_bytes(raw_txns_bytes, executor, chunk_size)
+        public_key_bytes = self.public_key_bytes
+        return [
+            utils.signed_transaction_bytes(t, public_key_bytes, sig).hex() for t, sig in zip(raw_txns_bytes, signatures)
+        ]
+
+    def _sign_raw_transactions_bytes(
+        self, raw_txns_bytes: List[bytes], executor: Optional[Executor], chunk_size: int
+    ) -> List[bytes]:
+        private_key_bytes = self._key_material().private_key_bytes
+        if executor is None and len(raw_txns_bytes) <= chunk_size:
+            return _sign_raw_transactions_bytes(private_key_bytes, raw_txns_bytes)
+
+        chunks = [raw_txns_bytes[i : i + chunk_size] for i in range(0, len(raw_txns_bytes), chunk_size)]
+        if executor is None:
+            with ProcessPoolExecutor() as pool:
+                return _sign_chunks(pool, private_key_bytes, chunks)
+        return _sign_chunks(executor, private_key_bytes, chunks)
+
     def create_txn(self, client: jsonrpc.Client, script: diem_types.Script) -> diem_types.SignedTransaction:
         sequence_number = client.get_account_sequence(self.account_address)
         chain_id = client.get_last_known_state().chain_id
@@ -135,7 +234,115 @@ class LocalAccount:
         private keys will be exported as hex-encded raw key bytes.
         """
 
-        d = copy(self.__dict__)
+        d = {name: value for name, value in self.__dict__.items() if not name.startswith("_")}
         d["private_key"] = utils.private_key_bytes(self.private_key).hex()
         d["compliance_key"] = utils.private_key_bytes(self.compliance_key).hex()
         return d
+
+
+class LocalAccountPool:
+    """LocalAccountPool holds a large number of local accounts compactly, e.g. for load testing.
+
+    Only raw private key, compliance key and authentication key bytes of the accounts are kept in byte
+    buffers; other `LocalAccount` attributes are shared by all accounts in the pool. `LocalAccount` is
+    created when it is accessed by index or iteration.
+
+    ```python
+    >>> from diem import LocalAccountPool
+    >>> pool = LocalAccountPool.generate(10_000, txn_gas_currency_code="XUS")
+    >>> account = pool[42]
+    >>> address = pool.account_address(42)
+    ```
+    """
+
+    KEY_LEN: int = 32
+    AUTH_KEY_LEN: int = 32
+
+    @staticmethod
+    def generate(size: int, **config: Any) -> "LocalAccountPool":  # pyre-ignore
+        """Generate a pool with given number of random accounts
+
+        The config keyword arguments are `LocalAccount` attributes other than keys, e.g. `hrp`.
+        """
+
+        pool = LocalAccountPool(**config)
+        for _ in range(size):
+            pool.add_keys(Ed25519PrivateKey.generate(), Ed25519PrivateKey.generate())
+        return pool
+
+    def __init__(self, **config: Any) -> None:  # pyre-ignore
+        self._config: Dict[str, Any] = config  # pyre-ignore
+        self._private_keys: bytearray = bytearray()
+        self._compliance_keys: bytearray = bytearray()
+        self._auth_keys: bytearray = bytearray()
+        self._index: Optional[Dict[bytes, int]] = None
+
+    def add(self, account: LocalAccount) -> int:
+        """Add the keys of given account into the pool, returns the index of the account"""
+
+        return self.add_keys(account.private_key, account.compliance_key)
+
+    def add_keys(self, private_key: Ed25519PrivateKey, compliance_key: Ed25519PrivateKey) -> int:
+        keys = _KeyMaterial.derive(private_key)
+        self._private_keys += keys.private_key_bytes
+        self._compliance_keys += utils.private_key_bytes(compliance_key)
+        self._auth_keys += keys.auth_key.data
+        index = len(self) - 1
+        if self._index is not None:
+            self._index[keys.account_address.to_bytes()] = index
+        return index
+
+    def __len__(self) -> int:
+        return len(self._auth_keys) // self.AUTH_KEY_LEN
+
+    def __getitem__(self, index: int) -> LocalAccount:
+        index = self._check_index(index)
+        start, end = index * self.KEY_LEN, (index + 1) * self.KEY_LEN
+        return LocalAccount(
+            private_key=Ed25519PrivateKey.from_private_bytes(bytes(self._private_keys[start:end])),
+            compliance_key=Ed25519PrivateKey.from_private_bytes(bytes(self._compliance_keys[start:end])),
+            **self._config,
+        )
+
+    def __iter__(self) -> Iterator[LocalAccount]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def auth_key(self, index: int) -> AuthKey:
+        index = self._check_index(index)
+        return AuthKey(bytes(self._auth_keys[index * self.AUTH_KEY_LEN : (index + 1) * self.AUTH_KEY_LEN]))
+
+    def account_address(self, index: int) -> diem_types.AccountAddress:
+        return self.auth_key(index).account_address()
+
+    def index_of(self, address: Union[diem_types.AccountAddress, str]) -> int:
+        """Returns index of the account found by given account address
+
+        The index of account addresses is built when this method is called the first time.
+        Raises `ValueError` if the address is not in the pool.
+        """
+
+        if self._index is None:
+            self._index = {self.account_address(i).to_bytes(): i for i in range(len(self))}
+        address_bytes = utils.account_address_bytes(address)
+        if address_bytes not in self._index:
+            raise ValueError(f"account address {address_bytes.hex()} is not in the pool")
+        return self._index[address_bytes]
+
+    def _check_index(self, index: int) -> int:
+        size = len(self)
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError(f"account index out of range: {index}, size: {size}")
+        return index
+
+
+def _sign_chunks(executor: Executor, private_key_bytes: bytes, chunks: List[List[bytes]]) -> List[bytes]:
+    futures = [executor.submit(_sign_raw_transactions_bytes, private_key_bytes, chunk) for chunk in chunks]
+    return [sig for f in futures for sig in f.result()]
+
+
+def _sign_raw_transactions_bytes(private_key_bytes: bytes, raw_txns_bytes: List[bytes]) -> List[bytes]:
+    private_key = Ed25519PrivateKey.from_private_bytes(private_key_bytes)
+    return [private_key.sign(hashing.raw_transaction_signing_msg(t)) for t in raw_txns_bytes]
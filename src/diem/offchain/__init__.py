@@ -35,6 +35,8 @@ from .types import (
     individual_kyc_data,
     entity_kyc_data,
     to_json,
+    to_dict,
+    set_json_dumps,
     from_json,
     from_dict,
     validate_write_once_fields,
@@ -46,6 +48,6 @@ from .command import Command
 from .payment_command import PaymentCommand
 from .client import Client, CommandResponseError
 
-from . import jws, http_server, state, payment_state
+from . import jws, http_server, state, payment_state, dispatcher, store, scheduler, idempotency, tracing
 
 import typing
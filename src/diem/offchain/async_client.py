@@ -0,0 +1,247 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides asyncio client for sending offchain commands.
+
+It requires [aiohttp](https://docs.aiohttp.org), install it by `pip install diem[async]`.
+
+```python
+
+>>> import asyncio
+>>> from diem import offchain, testnet
+>>> from diem.offchain.async_client import AsyncClient
+>>>
+>>> client = offchain.Client(account.account_address, testnet.create_client(), identifier.TDM)
+>>>
+>>> async def send(commands):
+...     async with AsyncClient(client, testnet.JSON_RPC_URL) as async_client:
+...         return await asyncio.gather(*[async_client.send_command(cmd, account.compliance_key.sign) for cmd in commands])
+...
+>>> asyncio.run(send(commands))
+
+```
+"""
+
+try:
+    import aiohttp
+except ImportError as e:
+    raise ImportError("diem.offchain.async_client requires aiohttp, install it by `pip install diem[async]`") from e
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+import google.protobuf.json_format as parser
+
+from .client import Client, CommandResponseError, _deserialize_jws
+from .command import Command
+from .error import protocol_error
+from .types import CommandResponseObject, CommandResponseStatus
+from . import jws, http_header
+from .. import diem_types, identifier, jsonrpc, utils
+from ..signer import AsyncSigner
+from ..jsonrpc.client import _parse_obj
+
+import asyncio, json, typing, uuid
+
+DEFAULT_CONNECTION_LIMIT: int = 1000
+DEFAULT_CONNECTION_LIMIT_PER_HOST: int = 16
+DEFAULT_CONNECT_TIMEOUT_SECS: float = 2.0
+DEFAULT_TIMEOUT_SECS: float = 30.0
+
+
+class AsyncClient:
+    """AsyncClient sends offchain commands from an asyncio event loop
+
+    It is the async version of `Client#send_command` and `Client#send_request`, with same validations and errors:
+
+    1. Counterparty base url and compliance key are found from on-chain account by async JSON-RPC calls;
+       concurrent lookups for the same account share one call. JSON-RPC errors are same with `jsonrpc.Client`.
+    2. Requests are sent through a connection pool that keeps at most `limit_per_host` connections alive for
+       each counterparty host, and at most `limit` connections in total.
+    3. Response other than 200 and 400 status raises `aiohttp.ClientResponseError`; invalid response JWS message
+       raises `Error` created by `protocol_error`; failure response raises `CommandResponseError`.
+
+    The `Client` is used for its configurations (hrp, JSON-RPC server state); the `jsonrpc_url` should be the
+    same server url of the `Client#jsonrpc_client`.
+    Create AsyncClient in a coroutine running by the event loop it is used, and close it by `close` when it is
+    not used anymore.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        jsonrpc_url: str,
+        limit: int = DEFAULT_CONNECTION_LIMIT,
+        limit_per_host: int = DEFAULT_CONNECTION_LIMIT_PER_HOST,
+        timeout: typing.Optional[aiohttp.ClientTimeout] = None,
+        retry: typing.Optional[jsonrpc.Retry] = None,
+    ) -> None:
+        self.client = client
+        self.jsonrpc_url = jsonrpc_url
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host),
+            timeout=timeout
+            or aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT_SECS, sock_connect=DEFAULT_CONNECT_TIMEOUT_SECS),
+        )
+        self._retry: jsonrpc.Retry = retry or jsonrpc.Retry(
+            jsonrpc.client.DEFAULT_MAX_RETRIES, jsonrpc.client.DEFAULT_RETRY_DELAY, jsonrpc.StaleResponseError
+        )
+        self._lookups: typing.Dict[str, "asyncio.Future[typing.Tuple[str, Ed25519PublicKey]]"] = {}
+
+    async def close(self) -> None:
+        await self.session.close()
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *args: typing.Any) -> None:  # pyre-ignore
+        await self.close()
+
+    async def send_command(
+        self, command: Command, sign: typing.Union[typing.Callable[[bytes], bytes], AsyncSigner]
+    ) -> CommandResponseObject:
+        """send command, the request is signed by the sign function or awaiting the `AsyncSigner`"""
+
+        request = command.new_request()
+        if isinstance(sign, AsyncSigner):
+            request_bytes = await jws.serialize_async(request, sign.sign)
+        else:
+            request_bytes = jws.serialize(request, sign)
+        return await self.send_request(
+            request_sender_address=command.my_address(),
+            opponent_account_id=command.opponent_address(),
+            request_bytes=request_bytes,
+        )
+
+    async def send_request(
+        self,
+        request_sender_address: str,
+        opponent_account_id: str,
+        request_bytes: bytes,
+        x_request_id: typing.Optional[str] = None,
+    ) -> CommandResponseObject:
+        """send request bytes, `x_request_id` is generated if it is not provided"""
+
+        base_url, public_key = await self.get_base_url_and_compliance_key(opponent_account_id)
+        async with self.session.post(
+            f"{base_url.rstrip('/')}/v2/command",
+            data=request_bytes,
+            headers={
+                http_header.X_REQUEST_ID: x_request_id or str(uuid.uuid4()),
+                http_header.X_REQUEST_SENDER_ADDRESS: request_sender_address,
+            },
+        ) as response:
+            if response.status not in [200, 400]:
+                response.raise_for_status()
+            content = await response.read()
+
+        cmd_resp = _deserialize_jws(content, CommandResponseObject, public_key, protocol_error)
+        if cmd_resp.status == CommandResponseStatus.failure:
+            raise CommandResponseError(cmd_resp)
+        return cmd_resp
+
+    async def get_base_url_and_compliance_key(self, account_id: str) -> typing.Tuple[str, Ed25519PublicKey]:
+        account_address, _ = identifier.decode_account(account_id, self.client.hrp)
+        return await self.get_account_base_url_and_compliance_key(account_address)
+
+    async def get_account_base_url_and_compliance_key(
+        self, account_address: typing.Union[diem_types.AccountAddress, str]
+    ) -> typing.Tuple[str, Ed25519PublicKey]:
+        """async version of `jsonrpc.Client#get_base_url_and_compliance_key`
+
+        Concurrent calls for the same account address share the result of one lookup.
+        """
+
+        address = utils.account_address_hex(account_address)
+        lookup = self._lookups.get(address)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._get_base_url_and_compliance_key(address))
+            self._lookups[address] = lookup
+            lookup.add_done_callback(lambda _: self._lookups.pop(address, None))
+        return await asyncio.shield(lookup)
+
+    async def _get_base_url_and_compliance_key(self, address: str) -> typing.Tuple[str, Ed25519PublicKey]:
+        account = await self.must_get_account(address)
+
+        if account.role.compliance_key and account.role.base_url:
+            key = utils.ed25519_public_key_from_hex(account.role.compliance_key)
+            return (account.role.base_url, key)
+        if account.role.parent_vasp_address:
+            return await self.get_account_base_url_and_compliance_key(account.role.parent_vasp_address)
+
+        raise ValueError(f"could not find base_url and compliance_key from account: {account}")
+
+    async def must_get_account(self, account_address: typing.Union[diem_types.AccountAddress, str]) -> jsonrpc.Account:
+        account = await self.get_account(account_address)
+        if account is None:
+            hex = utils.account_address_hex(account_address)
+            raise jsonrpc.AccountNotFoundError(f"account not found by address: {hex}")
+        return account
+
+    async def get_account(
+        self, account_address: typing.Union[diem_types.AccountAddress, str]
+    ) -> typing.Optional[jsonrpc.Account]:
+        address = utils.account_address_hex(account_address)
+        return await self.execute("get_account", [address], _parse_obj(lambda: jsonrpc.Account()))
+
+    async def execute(
+        self,
+        method: str,
+        params: typing.List[typing.Any],  # pyre-ignore
+        result_parser: typing.Optional[typing.Callable] = None,  # pyre-ignore
+    ):  # pyre-ignore
+        """async version of `jsonrpc.Client#execute`, retries on the exception configured by the retry"""
+
+        tries = 0
+        while True:
+            tries += 1
+            try:
+                return await self.execute_without_retry(method, params, result_parser)
+            except self._retry.exception:
+                if tries >= self._retry.max_retries:
+                    raise
+                await asyncio.sleep(self._retry.delay_secs * tries)
+
+    async def execute_without_retry(
+        self,
+        method: str,
+        params: typing.List[typing.Any],  # pyre-ignore
+        result_parser: typing.Optional[typing.Callable] = None,  # pyre-ignore
+    ):  # pyre-ignore
+        """async version of `jsonrpc.Client#execute_without_retry`, raises same errors"""
+
+        request = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": method,
+            "params": params or [],
+        }
+        try:
+            async with self.session.post(self.jsonrpc_url, json=request) as response:
+                response.raise_for_status()
+                text = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise jsonrpc.NetworkError(f"Error in connecting to server: {e}\nPlease retry...")
+
+        try:
+            resp_json = json.loads(text)
+        except ValueError as e:
+            raise jsonrpc.InvalidServerResponse(f"Parse response as json failed: {e}, response: {text}")
+
+        # check stable response before check jsonrpc error
+        self.client.jsonrpc_client.update_last_known_state(
+            resp_json.get("diem_chain_id"),
+            resp_json.get("diem_ledger_version"),
+            resp_json.get("diem_ledger_timestampusec"),
+        )
+        if "error" in resp_json:
+            err = resp_json["error"]
+            raise jsonrpc.JsonRpcError(f"{err}")
+
+        if "result" in resp_json:
+            if result_parser:
+                try:
+                    return result_parser(resp_json["result"])
+                except parser.ParseError as e:
+                    raise jsonrpc.InvalidServerResponse(f"Parse result failed: {e}, response: {resp_json}")
+            return
+
+        raise jsonrpc.InvalidServerResponse(f"No error or result in response: {resp_json}")
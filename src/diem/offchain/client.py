@@ -22,8 +22,10 @@ from .types import (
     PaymentCommandObject,
     ErrorCode,
     FieldError,
+    from_json,
 )
 from .error import command_error, protocol_error, Error
+from .tracing import SpanFactory, Tracer, STAGE_TOTAL, no_span, span_factory
 
 from . import jws, http_header
 from .. import jsonrpc, diem_types, identifier, utils
@@ -73,12 +75,15 @@ class Client:
             length = int(self.headers["content-length"])
             content = self.rfile.read(length)
 
-            command = client.process_inbound_request(jws_key_address, content)
+            command = client.process_inbound_request(jws_key_address, content, x_request_id=x_request_id)
             # validate and save command
             ...
 
     ```
 
+    Give a `diem.offchain.tracing.Tracer` as `tracer` for receiving latency of each stage of processing inbound
+    requests.
+
     See example [Wallet#process_inbound_request](https://diem.github.io/client-sdk-python/examples/vasp/wallet.html#examples.vasp.wallet.WalletApp.process_inbound_request) for full example of how to process inbound request.
     """
 
@@ -93,6 +98,7 @@ class Client:
             DEFAULT_TIMEOUT_SECS,
         )
     )
+    tracer: typing.Optional[Tracer] = dataclasses.field(default=None)
     my_compliance_key_account_id: str = dataclasses.field(init=False)
 
     def __post_init__(self) -> None:
@@ -106,14 +112,20 @@ class Client:
         )
 
     def send_request(
-        self, request_sender_address: str, opponent_account_id: str, request_bytes: bytes
+        self,
+        request_sender_address: str,
+        opponent_account_id: str,
+        request_bytes: bytes,
+        x_request_id: typing.Optional[str] = None,
     ) -> CommandResponseObject:
+        """send request bytes, `x_request_id` is generated if it is not provided"""
+
         base_url, public_key = self.get_base_url_and_compliance_key(opponent_account_id)
         response = self.session.post(
             f"{base_url.rstrip('/')}/v2/command",
             data=request_bytes,
             headers={
-                http_header.X_REQUEST_ID: str(uuid.uuid4()),
+                http_header.X_REQUEST_ID: x_request_id or str(uuid.uuid4()),
                 http_header.X_REQUEST_SENDER_ADDRESS: request_sender_address,
             },
             timeout=self.timeout,
@@ -126,9 +138,13 @@ class Client:
             raise CommandResponseError(cmd_resp)
         return cmd_resp
 
-    def process_inbound_request(self, request_sender_address: str, request_bytes: bytes) -> Command:
+    def process_inbound_request(
+        self, request_sender_address: str, request_bytes: bytes, x_request_id: typing.Optional[str] = None
+    ) -> Command:
         """Validate and decode the `request_bytes` into `diem.offchain.command.Command` object.
 
+        When the client has a `tracer`, spans of processing stages are tagged by the `x_request_id`.
+
         Raises `diem.offchain.error.Error` with `protocol_error` when:
 
         - `request_sender_address` is not provided.
@@ -147,22 +163,32 @@ class Client:
 
         """
 
+        span = span_factory(self.tracer, x_request_id or "")
+        with span(STAGE_TOTAL):
+            return self._process_inbound_request(request_sender_address, request_bytes, span)
+
+    def _process_inbound_request(self, request_sender_address: str, request_bytes: bytes, span: SpanFactory) -> Command:
         if not request_sender_address:
             raise protocol_error(ErrorCode.missing_http_header, f"missing {http_header.X_REQUEST_SENDER_ADDRESS}")
         try:
-            _, public_key = self.get_base_url_and_compliance_key(request_sender_address)
+            with span("lookup_sender_key"):
+                _, public_key = self.get_base_url_and_compliance_key(request_sender_address)
         except ValueError as e:
             raise protocol_error(ErrorCode.invalid_http_header, str(e)) from e
 
-        request = _deserialize_jws(request_bytes, CommandRequestObject, public_key, command_error)
+        request = _deserialize_jws(request_bytes, CommandRequestObject, public_key, command_error, span)
         if request.command_type == CommandType.PaymentCommand:
             payment = typing.cast(PaymentCommandObject, request.command).payment
-            self.validate_addresses(payment, request_sender_address)
-            cmd = self.create_inbound_payment_command(request.cid, payment)
+            with span("validate_addresses"):
+                self.validate_addresses(payment, request_sender_address)
+            with span("create_command"):
+                cmd = self.create_inbound_payment_command(request.cid, payment)
             if cmd.is_initial():
-                self.validate_dual_attestation_limit(cmd.payment.action)
+                with span("dual_attestation"):
+                    self.validate_dual_attestation_limit(cmd.payment.action)
             elif cmd.is_rsend():
-                self.validate_recipient_signature(cmd, public_key)
+                with span("recipient_signature"):
+                    self.validate_recipient_signature(cmd, public_key)
             return cmd
 
         raise command_error(
@@ -268,9 +294,16 @@ def _deserialize_jws(
     klass: typing.Type[jws.T],
     public_key: Ed25519PublicKey,
     error_fn: typing.Callable[[str, str, typing.Optional[str]], Error],
+    span: SpanFactory = no_span,
 ) -> jws.T:
     try:
-        return jws.deserialize(content_bytes, klass, public_key.verify)
+        # same with `jws.deserialize`, but in stages
+        with span("jws_parse"):
+            body, sig, signing_msg = jws.deserialize_bytes(content_bytes)
+        with span("verify_signature"):
+            public_key.verify(sig, signing_msg)
+        with span("decode"):
+            return from_json(body.decode(jws.ENCODING), klass)
     except JSONDecodeError as e:
         raise error_fn(ErrorCode.invalid_json, f"decode json string failed: {e}", None) from e
     except FieldError as e:
@@ -0,0 +1,251 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides Dispatcher for sending outbound offchain commands concurrently.
+
+Commands of the same payment (reference id) must be sent in order, while commands of different payments
+can be sent in parallel:
+
+```python
+
+>>> from diem import offchain
+>>> dispatcher = offchain.dispatcher.Dispatcher(lambda cmd: client.send_command(cmd, key.sign), client.hrp)
+>>> future = dispatcher.submit(command)
+>>> future.result()
+>>> dispatcher.metrics()
+>>> dispatcher.shutdown()
+
+```
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from .command import Command
+from .. import identifier, jsonrpc
+
+import requests, threading, time, typing
+
+DEFAULT_WORKERS: int = 16
+DEFAULT_LIMIT_PER_COUNTERPARTY: int = 4
+DEFAULT_MAX_RETRIES: int = 5
+DEFAULT_RETRY_DELAY_SECS: float = 0.1
+DEFAULT_MAX_RETRY_DELAY_SECS: float = 5.0
+
+SendCommand = typing.Callable[[Command], typing.Any]  # pyre-ignore
+
+
+@dataclass
+class DispatcherMetrics:
+    """DispatcherMetrics is a snapshot of Dispatcher counters
+
+    `queue_seconds` is the total time commands waited in queue before being sent, `send_seconds` is the total
+    time of sending commands, including retries. Both are recorded when a command is completed (sent or failed).
+    """
+
+    submitted: int = field(default=0)
+    coalesced: int = field(default=0)
+    sent: int = field(default=0)
+    failed: int = field(default=0)
+    retries: int = field(default=0)
+    queue_depth: int = field(default=0)
+    in_flight: int = field(default=0)
+    queue_seconds: float = field(default=0.0)
+    send_seconds: float = field(default=0.0)
+    max_queue_seconds: float = field(default=0.0)
+    max_send_seconds: float = field(default=0.0)
+
+    def completed(self) -> int:
+        return self.sent + self.failed
+
+    def average_queue_seconds(self) -> float:
+        return self.queue_seconds / self.completed() if self.completed() else 0.0
+
+    def average_send_seconds(self) -> float:
+        return self.send_seconds / self.completed() if self.completed() else 0.0
+
+
+class Dispatcher:
+    """Dispatcher sends outbound offchain commands by a pool of worker threads
+
+    1. Commands are queued by reference id in FIFO order, only one command of a reference id is sent at a time.
+    2. Commands of different reference ids are sent concurrently, at most `limit_per_counterparty` commands are
+       sent to the same counterparty on-chain account at a time.
+    3. The `send` callable is retried with exponential backoff when it raises the `retry.exception`, which is
+       `requests.RequestException` by default; the delay is capped by `max_retry_delay_secs`.
+    4. When `coalesce` is True, a command queued but not started is superseded by a newer command submitted for
+       the same reference id, as the newer command carries the whole payment object. The futures of superseded
+       commands are resolved with the result of the command sent.
+
+    `submit` returns a `concurrent.futures.Future` of the `send` result.
+    """
+
+    def __init__(
+        self,
+        send: SendCommand,
+        hrp: str,
+        workers: int = DEFAULT_WORKERS,
+        limit_per_counterparty: int = DEFAULT_LIMIT_PER_COUNTERPARTY,
+        retry: typing.Optional[jsonrpc.Retry] = None,
+        max_retry_delay_secs: float = DEFAULT_MAX_RETRY_DELAY_SECS,
+        coalesce: bool = True,
+    ) -> None:
+        self.send = send
+        self.hrp = hrp
+        self.limit_per_counterparty = limit_per_counterparty
+        self.retry: jsonrpc.Retry = retry or jsonrpc.Retry(
+            DEFAULT_MAX_RETRIES, DEFAULT_RETRY_DELAY_SECS, requests.RequestException
+        )
+        self.max_retry_delay_secs = max_retry_delay_secs
+        self.coalesce = coalesce
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="offchain-dispatcher")
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        # pending commands by reference id, the command being sent is not included
+        self._queues: typing.Dict[str, typing.Deque[_Entry]] = {}
+        self._running: typing.Set[str] = set()
+        self._counterparty_running: typing.Dict[str, int] = {}
+        # reference ids waiting for the counterparty limit, dict is used as an ordered set
+        self._waiting: typing.Dict[str, typing.Dict[str, None]] = {}
+        self._metrics = DispatcherMetrics()
+
+    def submit(self, command: Command) -> "Future[typing.Any]":  # pyre-ignore
+        """queue the command for sending, raises `RuntimeError` if the dispatcher is shutdown"""
+
+        entry = _Entry(command=command, counterparty=self.counterparty(command))
+        ref_id = command.reference_id()
+        with self._lock:
+            if self._stopped.is_set():
+                raise RuntimeError("dispatcher is shutdown")
+            self._metrics.submitted += 1
+            queue = self._queues.setdefault(ref_id, deque())
+            if self.coalesce and queue:
+                prior = queue.pop()
+                entry.submitted_at = prior.submitted_at
+                entry.superseded = prior.superseded + [prior.future]
+                self._metrics.coalesced += 1
+            else:
+                self._metrics.queue_depth += 1
+            queue.append(entry)
+            self._schedule(ref_id)
+        return entry.future
+
+    def counterparty(self, command: Command) -> str:
+        """returns counterparty on-chain account address hex of the command"""
+
+        address, _ = identifier.decode_account(command.opponent_address(), self.hrp)
+        return address.to_hex()
+
+    def metrics(self) -> DispatcherMetrics:
+        with self._lock:
+            return replace(self._metrics)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """stop accepting commands and cancel commands not started
+
+        Backoff of retrying commands is interrupted, and retrying commands fail with their last errors.
+        When `wait` is True, it waits for in-flight commands finished.
+        """
+
+        with self._lock:
+            self._stopped.set()
+            entries = [entry for queue in self._queues.values() for entry in queue]
+            self._metrics.queue_depth -= len(entries)
+            self._queues.clear()
+            self._waiting.clear()
+        for entry in entries:
+            for future in entry.futures():
+                future.cancel()
+        self._executor.shutdown(wait=wait)
+
+    def _schedule(self, ref_id: str) -> None:
+        if self._stopped.is_set() or ref_id in self._running:
+            return
+        queue = self._queues.get(ref_id)
+        if not queue:
+            self._queues.pop(ref_id, None)
+            return
+        counterparty = queue[0].counterparty
+        if self._counterparty_running.get(counterparty, 0) >= self.limit_per_counterparty:
+            self._waiting.setdefault(counterparty, {})[ref_id] = None
+            return
+
+        entry = queue.popleft()
+        self._running.add(ref_id)
+        self._counterparty_running[counterparty] = self._counterparty_running.get(counterparty, 0) + 1
+        self._metrics.queue_depth -= 1
+        self._metrics.in_flight += 1
+        self._executor.submit(self._run, ref_id, entry)
+
+    def _schedule_waiting(self, counterparty: str) -> None:
+        waiting = self._waiting.get(counterparty)
+        while waiting and self._counterparty_running.get(counterparty, 0) < self.limit_per_counterparty:
+            ref_id = next(iter(waiting))
+            del waiting[ref_id]
+            self._schedule(ref_id)
+        if not waiting:
+            self._waiting.pop(counterparty, None)
+
+    def _run(self, ref_id: str, entry: "_Entry") -> None:
+        start = time.monotonic()
+        result, error = None, None
+        try:
+            result = self._send_with_retry(entry.command)
+        except Exception as e:
+            error = e
+        end = time.monotonic()
+
+        with self._lock:
+            self._record(start - entry.submitted_at, end - start, error is None)
+            self._running.discard(ref_id)
+            running = self._counterparty_running[entry.counterparty] - 1
+            if running:
+                self._counterparty_running[entry.counterparty] = running
+            else:
+                del self._counterparty_running[entry.counterparty]
+            self._schedule_waiting(entry.counterparty)
+            self._schedule(ref_id)
+
+        for future in entry.futures():
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _send_with_retry(self, command: Command) -> typing.Any:  # pyre-ignore
+        tries = 0
+        while True:
+            tries += 1
+            try:
+                return self.send(command)
+            except self.retry.exception:
+                if tries >= self.retry.max_retries or self._stopped.is_set():
+                    raise
+                with self._lock:
+                    self._metrics.retries += 1
+                self._stopped.wait(min(self.retry.delay_secs * 2 ** (tries - 1), self.max_retry_delay_secs))
+
+    def _record(self, queue_seconds: float, send_seconds: float, success: bool) -> None:
+        m = self._metrics
+        m.in_flight -= 1
+        if success:
+            m.sent += 1
+        else:
+            m.failed += 1
+        m.queue_seconds += queue_seconds
+        m.send_seconds += send_seconds
+        m.max_queue_seconds = max(m.max_queue_seconds, queue_seconds)
+        m.max_send_seconds = max(m.max_send_seconds, send_seconds)
+
+
+@dataclass
+class _Entry:
+    command: Command
+    counterparty: str
+    future: "Future[typing.Any]" = field(default_factory=Future)  # pyre-ignore
+    superseded: typing.List["Future[typing.Any]"] = field(default_factory=list)  # pyre-ignore
+    submitted_at: float = field(default_factory=time.monotonic)
+
+    def futures(self) -> typing.List["Future[typing.Any]"]:  # pyre-ignore
+        return self.superseded + [self.future]
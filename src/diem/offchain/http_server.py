@@ -1,18 +1,433 @@
 # Copyright (c) The Diem Core Contributors
 # SPDX-License-Identifier: Apache-2.0
 
-""" This module defines util functions for testing offchain inbound request processor with http server
+""" This module defines http server for offchain inbound request processor
 
-Not recommended for production
-"""
+`Server` is a thread pool based HTTP/1.1 server for processing offchain inbound requests concurrently:
+
+```python
+
+>>> from diem import offchain
+>>> server = offchain.http_server.Server(process_inbound_request, host="0.0.0.0", port=8080, workers=32)
+>>> server.start()
+>>> ...
+>>> server.shutdown(timeout=10)
 
+```
+
+`start_local` is a util function for testing offchain inbound request processor, not recommended for production.
+"""
+from concurrent.futures import ThreadPoolExecutor
 from http import server
 from .http_header import X_REQUEST_ID, X_REQUEST_SENDER_ADDRESS
 
-import logging, socket, threading, typing
+import heapq, itertools, logging, selectors, socket, threading, time, typing
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+ProcessInboundRequest = typing.Callable[[str, str, bytes], typing.Tuple[int, bytes]]
+
+DEFAULT_WORKERS: int = 16
+DEFAULT_MAX_PENDING_REQUESTS: int = 128
+DEFAULT_MAX_REQUEST_SIZE: int = 1024 * 1024
+DEFAULT_KEEP_ALIVE_TIMEOUT_SECS: float = 5.0
+DEFAULT_RETRY_AFTER_SECS: int = 1
+
+_REJECT_DRAIN_SECS: float = 0.05
+_REJECT_RESPONSE: bytes = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Retry-After: %d\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n\r\n" % DEFAULT_RETRY_AFTER_SECS
+)
+_RECV_SIZE: int = 65536
+
+
+class Server:
+    """Server is a HTTP/1.1 server processes offchain inbound requests by a pool of worker threads
+
+    1. The serving thread accepts connections and waits for requests of all open connections by a selector; a
+       connection does not take a worker thread while it is idle. A connection is kept alive for following
+       requests until it is idle for `keep_alive_timeout` seconds.
+    2. When a request arrives, it is submitted to the worker threads, which read the request, call
+       `process_inbound_request` and send the response. Requests submitted and not finished are bounded by
+       `workers + max_pending_requests`; when it is full, the request is responded with 503 status and
+       `Retry-After` header, and the connection is closed.
+    3. Requests without a valid `Content-Length` header are responded with 411 or 400 status; requests with body
+       size larger than `max_request_size` are responded with 413 status.
+    4. `shutdown` stops accepting connections, closes idle connections, and waits for in-flight requests finished.
+
+    The `process_inbound_request` callable receives same arguments as the one given to `start_local`, and returns
+    the response status code and body bytes.
+    """
+
+    def __init__(
+        self,
+        process_inbound_request: ProcessInboundRequest,
+        host: str = "localhost",
+        port: int = 0,
+        workers: int = DEFAULT_WORKERS,
+        max_pending_requests: int = DEFAULT_MAX_PENDING_REQUESTS,
+        max_request_size: int = DEFAULT_MAX_REQUEST_SIZE,
+        keep_alive_timeout: float = DEFAULT_KEEP_ALIVE_TIMEOUT_SECS,
+    ) -> None:
+        self.process_inbound_request = process_inbound_request
+        self.workers = workers
+        self.max_pending_requests = max_pending_requests
+        self.max_request_size = max_request_size
+        self.keep_alive_timeout = keep_alive_timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="offchain-http")
+        self._lock = threading.Condition()
+        # requests submitted to the executor and not finished
+        self._requests = 0
+        # connections to be parked in the selector by the serving thread
+        self._parking: typing.List["_Connection"] = []
+        self._closed = False
+        self._shutting_down = False
+        self._serving = False
+        self._stopped = threading.Event()
+
+        self._httpd = _HTTPServer(self, (host, port))
+        self._httpd.socket.setblocking(False)
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._httpd.socket, selectors.EVENT_READ, self._accept)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ, self._clear_wakeup)
+        # (deadline, sequence, connection) of parked connections; entries of unparked connections are skipped
+        self._deadlines: typing.List[typing.Tuple[float, int, "_Connection"]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def is_shutting_down(self) -> bool:
+        return self._shutting_down
+
+    def start(self) -> "Server":
+        """start serving requests in a daemon thread"""
+
+        # set before the thread starts, so that `shutdown` called right after `start` waits for the serving loop
+        self._serving = True
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._serving = True
+        self._serve()
+
+    def shutdown(self, timeout: typing.Optional[float] = None) -> bool:
+        """stop accepting connections and wait for in-flight requests are processed
+
+        Idle keep-alive connections are closed, connections with a request in processing are closed after the
+        response is sent. Returns False if there are still requests in processing after the timeout seconds.
+        """
+
+        self._shutting_down = True
+        self._wakeup()
+        if self._serving:
+            self._stopped.wait()
+        else:
+            self._close_parked()
+        self._httpd.server_close()
+        self._selector.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
+        with self._lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._requests:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._lock.wait(remaining)
+            done = not self._requests
+        self._executor.shutdown(wait=done)
+        return done
+
+    def __enter__(self) -> "Server":
+        return self.start()
+
+    def __exit__(self, *args: typing.Any) -> None:  # pyre-ignore
+        self.shutdown()
+
+    def _serve(self) -> None:
+        try:
+            while not self._shutting_down:
+                for key, _ in self._selector.select(self._select_timeout()):
+                    if isinstance(key.data, _Connection):
+                        self._ready(key.data)
+                    else:
+                        key.data()
+                now = time.monotonic()
+                self._register_parking(now)
+                self._expire(now)
+        finally:
+            self._close_parked()
+            self._serving = False
+            self._stopped.set()
+
+    def _accept(self) -> None:
+        try:
+            sock, client_address = self._httpd.socket.accept()
+        except OSError:  # no pending connection, or the connection is reset
+            return
+        try:
+            conn = _Connection(sock, client_address, self.keep_alive_timeout)
+        except OSError:  # the connection is reset by the client before it is set up
+            sock.close()
+            return
+        self._register(conn, time.monotonic() + self.keep_alive_timeout)
+
+    def _ready(self, conn: "_Connection") -> None:
+        if conn.rejected:
+            if not conn.drain():
+                self._unregister(conn)
+                conn.close()
+            return
+        self._unregister(conn)
+        self._submit(conn)
+
+    def _submit(self, conn: "_Connection") -> None:
+        with self._lock:
+            admitted = not self._shutting_down and self._requests < self.workers + self.max_pending_requests
+            if admitted:
+                self._requests += 1
+        if not admitted:
+            return self._reject(conn)
+        try:
+            self._executor.submit(self._process, conn)
+        except RuntimeError:  # executor is shutdown
+            self._finish_request()
+            conn.close()
+
+    def _reject(self, conn: "_Connection") -> None:
+        # the connection is parked for draining request bytes, closing socket with unread data resets the
+        # connection before the client reads the response
+        if conn.reject():
+            self._park(conn)
+        else:
+            conn.close()
+
+    def _process(self, conn: "_Connection") -> None:
+        keep_alive = False
+        try:
+            keep_alive = not _Handler(conn, conn.client_address, self._httpd).close_connection
+        except Exception:
+            self._httpd.handle_error(conn.socket, conn.client_address)
+        finally:
+            self._finish_request()
+        if not keep_alive or self._shutting_down:
+            conn.close()
+        elif conn.has_buffered_request():
+            self._submit(conn)
+        else:
+            self._park(conn)
+
+    def _finish_request(self) -> None:
+        with self._lock:
+            self._requests -= 1
+            self._lock.notify_all()
+
+    def _park(self, conn: "_Connection") -> None:
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._parking.append(conn)
+                wakeup = len(self._parking) == 1
+        if closed:
+            conn.close()
+        elif wakeup:
+            self._wakeup()
+
+    def _register_parking(self, now: float) -> None:
+        with self._lock:
+            parking, self._parking = self._parking, []
+        for conn in parking:
+            self._register(conn, conn.drain_deadline if conn.rejected else now + self.keep_alive_timeout)
+
+    def _register(self, conn: "_Connection", deadline: float) -> None:
+        self._selector.register(conn.socket, selectors.EVENT_READ, conn)
+        conn.deadline = deadline
+        heapq.heappush(self._deadlines, (deadline, next(self._sequence), conn))
+
+    def _unregister(self, conn: "_Connection") -> None:
+        self._selector.unregister(conn.socket)
+        conn.deadline = None
+
+    def _expire(self, now: float) -> None:
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, _, conn = heapq.heappop(self._deadlines)
+            if conn.deadline == deadline:
+                self._unregister(conn)
+                conn.close()
+
+    def _select_timeout(self) -> typing.Optional[float]:
+        if not self._deadlines:
+            return None
+        return max(0.0, self._deadlines[0][0] - time.monotonic())
+
+    def _close_parked(self) -> None:
+        with self._lock:
+            self._closed = True
+            parking, self._parking = self._parking, []
+        for conn in parking:
+            conn.close()
+        for key in list(self._selector.get_map().values()):
+            if isinstance(key.data, _Connection):
+                self._unregister(key.data)
+                key.data.close()
+
+    def _wakeup(self) -> None:
+        try:
+            self._wakeup_w.send(b"\0")
+        except OSError:  # the buffer is full, or the server is shutdown
+            pass
+
+    def _clear_wakeup(self) -> None:
+        try:
+            while self._wakeup_r.recv(_RECV_SIZE):
+                pass
+        except OSError:
+            pass
+
+
+class _Connection:
+    """a client connection, the buffered reader is kept for reading following requests"""
+
+    def __init__(self, sock: socket.socket, client_address: typing.Any, timeout: float) -> None:  # pyre-ignore
+        # a response is sent by one write, TCP_NODELAY is set so that a response larger than the write buffer is
+        # not delayed by Nagle's algorithm until the client's delayed ACK (~40ms) on a keep-alive connection
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+        sock.settimeout(timeout)
+        self.socket = sock
+        self.client_address = client_address  # pyre-ignore
+        self.timeout = timeout
+        self.rfile: typing.BinaryIO = sock.makefile("rb")
+        self.rejected = False
+        self.drain_deadline: float = 0.0
+        # deadline of closing the connection when it is parked in the selector, None if it is not parked
+        self.deadline: typing.Optional[float] = None
+
+    def has_buffered_request(self) -> bool:
+        """returns True if bytes of the next request are read into the buffer, which is not seen by the selector"""
+
+        self.socket.setblocking(False)
+        try:
+            return len(self.rfile.peek(1)) > 0  # pyre-ignore
+        except OSError:
+            return False
+        finally:
+            self.socket.settimeout(self.timeout)
+
+    def reject(self) -> bool:
+        self.rejected = True
+        self.drain_deadline = time.monotonic() + _REJECT_DRAIN_SECS
+        try:
+            self.socket.setblocking(False)
+            self.socket.send(_REJECT_RESPONSE)
+            return True
+        except OSError:
+            return False
+
+    def drain(self) -> bool:
+        """reads and drops received bytes, returns False if the connection is closed by the client"""
+
+        try:
+            return len(self.socket.recv(_RECV_SIZE)) > 0
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def close(self) -> None:
+        try:
+            self.socket.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        self.rfile.close()
+        self.socket.close()
+
+
+class _HTTPServer(server.HTTPServer):
+    """binds the listening socket; connections are accepted and processed by `Server`"""
+
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, owner: Server, server_address: typing.Tuple[str, int]) -> None:
+        self.owner = owner
+        super().__init__(server_address, _Handler)
+
+    def handle_error(self, request: typing.Any, client_address: typing.Any) -> None:  # pyre-ignore
+        logger.exception("process request from %s failed", client_address)
+
+
+class _Handler(server.BaseHTTPRequestHandler):
+    """handles one request of a connection, the connection is not closed after the request is handled"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        conn: _Connection = self.request
+        self.owner: Server = self.server.owner  # pyre-ignore
+        self.connection = conn.socket
+        self.rfile = conn.rfile
+        # headers and body of a response are buffered and sent by one write when the buffer is flushed after the
+        # request is handled
+        self.wfile = conn.socket.makefile("wb")
+
+    def handle(self) -> None:
+        self.close_connection = True
+        self.handle_one_request()
+
+    def finish(self) -> None:
+        try:
+            if not self.wfile.closed:
+                self.wfile.flush()
+        except OSError:
+            self.close_connection = True
+        finally:
+            self.wfile.close()
+
+    def do_POST(self) -> None:
+        x_request_id = self.headers[X_REQUEST_ID]
+        jws_key_address = self.headers[X_REQUEST_SENDER_ADDRESS]
+        length_header = self.headers["content-length"]
+        if length_header is None:
+            return self.send_error(411)
+        try:
+            length = int(length_header)
+        except ValueError:
+            return self.send_error(400, f"invalid content-length: {length_header}")
+        if length < 0:
+            return self.send_error(400, f"invalid content-length: {length_header}")
+        if length > self.owner.max_request_size:
+            return self.send_error(413, f"request body is larger than {self.owner.max_request_size} bytes")
+
+        try:
+            content = self.rfile.read(length)
+            code, resp_body = self.owner.process_inbound_request(x_request_id, jws_key_address, content)
+        except Exception as e:
+            logger.exception(e)
+            return self.send_error(500, str(e))
+
+        self.send_response(code)
+        if x_request_id is not None:
+            self.send_header(X_REQUEST_ID, x_request_id)
+        self.send_header("Content-Length", str(len(resp_body)))
+        if self.owner.is_shutting_down():
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(resp_body)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:  # pyre-ignore
+        logger.debug("%s - %s", self.address_string(), format % args)
+
 
 def start_local(
     port: int,
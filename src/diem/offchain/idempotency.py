@@ -0,0 +1,195 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides IdempotencyCache for replaying responses of duplicated inbound requests.
+
+Counterparty retries a request when it times out, the retried request has the same cid and body. The
+IdempotencyCache wraps the inbound request processor given to `http_server.Server` or `http_server.start_local`,
+and returns the signed response bytes of the first processed request for the following duplicated requests,
+without verifying and processing the request again:
+
+```python
+
+>>> from diem import offchain
+>>> cache = offchain.idempotency.IdempotencyCache()
+>>> server = offchain.http_server.Server(cache.wrap(app.process_inbound_request))
+
+```
+
+A cached response is keyed by request sender address and the request cid peeked from the JWS payload without
+verifying the signature, and it is replayed only when the request body digest matches the body digest of
+the first request; hence a response is only replayed for the exact same signed request bytes.
+Only 200 responses are cached.
+
+The default backend keeps responses in memory, with bounded number of entries and TTL.
+`SqliteIdempotencyBackend` shares responses between processes by a SQLite database file, and other shared
+storages (e.g. Redis) can be plugged in by implementing `IdempotencyBackend`.
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from .http_server import ProcessInboundRequest
+from . import jws
+
+import hashlib, json, sqlite3, threading, time, typing
+
+DEFAULT_TTL_SECS: float = 600.0
+DEFAULT_MAX_ENTRIES: int = 100_000
+DEFAULT_SQLITE_TIMEOUT_SECS: float = 30.0
+
+Clock = typing.Callable[[], float]
+
+_DIGEST_SIZE: int = 32
+
+
+class IdempotencyBackend(ABC):
+    """IdempotencyBackend stores values by key with TTL"""
+
+    @abstractmethod
+    def get(self, key: str) -> typing.Optional[bytes]:
+        """returns None if the key is not found or expired"""
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_secs: float) -> None: ...
+
+
+class InMemoryIdempotencyBackend(IdempotencyBackend):
+    """InMemoryIdempotencyBackend keeps at most `max_entries` values, least recently used values are evicted first"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, clock: Clock = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, typing.Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl_secs: float) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl_secs, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteIdempotencyBackend(IdempotencyBackend):
+    """SqliteIdempotencyBackend shares values between processes by a SQLite database file in WAL journal mode
+
+    Expired values are deleted by `evict`, call it periodically.
+    """
+
+    def __init__(self, path: str, clock: Clock = time.time, timeout: float = DEFAULT_SQLITE_TIMEOUT_SECS) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._clock = clock
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS offchain_idempotency (
+                key TEXT PRIMARY KEY,
+                expire_at REAL NOT NULL,
+                value BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS offchain_idempotency_expire_at ON offchain_idempotency (expire_at);
+            """)
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        sql = "SELECT value FROM offchain_idempotency WHERE key = ? AND expire_at > ?"
+        row = self._conn().execute(sql, (key, self._clock())).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key: str, value: bytes, ttl_secs: float) -> None:
+        sql = "INSERT OR REPLACE INTO offchain_idempotency VALUES (?, ?, ?)"
+        self._conn().execute(sql, (key, self._clock() + ttl_secs, value))
+
+    def evict(self) -> int:
+        sql = "DELETE FROM offchain_idempotency WHERE expire_at <= ?"
+        return self._conn().execute(sql, (self._clock(),)).rowcount
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+@dataclass
+class IdempotencyStats:
+    hits: int = field(default=0)
+    misses: int = field(default=0)
+    # same sender address and cid, but different request body
+    conflicts: int = field(default=0)
+
+
+class IdempotencyCache:
+    """IdempotencyCache caches signed 200 responses of inbound requests for `ttl_secs`"""
+
+    def __init__(self, backend: typing.Optional[IdempotencyBackend] = None, ttl_secs: float = DEFAULT_TTL_SECS) -> None:
+        self.backend: IdempotencyBackend = backend or InMemoryIdempotencyBackend()
+        self.ttl_secs = ttl_secs
+        self.stats = IdempotencyStats()
+        self._stats_lock = threading.Lock()
+
+    def wrap(self, process_inbound_request: ProcessInboundRequest) -> ProcessInboundRequest:
+        """returns inbound request processor that replays cached responses"""
+
+        def process(x_request_id: str, request_sender_address: str, request_bytes: bytes) -> typing.Tuple[int, bytes]:
+            key = self.key(request_sender_address, request_bytes)
+            if key is None:
+                return process_inbound_request(x_request_id, request_sender_address, request_bytes)
+
+            digest = hashlib.sha256(request_bytes).digest()
+            response = self.get(key, digest)
+            if response is not None:
+                return (200, response)
+
+            code, response = process_inbound_request(x_request_id, request_sender_address, request_bytes)
+            if code == 200:
+                self.backend.set(key, digest + response, self.ttl_secs)
+            return (code, response)
+
+        return process
+
+    def key(self, request_sender_address: str, request_bytes: bytes) -> typing.Optional[str]:
+        """returns cache key of the request, or None if cid is not found from the request JWS payload"""
+
+        if not request_sender_address:
+            return None
+        try:
+            payload, _, _ = jws.deserialize_bytes(request_bytes)
+            cid = json.loads(payload).get("cid")
+        except (ValueError, AttributeError):
+            return None
+        if not cid or not isinstance(cid, str):
+            return None
+        return f"{request_sender_address}:{cid}"
+
+    def get(self, key: str, digest: bytes) -> typing.Optional[bytes]:
+        value = self.backend.get(key)
+        with self._stats_lock:
+            if value is None:
+                self.stats.misses += 1
+                return None
+            if value[:_DIGEST_SIZE] != digest:
+                self.stats.conflicts += 1
+                return None
+            self.stats.hits += 1
+        return value[_DIGEST_SIZE:]
@@ -19,38 +19,72 @@ def serialize(
     return serialize_string(to_json(obj), sign)
 
 
+def serialize_many(
+    objs: typing.Sequence[typing.Union[CommandRequestObject, CommandResponseObject]],
+    sign_many: typing.Callable[[typing.List[bytes]], typing.List[bytes]],
+) -> typing.List[bytes]:
+    """serialize objects into JWS messages, the signing messages are signed by one `sign_many` call
+
+    `sign_many` is called with the signing messages and returns signatures in the same order, e.g.
+    `diem.signer.Signer#sign_many`, which can sign the messages in a batch or concurrently.
+    """
+
+    msgs = [signing_message(encode_payload(to_json(obj))) for obj in objs]
+    return [join_signature(msg, sig) for msg, sig in zip(msgs, sign_many(msgs))]
+
+
+async def serialize_async(
+    obj: typing.Union[CommandRequestObject, CommandResponseObject],
+    sign: typing.Callable[[bytes], typing.Awaitable[bytes]],
+) -> bytes:
+    """serialize object into JWS message by an async sign function, e.g. `diem.signer.AsyncSigner#sign`"""
+
+    msg = signing_message(encode_payload(to_json(obj)))
+    return join_signature(msg, await sign(msg))
+
+
 def deserialize(
     msg: bytes,
     klass: typing.Type[T],
     verify: typing.Callable[[bytes, bytes], None],
 ) -> T:
-    decoded_body, sig, signing_msg = deserialize_string(msg)
+    body, sig, signing_msg = deserialize_bytes(msg)
 
     verify(sig, signing_msg)
-    return from_json(decoded_body, klass)
+    return from_json(body.decode(ENCODING), klass)
 
 
 def serialize_string(json: str, sign: typing.Callable[[bytes], bytes]) -> bytes:
-    payload = base64.urlsafe_b64encode(json.encode(ENCODING))
-    msg = signing_message(payload)
-    return b".".join([msg, base64.urlsafe_b64encode(sign(msg))])
+    msg = signing_message(encode_payload(json))
+    return join_signature(msg, sign(msg))
 
 
 def deserialize_string(msg: bytes) -> typing.Tuple[str, bytes, bytes]:
-    text = msg.decode(ENCODING)
-    parts = text.split(".")
-    if len(parts) != 3:
+    body, sig, signing_msg = deserialize_bytes(msg)
+    return (body.decode(ENCODING), sig, signing_msg)
+
+
+def deserialize_bytes(msg: bytes) -> typing.Tuple[bytes, bytes, bytes]:
+    """parse JWS compact message bytes, returns decoded payload bytes, signature and signing message
+
+    The message is parsed as bytes without decoding it into string, splitting and re-encoding the parts; the
+    signing message is sliced from the given message instead of joining the header and payload.
+    """
+
+    header_end = msg.find(b".")
+    payload_end = msg.find(b".", header_end + 1) if header_end >= 0 else -1
+    if payload_end < 0 or msg.find(b".", payload_end + 1) >= 0:
+        text = msg.decode(ENCODING)
         raise ValueError("invalid JWS compact message: %s, expect 3 parts: <header>.<payload>.<signature>" % text)
 
-    header, body, sig = parts
-    if header.encode(ENCODING) != PROTECTED_HEADER:
+    if header_end != len(PROTECTED_HEADER) or not msg.startswith(PROTECTED_HEADER):
+        header = msg[:header_end].decode(ENCODING)
         raise ValueError(f"invalid JWS message header: {header}, expect {PROTECTED_HEADER}")
 
-    body_bytes = body.encode(ENCODING)
     return (
-        decode(body_bytes).decode(ENCODING),
-        decode(sig.encode(ENCODING)),
-        signing_message(body_bytes),
+        decode(msg[header_end + 1 : payload_end]),
+        decode(msg[payload_end + 1 :]),
+        msg[:payload_end],
     )
 
 
@@ -58,8 +92,18 @@ def signing_message(payload: bytes) -> bytes:
     return b".".join([PROTECTED_HEADER, payload])
 
 
+def encode_payload(json: str) -> bytes:
+    return base64.urlsafe_b64encode(json.encode(ENCODING))
+
+
+def join_signature(signing_msg: bytes, sig: bytes) -> bytes:
+    return b".".join([signing_msg, base64.urlsafe_b64encode(sig)])
+
+
 def decode(msg: bytes) -> bytes:
-    return base64.urlsafe_b64decode(fix_padding(msg))
+    if len(msg) % 4:
+        return base64.urlsafe_b64decode(fix_padding(msg))
+    return base64.urlsafe_b64decode(msg)
 
 
 def fix_padding(input: bytes) -> bytes:
@@ -18,7 +18,15 @@ from .types import (
     validate_write_once_fields,
 )
 from .error import command_error
-from .payment_state import Action, Actor, MACHINE as payment_states, follow_up_action, summary, trigger_actor, R_SEND
+from .payment_state import (
+    Action,
+    Actor,
+    COMPILED_MACHINE as payment_states,
+    follow_up_action,
+    summary,
+    trigger_actor,
+    R_SEND,
+)
 from .state import ConditionValidationError, State
 from .command import Command
 from .. import diem_types, identifier, txnmetadata
@@ -30,6 +38,14 @@ class PaymentCommand(Command):
     payment: PaymentObject
     inbound: bool
     cid: str = dataclasses.field(default_factory=lambda: str(uuid.uuid4()))
+    # the command is immutable, results derived from the payment are cached on the command object
+    _state: typing.Optional[State[PaymentObject]] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # keyed by the hrp, the sender address is decoded by it
+    _travel_rule: typing.Optional[typing.Tuple[str, typing.Tuple[bytes, bytes]]] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     @staticmethod
     def init(
@@ -170,12 +186,16 @@ class PaymentCommand(Command):
         return self.my_actor().value
 
     def state(self) -> State[PaymentObject]:
+        if self._state is not None:
+            return self._state
         try:
-            return payment_states.match_state(self.payment)
+            state = payment_states.match_state(self.payment)
         except ConditionValidationError as e:
             fields = ", ".join(map(lambda f: f"command.payment.{f}", e.match_result.mismatched_fields))
             msg = f"payment object is invalid, missing: {fields}"
             raise command_error(ErrorCode.missing_field, msg, fields) from e
+        object.__setattr__(self, "_state", state)
+        return state
 
     def state_trigger_actor(self) -> Actor:
         return trigger_actor(self.state())
@@ -217,9 +237,16 @@ class PaymentCommand(Command):
         return self.travel_rule_metadata_and_sig_msg(hrp)[0]
 
     def travel_rule_metadata_and_sig_msg(self, hrp: str) -> typing.Tuple[bytes, bytes]:
-        return txnmetadata.travel_rule(
+        # the result is verified when receiving the recipient signature and used again when submitting the
+        # transaction
+        cached = self._travel_rule
+        if cached is not None and cached[0] == hrp:
+            return cached[1]
+        ret = txnmetadata.travel_rule(
             self.payment.reference_id, self.sender_account_address(hrp), self.payment.action.amount
         )
+        object.__setattr__(self, "_travel_rule", (hrp, ret))
+        return ret
 
     def __str__(self) -> str:
         return f"[payment#{self.cid} {self.my_actor_address} {summary(self.payment)}]"
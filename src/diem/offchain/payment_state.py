@@ -9,6 +9,7 @@ from .types import (
     KycDataObject,
 )
 from .state import (
+    CompiledMachine,
     Field,
     Machine,
     State,
@@ -124,6 +125,8 @@ MACHINE: Machine[PaymentObject] = build_machine(
     ]
 )
 
+COMPILED_MACHINE: CompiledMachine[PaymentObject] = MACHINE.compile(["sender.status.status", "receiver.status.status"])
+
 
 FOLLOW_UP: typing.Dict[State[PaymentObject], typing.Optional[typing.Tuple[Actor, Action]]] = {
     S_INIT: (Actor.RECEIVER, Action.EVALUATE_KYC_DATA),
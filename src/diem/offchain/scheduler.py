@@ -0,0 +1,290 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides Scheduler for running offchain follow up actions in background workers.
+
+A `Job` is an `Action` to be taken for the command of a reference id, e.g. the follow up action returned by
+`Command#follow_up_action`:
+
+```python
+
+>>> from diem import offchain
+>>> scheduler = offchain.scheduler.Scheduler(
+...     handlers={
+...         offchain.Action.EVALUATE_KYC_DATA: evaluate_kyc_data,
+...         offchain.Action.SUBMIT_TXN: submit_txn,
+...     },
+...     limits={offchain.Action.SUBMIT_TXN: len(child_vasps)},
+... )
+>>> scheduler.start()
+>>> scheduler.enqueue(command.follow_up_action(), command.reference_id())
+>>> scheduler.shutdown()
+
+```
+"""
+
+from concurrent.futures import Executor
+from dataclasses import dataclass, field, replace
+from .action import Action
+
+import heapq, itertools, logging, threading, time, typing, uuid
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS: int = 8
+DEFAULT_MAX_ATTEMPTS: int = 3
+DEFAULT_RETRY_DELAY_SECS: float = 0.1
+DEFAULT_MAX_RETRY_DELAY_SECS: float = 30.0
+
+
+@dataclass(frozen=True)
+class Job:
+    """Job is an action for the command of the reference id; the smaller priority value runs first"""
+
+    action: Action
+    reference_id: str
+    priority: int = field(default=0)
+    attempts: int = field(default=0)
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+
+@dataclass(frozen=True)
+class DeadLetter:
+    job: Job
+    error: Exception
+
+
+Handler = typing.Callable[[Job], typing.Any]  # pyre-ignore
+
+
+class JobPersistence:
+    """JobPersistence is the hooks for persisting jobs, the default implementation keeps nothing
+
+    `save` is called when a job is enqueued or rescheduled for retrying, `delete` is called when a job is
+    done, `dead_letter` is called when a job failed after max attempts. Jobs returned by `load` are enqueued
+    when the scheduler starts.
+    """
+
+    def load(self) -> typing.List[Job]:
+        return []
+
+    def save(self, job: Job) -> None:
+        pass
+
+    def delete(self, job: Job) -> None:
+        pass
+
+    def dead_letter(self, job: Job, error: Exception) -> None:
+        pass
+
+
+@dataclass
+class SchedulerStats:
+    completed: int = field(default=0)
+    retried: int = field(default=0)
+    dead: int = field(default=0)
+
+
+class Scheduler:
+    """Scheduler runs jobs by a pool of worker threads in priority order
+
+    1. Jobs are taken by priority, then by enqueued order.
+    2. At most `limits[action]` jobs of the action run at the same time, e.g. limit `Action.SUBMIT_TXN` jobs by
+       number of child VASP accounts available for submitting transactions. Jobs of an action are skipped when
+       the action reaches its limit, so other actions are not blocked.
+    3. A job failed with `retry_on` exception is rescheduled with exponential backoff delay until it reaches
+       `max_attempts`, then it is moved to dead letters; a job failed with other exceptions is moved to dead
+       letters directly.
+    4. When an `executor` is given, e.g. `concurrent.futures.ProcessPoolExecutor`, worker threads run handlers
+       by the executor, so that CPU bound handlers can scale with cores; the handlers and jobs must be
+       picklable for a process pool executor.
+    """
+
+    def __init__(
+        self,
+        handlers: typing.Dict[Action, Handler],
+        workers: int = DEFAULT_WORKERS,
+        limits: typing.Optional[typing.Dict[Action, int]] = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_on: typing.Type[Exception] = Exception,
+        retry_delay_secs: float = DEFAULT_RETRY_DELAY_SECS,
+        max_retry_delay_secs: float = DEFAULT_MAX_RETRY_DELAY_SECS,
+        persistence: typing.Optional[JobPersistence] = None,
+        executor: typing.Optional[Executor] = None,
+    ) -> None:
+        self.handlers = handlers
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_on = retry_on
+        self.retry_delay_secs = retry_delay_secs
+        self.max_retry_delay_secs = max_retry_delay_secs
+        self.persistence: JobPersistence = persistence or JobPersistence()
+        self.executor = executor
+        self.stats = SchedulerStats()
+
+        self._limits: typing.Dict[Action, int] = dict(limits or {})
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._queues: typing.Dict[Action, typing.List[typing.Tuple[int, int, Job]]] = {a: [] for a in Action}
+        self._delayed: typing.List[typing.Tuple[float, int, Job]] = []
+        self._running: typing.Dict[Action, int] = {a: 0 for a in Action}
+        self._dead_letters: typing.List[DeadLetter] = []
+        # ids of jobs queued, delayed or running; a job loaded from persistence is skipped if it is enqueued
+        self._job_ids: typing.Set[str] = set()
+        self._threads: typing.List[threading.Thread] = []
+        self._stopped = False
+
+    def start(self) -> "Scheduler":
+        """enqueue jobs loaded from persistence and start worker threads"""
+
+        with self._cond:
+            for job in self.persistence.load():
+                self._push(job)
+            self._stopped = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"offchain-scheduler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def enqueue(self, action: Action, reference_id: str, priority: int = 0) -> Job:
+        """create and enqueue a job
+
+        Raises `ValueError` if there is no handler for the action, and `RuntimeError` if the scheduler is shut down.
+        """
+
+        if action not in self.handlers:
+            raise ValueError(f"no handler for action: {action}")
+        if self._stopped:
+            raise RuntimeError("cannot enqueue job after shutdown")
+        job = Job(action=action, reference_id=reference_id, priority=priority)
+        self.persistence.save(job)
+        with self._cond:
+            self._push(job)
+            self._cond.notify()
+        return job
+
+    def set_limit(self, action: Action, limit: typing.Optional[int]) -> None:
+        """set max number of concurrent running jobs of the action, None for no limit"""
+
+        with self._cond:
+            if limit is None:
+                self._limits.pop(action, None)
+            else:
+                self._limits[action] = limit
+            self._cond.notify_all()
+
+    def dead_letters(self) -> typing.List[DeadLetter]:
+        with self._cond:
+            return list(self._dead_letters)
+
+    def pending(self) -> int:
+        """returns number of jobs waiting for running, including jobs waiting for retrying"""
+
+        with self._cond:
+            return sum(len(q) for q in self._queues.values()) + len(self._delayed)
+
+    def join(self, timeout: typing.Optional[float] = None) -> bool:
+        """wait until all jobs are done or moved to dead letters, returns False if timed out"""
+
+        with self._cond:
+            return self._cond.wait_for(lambda: self._is_idle(), timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """stop worker threads after their running jobs finished; pending jobs are left in the persistence"""
+
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                # stopped is checked before taking a job, so that pending jobs are left after shutdown
+                job = None if self._stopped else self._take()
+                while job is None:
+                    if self._stopped:
+                        return
+                    self._cond.wait(self._wait_timeout())
+                    job = None if self._stopped else self._take()
+                self._running[job.action] += 1
+
+            error = None
+            try:
+                self._run(job)
+            except Exception as e:
+                error = e
+            self._done(job, error)
+
+    def _run(self, job: Job) -> typing.Any:  # pyre-ignore
+        handler = self.handlers[job.action]
+        if self.executor:
+            return self.executor.submit(handler, job).result()
+        return handler(job)
+
+    def _done(self, job: Job, error: typing.Optional[Exception]) -> None:
+        retry = None
+        if error is None:
+            self._persist(self.persistence.delete, job)
+        elif isinstance(error, self.retry_on) and job.attempts + 1 < self.max_attempts:
+            retry = replace(job, attempts=job.attempts + 1)
+            self._persist(self.persistence.save, retry)
+        else:
+            logger.error("job %s failed: %s", job, error)
+            self._persist(self.persistence.dead_letter, job, error)
+
+        with self._cond:
+            self._running[job.action] -= 1
+            self._job_ids.discard(job.id)
+            if error is None:
+                self.stats.completed += 1
+            elif retry:
+                self.stats.retried += 1
+                delay = min(self.retry_delay_secs * (1 << job.attempts), self.max_retry_delay_secs)
+                heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), retry))
+                self._job_ids.add(retry.id)
+            else:
+                self.stats.dead += 1
+                self._dead_letters.append(DeadLetter(job=job, error=error))
+            self._cond.notify_all()
+
+    def _persist(self, hook: typing.Callable[..., None], *args: typing.Any) -> None:  # pyre-ignore
+        try:
+            hook(*args)
+        except Exception as e:
+            logger.exception("job persistence hook %s failed: %s", hook.__name__, e)
+
+    def _push(self, job: Job) -> None:
+        if job.id in self._job_ids:
+            return
+        self._job_ids.add(job.id)
+        heapq.heappush(self._queues[job.action], (job.priority, next(self._seq), job))
+
+    def _take(self) -> typing.Optional[Job]:
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            job = heapq.heappop(self._delayed)[2]
+            heapq.heappush(self._queues[job.action], (job.priority, next(self._seq), job))
+
+        candidate = None
+        for action, queue in self._queues.items():
+            if not queue:
+                continue
+            limit = self._limits.get(action)
+            if limit is not None and self._running[action] >= limit:
+                continue
+            if candidate is None or queue[0] < candidate[0]:
+                candidate = queue
+        return heapq.heappop(candidate)[2] if candidate else None
+
+    def _wait_timeout(self) -> typing.Optional[float]:
+        if self._delayed:
+            return max(0.0, self._delayed[0][0] - time.monotonic())
+        return None
+
+    def _is_idle(self) -> bool:
+        return not self._delayed and not any(self._queues.values()) and not any(self._running.values())
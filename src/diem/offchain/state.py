@@ -7,6 +7,11 @@ import dataclasses, typing, abc
 S = typing.TypeVar("S")
 T = typing.TypeVar("T")
 
+Predicate = typing.Callable[[T], bool]
+
+# returned by the compiled path accessor when a field on the path is not found
+_MISSING: object = object()
+
 
 @dataclasses.dataclass(frozen=True)
 class MatchResult:
@@ -37,6 +42,14 @@ class Condition(abc.ABC, typing.Generic[T]):
     def match(self, event_data: T) -> MatchResult:
         ...
 
+    def compile(self) -> Predicate[T]:
+        """returns a predicate function that returns `match(event_data).success`
+
+        The predicate does not collect matched / mismatched fields, it is used by `CompiledMachine`.
+        """
+
+        return lambda event_data: self.match(event_data).success
+
 
 @dataclasses.dataclass(frozen=True)
 class Field(Condition[T]):
@@ -54,6 +67,17 @@ class Field(Condition[T]):
             return MatchResult.create(val is None, [self.path])
         return MatchResult.create(val is not None, [self.path])
 
+    def compile(self) -> Predicate[T]:
+        get = _compile_path(self.path)
+        if self.not_set:
+            return lambda event_data: get(event_data) is None
+
+        def predicate(event_data: T) -> bool:
+            val = get(event_data)
+            return val is not None and val is not _MISSING
+
+        return predicate
+
 
 @dataclasses.dataclass(frozen=True)
 class Value(typing.Generic[T, S], Condition[T]):
@@ -68,6 +92,16 @@ class Value(typing.Generic[T, S], Condition[T]):
             val = getattr(val, f)
         return MatchResult.create(val == self.value, [self.path])
 
+    def compile(self) -> Predicate[T]:
+        get = _compile_path(self.path)
+        value = self.value
+
+        def predicate(event_data: T) -> bool:
+            val = get(event_data)
+            return val is not _MISSING and val == value
+
+        return predicate
+
 
 class ConditionValidationError(Exception):
     def __init__(self, validation: Condition[T], match_result: MatchResult) -> None:
@@ -93,6 +127,21 @@ class Require(Condition[T]):
 
         return ret
 
+    def compile(self) -> Predicate[T]:
+        conds = [cond.compile() for cond in self.conds]
+        validation = self.validation.compile() if self.validation else None
+
+        def predicate(event_data: T) -> bool:
+            for cond in conds:
+                if not cond(event_data):
+                    return False
+            if validation is not None and not validation(event_data):
+                # fallback to match for raising ConditionValidationError with the full match result
+                return self.match(event_data).success
+            return True
+
+        return predicate
+
     def __hash__(self) -> int:
         return hash(tuple(self.conds))
 
@@ -107,6 +156,11 @@ class State(typing.Generic[T]):
             return self.require.match(event_data)
         return MatchResult(success=True)
 
+    def compile(self) -> Predicate[T]:
+        if self.require:
+            return self.require.compile()
+        return lambda event_data: True
+
     def __str__(self) -> str:
         return self.id
 
@@ -155,6 +209,114 @@ class Machine(typing.Generic[T]):
     def match_states_and_results(self, event_data: T) -> typing.List[typing.Tuple[State[T], MatchResult]]:
         return [(state, state.match(event_data)) for state in self.states]
 
+    def compile(self, index_paths: typing.Sequence[str] = ()) -> "CompiledMachine[T]":
+        """create `CompiledMachine` that indexes states by the values of the given paths
+
+        The machine should not be changed after it is compiled.
+        """
+
+        return CompiledMachine(self, index_paths)
+
+
+class CompiledMachine(typing.Generic[T]):
+    """CompiledMachine matches states same with the `Machine` it is compiled from, but faster
+
+    1. States are indexed by the `Value` conditions of the index paths: a state requires the values of all
+       index paths is only evaluated for event data that has the same values; other states are always evaluated.
+    2. Conditions are compiled into predicate functions with precompiled path accessors.
+    3. Initial states and transitions are kept in sets.
+
+    The matched states and raised errors are same with `Machine`.
+    """
+
+    def __init__(self, machine: Machine[T], index_paths: typing.Sequence[str] = ()) -> None:
+        self.machine = machine
+        self.initials: typing.List[State[T]] = machine.initials
+        self.states: typing.List[State[T]] = machine.states
+        self.transitions: typing.List[Transition[T]] = machine.transitions
+
+        self._initials: typing.Set[State[T]] = set(machine.initials)
+        self._transitions: typing.Set[typing.Tuple[State[T], State[T]]] = {(t.state, t.to) for t in machine.transitions}
+        self._index_getters: typing.List[typing.Callable[[T], typing.Any]] = [_compile_path(p) for p in index_paths]
+
+        predicates = [(state, state.compile()) for state in machine.states]
+        indexes: typing.Dict[typing.Tuple[typing.Any, ...], typing.List[int]] = {}
+        unindexed = []
+        for i, state in enumerate(machine.states):
+            key = _index_key(state, index_paths)
+            if key is None:
+                unindexed.append(i)
+            else:
+                indexes.setdefault(key, []).append(i)
+
+        self._unindexed: typing.List[typing.Tuple[State[T], Predicate[T]]] = [predicates[i] for i in unindexed]
+        self._indexes: typing.Dict[typing.Tuple[typing.Any, ...], typing.List[typing.Tuple[State[T], Predicate[T]]]] = {
+            key: [predicates[i] for i in sorted(ids + unindexed)] for key, ids in indexes.items()
+        }
+
+    def is_initial(self, state: State[T]) -> bool:
+        return state in self._initials
+
+    def is_valid_transition(self, state: State[T], to: State[T], event_data: T) -> bool:
+        return (state, to) in self._transitions
+
+    def match_state(self, event_data: T) -> State[T]:
+        ret = self.match_states(event_data)
+        if not ret:
+            raise NoStateMatchedError(f"could not find state matches given event data({event_data})")
+        if len(ret) > 1:
+            raise TooManyStatesMatchedError(f"found multiple states({ret}) match given event data({event_data})")
+        return ret[0]
+
+    def match_states(self, event_data: T) -> typing.List[State[T]]:
+        return [state for state, predicate in self._candidates(event_data) if predicate(event_data)]
+
+    def match_states_and_results(self, event_data: T) -> typing.List[typing.Tuple[State[T], MatchResult]]:
+        return self.machine.match_states_and_results(event_data)
+
+    def _candidates(self, event_data: T) -> typing.List[typing.Tuple[State[T], Predicate[T]]]:
+        if not self._index_getters:
+            return self._unindexed
+        key = tuple(get(event_data) for get in self._index_getters)
+        try:
+            return self._indexes.get(key, self._unindexed)
+        except TypeError:  # unhashable value
+            return self._unindexed
+
+
+def _compile_path(path: str) -> typing.Callable[[typing.Any], typing.Any]:
+    """returns a function that gets the value of the given dot separated attribute path
+
+    The function returns a sentinel object when any field of the path is not found, or the parent is None.
+    """
+
+    names = tuple(path.split("."))
+
+    def get(obj: typing.Any) -> typing.Any:  # pyre-ignore
+        for name in names:
+            if obj is None:
+                return _MISSING
+            obj = getattr(obj, name, _MISSING)
+            if obj is _MISSING:
+                return _MISSING
+        return obj
+
+    return get
+
+
+def _index_key(state: State[T], index_paths: typing.Sequence[str]) -> typing.Optional[typing.Tuple[typing.Any, ...]]:
+    if not index_paths or state.require is None:
+        return None
+    values = {cond.path: cond.value for cond in state.require.conds if isinstance(cond, Value)}
+    if not all(path in values for path in index_paths):
+        return None
+    key = tuple(values[path] for path in index_paths)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
 
 def new_transition(state: State[T], to: State[T]) -> Transition[T]:
     return Transition(action=f"{state} -> {to}", state=state, to=to)
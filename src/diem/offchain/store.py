@@ -0,0 +1,325 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides storages for offchain commands.
+
+A command is saved by its reference id after it is validated with the prior command of the same reference id,
+the load, validate and save are processed atomically:
+
+```python
+
+>>> from diem import offchain
+>>> store = offchain.store.SqliteCommandStore("commands.db")
+>>> store.save(command)
+>>> store.get(command.reference_id())
+>>> store.get_by_cid(command.id())
+>>> store.find_by_status("R_SEND")
+>>> store.evict(max_age_secs=24 * 3600)
+
+```
+
+Commands are indexed by reference id, cid of the latest command, and status; for `PaymentCommand` the
+status is the id of the payment state, e.g. "S_INIT", "READY". Commands in final states (both actors are
+ready for settlement, or aborted) can be evicted after they are not updated for a while.
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from .command import Command
+from .payment_command import PaymentCommand
+from .types import PaymentObject, to_dict, from_dict
+
+import json, sqlite3, threading, time, typing
+
+DEFAULT_SHARDS: int = 64
+DEFAULT_SQLITE_TIMEOUT_SECS: float = 30.0
+
+Clock = typing.Callable[[], float]
+
+
+def command_status(command: Command) -> str:
+    """returns the status indexed for the command, it is payment state id for `PaymentCommand`"""
+
+    if isinstance(command, PaymentCommand):
+        return command.state().id
+    raise ValueError(f"unsupported command type: {type(command).__name__}")
+
+
+def is_final(command: Command) -> bool:
+    """returns True if the command is in a final state, which has no more offchain command to exchange"""
+
+    if isinstance(command, PaymentCommand):
+        return command.is_both_ready() or command.is_abort()
+    return False
+
+
+class CommandStore(ABC):
+    """CommandStore is the interface for saving and finding offchain commands by reference id"""
+
+    @abstractmethod
+    def save(self, command: Command) -> bool:
+        """validate the command with the prior command of the same reference id and save it atomically
+
+        Returns False if the command is same with the prior command, it is not saved again.
+        Raises `Error` raised by `Command#validate` when the command is invalid.
+        """
+        ...
+
+    @abstractmethod
+    def get(self, reference_id: str) -> typing.Optional[Command]: ...
+
+    @abstractmethod
+    def get_by_cid(self, cid: str) -> typing.Optional[Command]:
+        """returns latest command of the reference id, if its cid matches"""
+        ...
+
+    @abstractmethod
+    def find_by_status(self, status: str, limit: typing.Optional[int] = None) -> typing.List[Command]: ...
+
+    @abstractmethod
+    def delete(self, reference_id: str) -> bool: ...
+
+    @abstractmethod
+    def evict(self, max_age_secs: float = 0) -> int:
+        """delete commands in final states and not updated for `max_age_secs`, returns number of deleted commands"""
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+
+class _Record(typing.NamedTuple):
+    command: Command
+    status: str
+    final: bool
+    updated_at: float
+
+
+class _Shard:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.records: typing.Dict[str, _Record] = {}
+        # dicts are used as ordered sets of reference ids
+        self.by_status: typing.Dict[str, typing.Dict[str, None]] = {}
+        # reference ids of final commands, ordered by updated time
+        self.finals: typing.MutableMapping[str, float] = OrderedDict()
+
+
+class InMemoryCommandStore(CommandStore):
+    """InMemoryCommandStore keeps commands in memory shards
+
+    Commands are partitioned into `shards` by reference id, each shard is guarded by its own lock, hence
+    commands of different reference ids are saved concurrently with less contention.
+    """
+
+    def __init__(self, shards: int = DEFAULT_SHARDS, clock: Clock = time.time) -> None:
+        self._shards: typing.List[_Shard] = [_Shard() for _ in range(shards)]
+        self._cids: typing.Dict[str, str] = {}
+        self._cids_lock = threading.Lock()
+        self._clock = clock
+
+    def save(self, command: Command) -> bool:
+        ref_id = command.reference_id()
+        shard = self._shard(ref_id)
+        with shard.lock:
+            prior_record = shard.records.get(ref_id)
+            prior = prior_record.command if prior_record else None
+            if command == prior:
+                return False
+            command.validate(prior)
+            record = _Record(command, command_status(command), is_final(command), self._clock())
+            self._remove(shard, ref_id)
+            shard.records[ref_id] = record
+            shard.by_status.setdefault(record.status, {})[ref_id] = None
+            if record.final:
+                shard.finals[ref_id] = record.updated_at
+            with self._cids_lock:
+                self._cids[command.id()] = ref_id
+            return True
+
+    def get(self, reference_id: str) -> typing.Optional[Command]:
+        shard = self._shard(reference_id)
+        with shard.lock:
+            record = shard.records.get(reference_id)
+            return record.command if record else None
+
+    def get_by_cid(self, cid: str) -> typing.Optional[Command]:
+        with self._cids_lock:
+            ref_id = self._cids.get(cid)
+        if ref_id is None:
+            return None
+        command = self.get(ref_id)
+        return command if command and command.id() == cid else None
+
+    def find_by_status(self, status: str, limit: typing.Optional[int] = None) -> typing.List[Command]:
+        ret = []
+        for shard in self._shards:
+            with shard.lock:
+                for ref_id in shard.by_status.get(status, {}):
+                    if limit is not None and len(ret) >= limit:
+                        return ret
+                    ret.append(shard.records[ref_id].command)
+        return ret
+
+    def delete(self, reference_id: str) -> bool:
+        shard = self._shard(reference_id)
+        with shard.lock:
+            return self._remove(shard, reference_id)
+
+    def evict(self, max_age_secs: float = 0) -> int:
+        cutoff = self._clock() - max_age_secs
+        count = 0
+        for shard in self._shards:
+            with shard.lock:
+                while shard.finals:
+                    ref_id, updated_at = next(iter(shard.finals.items()))
+                    if updated_at > cutoff:
+                        break
+                    self._remove(shard, ref_id)
+                    count += 1
+        return count
+
+    def __len__(self) -> int:
+        return sum(len(shard.records) for shard in self._shards)
+
+    def _shard(self, reference_id: str) -> _Shard:
+        return self._shards[hash(reference_id) % len(self._shards)]
+
+    def _remove(self, shard: _Shard, ref_id: str) -> bool:
+        record = shard.records.pop(ref_id, None)
+        if record is None:
+            return False
+        refs = shard.by_status[record.status]
+        del refs[ref_id]
+        if not refs:
+            del shard.by_status[record.status]
+        shard.finals.pop(ref_id, None)
+        with self._cids_lock:
+            cid = record.command.id()
+            if self._cids.get(cid) == ref_id:
+                del self._cids[cid]
+        return True
+
+
+class SqliteCommandStore(CommandStore):
+    """SqliteCommandStore saves commands into a SQLite database file in WAL journal mode
+
+    Each thread uses its own connection; the load, validate and save of a command is processed in an immediate
+    transaction, so that it is atomic across threads and processes sharing the database file.
+    Only `PaymentCommand` is supported.
+    """
+
+    def __init__(self, path: str, clock: Clock = time.time, timeout: float = DEFAULT_SQLITE_TIMEOUT_SECS) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._clock = clock
+        self._local = threading.local()
+        self._connections: typing.List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS offchain_commands (
+                reference_id TEXT PRIMARY KEY,
+                cid TEXT NOT NULL,
+                status TEXT NOT NULL,
+                final INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS offchain_commands_cid ON offchain_commands (cid);
+            CREATE INDEX IF NOT EXISTS offchain_commands_status ON offchain_commands (status);
+            CREATE INDEX IF NOT EXISTS offchain_commands_final ON offchain_commands (final, updated_at);
+            """)
+
+    def save(self, command: Command) -> bool:
+        ref_id = command.reference_id()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM offchain_commands WHERE reference_id = ?", (ref_id,)).fetchone()
+            prior = _decode(row[0]) if row else None
+            if command == prior:
+                conn.execute("ROLLBACK")
+                return False
+            command.validate(prior)
+            conn.execute(
+                "INSERT OR REPLACE INTO offchain_commands VALUES (?, ?, ?, ?, ?, ?)",
+                (ref_id, command.id(), command_status(command), is_final(command), self._clock(), _encode(command)),
+            )
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, reference_id: str) -> typing.Optional[Command]:
+        return self._find_one("reference_id", reference_id)
+
+    def get_by_cid(self, cid: str) -> typing.Optional[Command]:
+        return self._find_one("cid", cid)
+
+    def find_by_status(self, status: str, limit: typing.Optional[int] = None) -> typing.List[Command]:
+        rows = self._conn().execute(
+            "SELECT data FROM offchain_commands WHERE status = ? LIMIT ?", (status, -1 if limit is None else limit)
+        )
+        return [_decode(row[0]) for row in rows]
+
+    def delete(self, reference_id: str) -> bool:
+        sql = "DELETE FROM offchain_commands WHERE reference_id = ?"
+        return self._conn().execute(sql, (reference_id,)).rowcount > 0
+
+    def evict(self, max_age_secs: float = 0) -> int:
+        cutoff = self._clock() - max_age_secs
+        sql = "DELETE FROM offchain_commands WHERE final = 1 AND updated_at <= ?"
+        return self._conn().execute(sql, (cutoff,)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM offchain_commands").fetchone()[0]
+
+    def _find_one(self, column: str, value: str) -> typing.Optional[Command]:
+        sql = f"SELECT data FROM offchain_commands WHERE {column} = ?"
+        row = self._conn().execute(sql, (value,)).fetchone()
+        return _decode(row[0]) if row else None
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit mode, the transaction of saving command is managed by BEGIN / COMMIT statements
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+
+def _encode(command: Command) -> str:
+    if not isinstance(command, PaymentCommand):
+        raise ValueError(f"unsupported command type: {type(command).__name__}")
+    return json.dumps(
+        {
+            "cid": command.cid,
+            "my_actor_address": command.my_actor_address,
+            "inbound": command.inbound,
+            "payment": to_dict(command.payment),
+        }
+    )
+
+
+def _decode(data: str) -> PaymentCommand:
+    obj = json.loads(data)
+    return PaymentCommand(
+        cid=obj["cid"],
+        my_actor_address=obj["my_actor_address"],
+        inbound=obj["inbound"],
+        payment=from_dict(obj["payment"], PaymentObject),
+    )
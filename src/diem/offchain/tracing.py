@@ -0,0 +1,197 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides stage level tracing for `Client#process_inbound_request`.
+
+A `Tracer` given to `offchain.Client` receives a span for each stage of processing an inbound request, tagged by
+the request's `X-Request-ID` header value:
+
+```python
+
+>>> from diem import offchain
+>>> exporter = offchain.tracing.LatencyExporter()
+>>> client = offchain.Client(address, jsonrpc_client, hrp, tracer=exporter)
+>>> client.process_inbound_request(request_sender_address, request_bytes, x_request_id=x_request_id)
+>>> print(exporter.format_summary())
+
+```
+
+Stages are:
+
+- `lookup_sender_key`: finding the request sender's compliance key by JSON-RPC.
+- `jws_parse`: parsing the JWS message.
+- `verify_signature`: verifying the JWS signature.
+- `decode`: decoding the JSON payload into `CommandRequestObject`.
+- `validate_addresses`: validating actor addresses and the request sender address.
+- `create_command`: finding the actor address of this VASP, which may call JSON-RPC `get_account`.
+- `dual_attestation`: checking the dual attestation limit by JSON-RPC `get_currencies` and `get_metadata`.
+- `recipient_signature`: verifying the recipient signature.
+- `total`: the whole processing.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+
+import logging, math, threading, time, typing
+
+DEFAULT_MAX_SAMPLES: int = 10_000
+DEFAULT_PERCENTILES: typing.Tuple[float, ...] = (50, 90, 99)
+
+STAGE_TOTAL: str = "total"
+
+
+class Tracer:
+    """Tracer is the base class for receiving spans, the default implementation does nothing
+
+    `span` is called by the thread processing the request, hence should be thread-safe and should not block.
+    """
+
+    def span(self, request_id: str, stage: str, duration_secs: float, error: typing.Optional[BaseException]) -> None:
+        pass
+
+
+class Span:
+    """Span is a context manager that reports the duration of the stage to the tracer when it exits"""
+
+    __slots__ = ("tracer", "request_id", "stage", "start")
+
+    def __init__(self, tracer: Tracer, request_id: str, stage: str) -> None:
+        self.tracer = tracer
+        self.request_id = request_id
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: typing.Any, exc: typing.Optional[BaseException], tb: typing.Any) -> None:
+        self.tracer.span(self.request_id, self.stage, time.perf_counter() - self.start, exc)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type: typing.Any, exc: typing.Optional[BaseException], tb: typing.Any) -> None:
+        pass
+
+
+NO_SPAN: _NoSpan = _NoSpan()
+
+SpanFactory = typing.Callable[[str], typing.Union[Span, _NoSpan]]
+
+
+def no_span(stage: str) -> _NoSpan:
+    return NO_SPAN
+
+
+def span_factory(tracer: typing.Optional[Tracer], request_id: str) -> SpanFactory:
+    """returns function creating span of the request by stage name, spans do nothing if tracer is None"""
+
+    if tracer is None:
+        return no_span
+    return lambda stage: Span(typing.cast(Tracer, tracer), request_id, stage)
+
+
+class LoggingTracer(Tracer):
+    """LoggingTracer logs spans, so that they can be correlated with other logs by the request id"""
+
+    def __init__(self, logger: typing.Optional[logging.Logger] = None, level: int = logging.DEBUG) -> None:
+        self.logger: logging.Logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def span(self, request_id: str, stage: str, duration_secs: float, error: typing.Optional[BaseException]) -> None:
+        if self.logger.isEnabledFor(self.level):
+            status = f"failed: {error!r}" if error else "ok"
+            self.logger.log(self.level, "[%s] %s %.3fms %s", request_id, stage, duration_secs * 1000, status)
+
+
+@dataclass
+class StageSummary:
+    count: int
+    errors: int
+    mean_secs: float
+    max_secs: float
+    # percentile => latency seconds
+    percentiles: typing.Dict[float, float] = field(default_factory=dict)
+
+
+class LatencyExporter(Tracer):
+    """LatencyExporter summarizes latency percentiles of each stage across requests
+
+    The latest `max_samples` durations of each stage are kept for calculating percentiles; count, errors, mean
+    and max are calculated from all spans since created or `reset`.
+    """
+
+    def __init__(self, max_samples: int = DEFAULT_MAX_SAMPLES) -> None:
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._stages: typing.Dict[str, "_StageStats"] = {}
+
+    def span(self, request_id: str, stage: str, duration_secs: float, error: typing.Optional[BaseException]) -> None:
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = _StageStats(deque(maxlen=self.max_samples))
+                self._stages[stage] = stats
+            stats.samples.append(duration_secs)
+            stats.count += 1
+            stats.total += duration_secs
+            stats.max = max(stats.max, duration_secs)
+            if error is not None:
+                stats.errors += 1
+
+    def summary(self, percentiles: typing.Sequence[float] = DEFAULT_PERCENTILES) -> typing.Dict[str, StageSummary]:
+        """returns summary of stages in the order they are first seen"""
+
+        with self._lock:
+            stages = [(name, s, sorted(s.samples)) for name, s in self._stages.items()]
+        return {
+            name: StageSummary(
+                count=s.count,
+                errors=s.errors,
+                mean_secs=s.total / s.count,
+                max_secs=s.max,
+                percentiles={p: percentile(samples, p) for p in percentiles},
+            )
+            for name, s, samples in stages
+        }
+
+    def format_summary(self, percentiles: typing.Sequence[float] = DEFAULT_PERCENTILES) -> str:
+        """returns summary as a text table, latencies are in milliseconds"""
+
+        headers = ["stage", "count", "errors", "mean"] + [f"p{p:g}" for p in percentiles] + ["max"]
+        rows = [headers]
+        for name, s in self.summary(percentiles).items():
+            latencies = [s.mean_secs] + [s.percentiles[p] for p in percentiles] + [s.max_secs]
+            rows.append([name, str(s.count), str(s.errors)] + [f"{v * 1000:.3f}" for v in latencies])
+        widths = [max(len(row[i]) for row in rows) for i in range(len(headers))]
+        return "\n".join(
+            "  ".join(col.ljust(w) if i == 0 else col.rjust(w) for i, (col, w) in enumerate(zip(row, widths)))
+            for row in rows
+        )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages = {}
+
+
+@dataclass
+class _StageStats:
+    samples: typing.Deque[float]
+    count: int = field(default=0)
+    errors: int = field(default=0)
+    total: float = field(default=0.0)
+    max: float = field(default=0.0)
+
+
+def percentile(sorted_samples: typing.Sequence[float], p: float) -> float:
+    """returns nearest-rank `p` percentile of the samples sorted in ascending order, 0.0 if there is no sample"""
+
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
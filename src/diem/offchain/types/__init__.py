@@ -25,7 +25,7 @@ from .payment_types import (
     PaymentCommandObject,
 )
 
-import dataclasses, json, re, secrets, typing, uuid
+import dataclasses, json, re, secrets, sys, threading, typing, uuid
 
 
 class FieldError(ValueError):
@@ -56,14 +56,84 @@ _OBJECT_TYPES: typing.Dict[str, typing.Any] = {
 _OBJECT_TYPE_FIELD_NAME = "_ObjectType"
 
 
+JsonDumps = typing.Callable[[typing.Any, typing.Optional[int]], str]
+
+
+def _json_dumps(obj: typing.Any, indent: typing.Optional[int]) -> str:  # pyre-ignore
+    return json.dumps(obj, indent=indent)
+
+
+_dumps: JsonDumps = _json_dumps
+
+
+def set_json_dumps(dumps: typing.Optional[JsonDumps]) -> None:
+    """set the function for dumping json object into json string used by `to_json`; None resets to `json.dumps`
+
+    The function is called with the json object and the indent argument. The JWS messages are signed on the
+    json string, so the output of the function should be same with `json.dumps(obj, indent=indent)` if the
+    signatures need to be reproducible by the other json library.
+    """
+
+    global _dumps
+    _dumps = dumps or _json_dumps
+
+
 def to_json(obj: T, indent: typing.Optional[int] = None) -> str:
-    if dataclasses.is_dataclass(obj):
-        raw = dataclasses.asdict(obj)
-    elif isinstance(obj, list):
-        raw = list(map(dataclasses.asdict, obj))
-    else:
-        raw = obj
-    return json.dumps(_delete_none(raw), indent=indent)
+    return _dumps(to_dict(obj), indent)
+
+
+def to_dict(obj: T) -> typing.Any:  # pyre-ignore
+    """convert dataclass object or a list of dataclass objects into json object, fields with None value are dropped
+
+    The result is same with `dataclasses.asdict` without None value fields, but the object is converted in one pass
+    by the encoder compiled for the dataclass. Fields not initialized by `__init__` (e.g. cached values derived
+    from the other fields) are dropped too.
+    """
+
+    if isinstance(obj, list):
+        return [_dataclass_encoder(type(item))(item) for item in obj]
+    return _encode_value(obj)
+
+
+_Encoder = typing.Callable[[typing.Any], typing.Dict[str, typing.Any]]
+_ENCODERS: typing.Dict[typing.Any, _Encoder] = {}
+_JSON_PRIMITIVE_TYPES: typing.FrozenSet[type] = frozenset([str, int, bool, float])
+
+
+def _dataclass_encoder(klass: typing.Any) -> _Encoder:  # pyre-ignore
+    encoder = _ENCODERS.get(klass)
+    if encoder is None:
+        if not dataclasses.is_dataclass(klass):
+            raise TypeError("asdict() should be called on dataclass instances")
+        names = [field.name for field in dataclasses.fields(klass) if field.init]
+
+        def encoder(obj: typing.Any) -> typing.Dict[str, typing.Any]:  # pyre-ignore
+            ret = {}
+            for name in names:
+                val = getattr(obj, name)
+                if val is None:
+                    continue
+                ret[name] = val if type(val) in _JSON_PRIMITIVE_TYPES else _encode_value(val)
+            return ret
+
+        _ENCODERS[klass] = encoder
+    return encoder
+
+
+def _encode_value(val: typing.Any) -> typing.Any:  # pyre-ignore
+    val_type = type(val)
+    if val is None or val_type in _JSON_PRIMITIVE_TYPES:
+        return val
+    encoder = _ENCODERS.get(val_type)
+    if encoder is not None:
+        return encoder(val)
+    if dataclasses.is_dataclass(val_type):
+        return _dataclass_encoder(val_type)(val)
+    if isinstance(val, (list, tuple)):
+        return [_encode_value(item) for item in val]
+    if isinstance(val, dict):
+        return {key: _encode_value(item) for key, item in val.items() if item is not None}
+    return val
 
 
 def from_json(data: str, klass: typing.Optional[typing.Type[T]] = None) -> T:
@@ -76,58 +146,141 @@ def from_dict(obj: typing.Any, klass: typing.Optional[typing.Type[T]], field_pat
             code = ErrorCode.invalid_field_value if field_path else ErrorCode.invalid_object
             raise FieldError(code, field_path, f"expect json object, but got {type(obj).__name__}: {obj}")
         klass = _find_object_type(obj, field_path)
-    return _from_dict(obj, klass, field_path)
+    return _decoder(klass)(obj, field_path)
+
 
+_Decoder = typing.Callable[[typing.Any, str], typing.Any]
+_DECODERS: typing.Dict[typing.Any, _Decoder] = {}
+_DECODERS_LOCK: threading.Lock = threading.Lock()
 
-def _from_dict(obj: typing.Any, klass: typing.Type[typing.Any], field_path: str) -> typing.Any:  # pyre-ignore
-    if not isinstance(obj, dict) or not dataclasses.is_dataclass(klass):
-        item_type = None
-        if hasattr(klass, "__origin__") and klass.__origin__ == list and hasattr(klass, "__args__"):
-            item_type = klass.__args__[0]
-            klass = list
+
+def _decoder(klass: typing.Any) -> _Decoder:  # pyre-ignore
+    """returns decoder function of the given type, the decoder is compiled once for each type
+
+    Decoders are compiled under a lock, and published into `_DECODERS` after all of them are compiled, so that
+    other threads never see a decoder that is still being compiled.
+    """
+
+    decoder = _DECODERS.get(klass)
+    if decoder is None:
+        with _DECODERS_LOCK:
+            decoder = _DECODERS.get(klass)
+            if decoder is None:
+                compiling: typing.Dict[typing.Any, _Decoder] = {}
+                decoder = _compile_decoder(klass, compiling)
+                _DECODERS.update(compiling)
+    return decoder
+
+
+def _compile_decoder(klass: typing.Any, compiling: typing.Dict[typing.Any, _Decoder]) -> _Decoder:  # pyre-ignore
+    decoder = _DECODERS.get(klass) or compiling.get(klass)
+    if decoder is None:
+        if dataclasses.is_dataclass(klass):
+            dataclass_decoder = _DataclassDecoder(klass)
+            # register before compiling fields, so that a field can refer to its enclosing type
+            compiling[klass] = dataclass_decoder
+            dataclass_decoder.compile(compiling)
+            decoder = dataclass_decoder
+        else:
+            decoder = _type_decoder(klass)
+            compiling[klass] = decoder
+    return decoder
+
+
+def _type_decoder(klass: typing.Any) -> _Decoder:  # pyre-ignore
+    if _is_union(klass):
+        return lambda obj, field_path: from_dict(obj, klass, field_path)
+
+    item_type = None
+    if hasattr(klass, "__origin__") and klass.__origin__ == list and hasattr(klass, "__args__"):
+        item_type = klass.__args__[0]
+        klass = list
+
+    def decode(obj: typing.Any, field_path: str) -> typing.Any:  # pyre-ignore
         if not isinstance(obj, klass):
             code = ErrorCode.invalid_field_value if field_path else ErrorCode.invalid_object
             raise FieldError(code, field_path, f"expect type {klass.__name__}, but got {type(obj).__name__}")
-        if klass == list and item_type:
+        if item_type:
             return [from_dict(item, item_type, field_path) for item in obj]
         return obj
 
-    unknown_fields = list(obj.keys())
-    for field in dataclasses.fields(klass):
-        if field.name in unknown_fields:
-            unknown_fields.remove(field.name)
-        obj[field.name] = _field_value_from_dict(field, obj, field_path)
-
-    if len(unknown_fields) > 0:
-        unknown_fields.sort()
-        full_name = _join_field_path(field_path, unknown_fields[0])
-        field_names = ", ".join(unknown_fields)
-        raise FieldError(ErrorCode.unknown_field, full_name, f"{field_path}: {field_names}")
-    return klass(**obj)
-
-
-def _field_value_from_dict(field: dataclasses.Field, obj: typing.Any, field_path: str) -> typing.Any:  # pyre-ignore
-    full_name = _join_field_path(field_path, field.name)
-    field_type = field.type
-    args = field.type.__args__ if hasattr(field.type, "__args__") else []
-    is_optional = len(args) == 2 and isinstance(None, args[1])  # pyre-ignore
-    if is_optional:
-        field_type = args[0]
-    val = obj.get(field.name)
-    if val is None:
-        if is_optional:
-            return None
-        raise FieldError(ErrorCode.missing_field, full_name, f"missing field: {full_name}")
+    return decode
 
-    valid_values = field.metadata.get("valid-values")
-    if valid_values:
-        if isinstance(valid_values, list) and val not in valid_values:
-            raise FieldError(ErrorCode.invalid_field_value, full_name, f"expect one of {valid_values}, but got: {val}")
-        if isinstance(valid_values, re.Pattern) and not valid_values.match(val):
-            raise FieldError(
-                ErrorCode.invalid_field_value, full_name, f"{val} does not match pattern {valid_values.pattern}"
-            )
-    return from_dict(val, field_type, full_name)
+
+class _FieldDecoder(typing.NamedTuple):
+    name: str
+    is_optional: bool
+    valid_values: typing.Any  # pyre-ignore
+    decode: _Decoder
+    intern: bool
+
+
+class _DataclassDecoder:
+    """decodes json object dict into dataclass object
+
+    Field types and metadata are resolved once when the decoder is compiled. The input dict is not changed.
+    String values of fields with metadata "intern" are interned, so that the decoded objects share the repeated
+    strings; it is only set on fields with a small set of values (e.g. status, currency and country codes), as
+    interned strings of other fields, like account identifiers, may grow the interned table without a bound.
+    """
+
+    def __init__(self, klass: typing.Any) -> None:  # pyre-ignore
+        self.klass = klass
+        self.fields: typing.List[_FieldDecoder] = []
+        self.field_names: typing.FrozenSet[str] = frozenset()
+        self.not_dict_decoder: _Decoder = _type_decoder(klass)
+
+    def compile(self, compiling: typing.Dict[typing.Any, _Decoder]) -> None:
+        fields = []
+        for field in dataclasses.fields(self.klass):
+            if not field.init:
+                continue
+            field_type = field.type
+            args = field.type.__args__ if hasattr(field.type, "__args__") else []
+            is_optional = len(args) == 2 and isinstance(None, args[1])  # pyre-ignore
+            if is_optional:
+                field_type = args[0]
+            valid_values = field.metadata.get("valid-values")
+            intern = bool(field.metadata.get("intern"))
+            decoder = _compile_decoder(field_type, compiling)
+            fields.append(_FieldDecoder(field.name, is_optional, valid_values, decoder, intern))
+        self.fields = fields
+        self.field_names = frozenset(f.name for f in fields)
+
+    def __call__(self, obj: typing.Any, field_path: str) -> typing.Any:  # pyre-ignore
+        if not isinstance(obj, dict):
+            return self.not_dict_decoder(obj, field_path)
+
+        values = {}
+        for field in self.fields:
+            val = obj.get(field.name)
+            if val is None:
+                if field.is_optional:
+                    values[field.name] = None
+                    continue
+                full_name = _join_field_path(field_path, field.name)
+                raise FieldError(ErrorCode.missing_field, full_name, f"missing field: {full_name}")
+
+            full_name = _join_field_path(field_path, field.name)
+            valid_values = field.valid_values
+            if valid_values:
+                if isinstance(valid_values, list) and val not in valid_values:
+                    raise FieldError(
+                        ErrorCode.invalid_field_value, full_name, f"expect one of {valid_values}, but got: {val}"
+                    )
+                if isinstance(valid_values, re.Pattern) and not valid_values.match(val):
+                    raise FieldError(
+                        ErrorCode.invalid_field_value, full_name, f"{val} does not match pattern {valid_values.pattern}"
+                    )
+            val = field.decode(val, full_name)
+            values[field.name] = sys.intern(val) if field.intern else val
+
+        if not self.field_names.issuperset(obj.keys()):
+            unknown_fields = sorted(set(obj.keys()) - self.field_names)
+            full_name = _join_field_path(field_path, unknown_fields[0])
+            field_names = ", ".join(unknown_fields)
+            raise FieldError(ErrorCode.unknown_field, full_name, f"{field_path}: {field_names}")
+        return self.klass(**values)
 
 
 def _join_field_path(path: str, field: str) -> str:
@@ -249,38 +402,79 @@ def entity_kyc_data(**kwargs) -> KycDataObject:  # pyre-ignore
 
 
 def validate_write_once_fields(path: str, new: typing.Any, prior: typing.Any) -> None:  # pyre-ignore
-    if new is None or prior is None:
+    """validate immutable and write once fields of the new object are not overwritten
+
+    Fields are validated by a precomputed plan of the dataclass, which has the constraint of each field and whether
+    the field type is a dataclass; values are compared only when they are not the same object, which is common for
+    objects created by `dataclasses.replace`.
+    Raises `InvalidOverwriteError` with the path of the overwritten field, or `TypeError` if the type of a field
+    value is changed.
+    """
+
+    if new is None or prior is None or new is prior:
         return
 
     new_type = type(new)
     if type(prior) != new_type:
         raise TypeError(f"field {path} type is different, expect {type(prior)}, but got {new_type}")
 
-    if not dataclasses.is_dataclass(new_type):
+    plan = _write_once_plan(new_type)
+    if plan is None:
         return
 
-    for field in dataclasses.fields(new_type):
-        prior_value = getattr(prior, field.name)
-        new_value = getattr(new, field.name)
-        field_path = path + "." + field.name
-        if field.metadata.get("immutable") and prior_value != new_value:
-            raise InvalidOverwriteError(field_path, prior_value, new_value, "immutable")
-        if field.metadata.get("write_once") and prior_value is not None and prior_value != new_value:
-            raise InvalidOverwriteError(field_path, prior_value, new_value, "write once")
-        validate_write_once_fields(field_path, new_value, prior_value)
+    for name, constraint, nested in plan:
+        prior_value = getattr(prior, name)
+        new_value = getattr(new, name)
+        if new_value is prior_value:
+            continue
+        if constraint is not None and prior_value != new_value:
+            if constraint == _IMMUTABLE:
+                raise InvalidOverwriteError(path + "." + name, prior_value, new_value, _IMMUTABLE)
+            if prior_value is not None:
+                raise InvalidOverwriteError(path + "." + name, prior_value, new_value, _WRITE_ONCE)
+        if nested:
+            validate_write_once_fields(path + "." + name, new_value, prior_value)
+        elif new_value is not None and prior_value is not None and type(new_value) is not type(prior_value):
+            raise TypeError(
+                f"field {path}.{name} type is different, expect {type(prior_value)}, but got {type(new_value)}"
+            )
+
 
+_IMMUTABLE: str = "immutable"
+_WRITE_ONCE: str = "write once"
+# dataclass => tuple of field name, the "immutable" or "write once" constraint, and whether the field type is a
+# dataclass, which is validated recursively. None for types that are not dataclass.
+_WriteOncePlan = typing.Tuple[typing.Tuple[str, typing.Optional[str], bool], ...]
+_WRITE_ONCE_PLANS: typing.Dict[typing.Any, typing.Optional[_WriteOncePlan]] = {}
+
+
+def _write_once_plan(klass: typing.Any) -> typing.Optional[_WriteOncePlan]:  # pyre-ignore
+    if klass in _WRITE_ONCE_PLANS:
+        return _WRITE_ONCE_PLANS[klass]
+    plan = None
+    if dataclasses.is_dataclass(klass):
+        # the plan of a field type is built when the field value is validated, hence a recursive type is fine
+        hints = typing.get_type_hints(klass)
+        plan = tuple(
+            (field.name, _field_constraint(field), bool(_dataclass_types(hints[field.name])))
+            for field in dataclasses.fields(klass)
+        )
+    _WRITE_ONCE_PLANS[klass] = plan
+    return plan
 
-def _delete_none(obj: typing.Any) -> typing.Any:  # pyre-ignore
-    if isinstance(obj, dict):
-        for key, val in list(obj.items()):
-            if val is None:
-                del obj[key]
-            else:
-                obj[key] = _delete_none(val)
-    elif isinstance(obj, list):
-        for val in obj:
-            _delete_none(val)
-    return obj
+
+def _dataclass_types(klass: typing.Any) -> typing.List[typing.Any]:  # pyre-ignore
+    if _is_union(klass):
+        return [t for arg in klass.__args__ for t in _dataclass_types(arg)]
+    return [klass] if dataclasses.is_dataclass(klass) else []
+
+
+def _field_constraint(field: dataclasses.Field) -> typing.Optional[str]:  # pyre-ignore
+    if field.metadata.get("immutable"):
+        return _IMMUTABLE
+    if field.metadata.get("write_once"):
+        return _WRITE_ONCE
+    return None
 
 
 def _find_object_type(obj: typing.Dict[str, typing.Any], field_path: str) -> typing.Type[typing.Any]:  # pyre-ignore
@@ -1,6 +1,7 @@
 # Copyright (c) The Diem Core Contributors
 # SPDX-License-Identifier: Apache-2.0
 
+import dataclasses
 import time
 import typing
 
@@ -31,42 +32,82 @@ class Status:
     soft_match = "soft_match"
 
 
+def _slots(cls: typing.Any) -> typing.Any:  # pyre-ignore
+    """recreates the frozen dataclass with `__slots__` of its fields
+
+    A slotted object has no `__dict__`, it takes about half of the memory of a regular dataclass object.
+    `dataclass(slots=True)` is only available since python 3.10.
+    """
+
+    names = tuple(f.name for f in dataclasses.fields(cls))
+    cls_dict = dict(cls.__dict__)
+    for name in names + ("__dict__", "__weakref__"):
+        # field default values are kept by the dataclass generated `__init__`
+        cls_dict.pop(name, None)
+    cls_dict["__slots__"] = names
+
+    # frozen object can't be restored by `setattr`, which is used by the default pickle and copy protocols
+    def __getstate__(self: typing.Any) -> typing.List[typing.Any]:  # pyre-ignore
+        return [getattr(self, name) for name in names]
+
+    def __setstate__(self: typing.Any, state: typing.List[typing.Any]) -> None:  # pyre-ignore
+        for name, value in zip(names, state):
+            object.__setattr__(self, name, value)
+
+    # the dataclass generated `__setattr__` and `__delattr__` refer to the original class by `super`
+    def __setattr__(self: typing.Any, name: str, value: typing.Any) -> None:  # pyre-ignore
+        raise dataclasses.FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self: typing.Any, name: str) -> None:  # pyre-ignore
+        raise dataclasses.FrozenInstanceError(f"cannot delete field {name!r}")
+
+    cls_dict["__getstate__"] = __getstate__
+    cls_dict["__setstate__"] = __setstate__
+    cls_dict["__setattr__"] = __setattr__
+    cls_dict["__delattr__"] = __delattr__
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
+@_slots
 @dataclass(frozen=True)
 class StatusObject:
     # Status of the payment from the perspective of this actor. Required
     status: str = datafield(
         metadata={
+            "intern": True,
             "valid-values": [
                 Status.none,
                 Status.needs_kyc_data,
                 Status.ready_for_settlement,
                 Status.abort,
                 Status.soft_match,
-            ]
+            ],
         }
     )
     # In the case of an abort status, this field may be used to describe the reason for the abort.
-    abort_code: typing.Optional[str] = datafield(default=None)
+    abort_code: typing.Optional[str] = datafield(default=None, metadata={"intern": True})
     # Additional details about this error. To be used only when code is populated
     abort_message: typing.Optional[str] = datafield(default=None)
 
 
+@_slots
 @dataclass(frozen=True)
 class NationalIdObject:
     # Indicates the national ID value - for example, a social security number
     id_value: str
     # Two-letter country code (https://en.wikipedia.org/wiki/ISO_3166-1_alpha-2)
-    country: typing.Optional[str] = datafield(default=None)
+    country: typing.Optional[str] = datafield(default=None, metadata={"intern": True})
     # Indicates the type of the ID
     type: typing.Optional[str] = datafield(default=None)
 
 
+@_slots
 @dataclass(frozen=True)
 class AddressObject:
     # The city, district, suburb, town, or village
     city: typing.Optional[str] = datafield(default=None)
     # Two-letter country code (https://en.wikipedia.org/wiki/ISO_3166-1_alpha-2)
-    country: typing.Optional[str] = datafield(default=None)
+    country: typing.Optional[str] = datafield(default=None, metadata={"intern": True})
     # Address line 1
     line1: typing.Optional[str] = datafield(default=None)
     # Address line 2 - apartment, unit, etc.
@@ -77,10 +118,13 @@ class AddressObject:
     state: typing.Optional[str] = datafield(default=None)
 
 
+@_slots
 @dataclass(frozen=True)
 class KycDataObject:
     # Must be either “individual” or “entity”. Required.
-    type: str = datafield(metadata={"valid-values": [KycDataObjectType.individual, KycDataObjectType.entity]})
+    type: str = datafield(
+        metadata={"intern": True, "valid-values": [KycDataObjectType.individual, KycDataObjectType.entity]}
+    )
     # Version identifier to allow modifications to KYC data Object without needing to bump version of entire API set. Set to 1
     payload_version: int = datafield(default=1, metadata={"valid-values": [1]})
     # Legal given name of the user for which this KYC data Object applies.
@@ -99,15 +143,17 @@ class KycDataObject:
     legal_entity_name: typing.Optional[str] = datafield(default=None)
 
 
+@_slots
 @dataclass(frozen=True)
 class PaymentActionObject:
     amount: int
-    currency: str
-    action: str = datafield(default="charge", metadata={"valid-values": ["charge"]})
+    currency: str = datafield(metadata={"intern": True})
+    action: str = datafield(default="charge", metadata={"intern": True, "valid-values": ["charge"]})
     # Unix timestamp (seconds) indicating the time that the payment Command was created.
     timestamp: int = datafield(default_factory=lambda: int(time.time()))
 
 
+@_slots
 @dataclass(frozen=True)
 class PaymentActorObject:
     address: str = datafield(metadata={"write_once": True})
@@ -117,6 +163,7 @@ class PaymentActorObject:
     additional_kyc_data: typing.Optional[str] = datafield(default=None, metadata={"write_once": True})
 
 
+@_slots
 @dataclass(frozen=True)
 class PaymentObject:
     reference_id: str = datafield(metadata={"valid-values": UUID_REGEX})
@@ -130,6 +177,7 @@ class PaymentObject:
     description: typing.Optional[str] = datafield(default=None, metadata={"write_once": True})
 
 
+@_slots
 @dataclass(frozen=True)
 class PaymentCommandObject:
     _ObjectType: str = datafield(metadata={"valid-values": [CommandType.PaymentCommand]})
@@ -0,0 +1,279 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides ScriptDecoder for decoding transaction scripts in bulk, e.g. for indexing transactions.
+
+`utils.decode_transaction_script` deserializes the whole `diem_types.Script` by the reflective BCS
+deserializer and looks up the script decoder by the whole bytecode for every transaction.
+ScriptDecoder reads the script bytes directly:
+
+1. The bytecode is dispatched by a short digest, and the first seen bytecode object is interned and shared
+   by all decoded scripts with the same bytecode.
+2. Serialized type arguments are cached in a LRU cache, since they are constant for scripts like
+   peer_to_peer_with_metadata in a currency.
+3. Only the transaction arguments are decoded for each script.
+
+The decoded `stdlib.ScriptCall` is same with the result of `utils.decode_transaction_script`.
+
+```python
+
+>>> from diem import script_decoder
+>>> decoder = script_decoder.ScriptDecoder()
+>>> for script_call in decoder.decode_transactions(client.get_transactions(1, 1000)):
+...     if script_call is not None:
+...         print(type(script_call).__name__)
+...
+>>> decoder.stats.transactions_per_second()
+
+```
+"""
+
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+import hashlib, os, threading, time, typing
+
+from . import bcs, diem_types, jsonrpc, stdlib, serde_types as st
+
+DEFAULT_CHUNK_SIZE: int = 1_000
+DEFAULT_TY_ARGS_CACHE_SIZE: int = 1_024
+
+_DIGEST_SIZE: int = 8
+_MAX_U32: int = (1 << 32) - 1
+
+_ScriptDecoderFn = typing.Callable[[diem_types.Script], stdlib.ScriptCall]
+
+
+@dataclass
+class DecodeStats:
+    """DecodeStats records decode throughput of a ScriptDecoder"""
+
+    transactions: int = field(default=0)
+    scripts: int = field(default=0)
+    seconds: float = field(default=0.0)
+
+    def transactions_per_second(self) -> float:
+        return self.transactions / self.seconds if self.seconds > 0 else 0.0
+
+    def scripts_per_second(self) -> float:
+        return self.scripts / self.seconds if self.seconds > 0 else 0.0
+
+
+class ScriptDecoder:
+    """ScriptDecoder decodes transaction script bytes into `stdlib.ScriptCall`
+
+    It is not thread-safe, create one ScriptDecoder for each thread.
+    """
+
+    def __init__(
+        self,
+        decoders: typing.Optional[typing.Dict[bytes, _ScriptDecoderFn]] = None,
+        ty_args_cache_size: int = DEFAULT_TY_ARGS_CACHE_SIZE,
+    ) -> None:
+        self._decoders: typing.Dict[bytes, _ScriptDecoderFn] = decoders or stdlib.SCRIPT_DECODER_MAP
+        # sent to the executor workers, None for the default decoders, which are not sent
+        self._custom_decoders = decoders or None
+        self._scripts: typing.Dict[bytes, typing.Tuple[bytes, _ScriptDecoderFn]] = {}
+        self._ty_args: "OrderedDict[bytes, typing.List[diem_types.TypeTag]]" = OrderedDict()
+        self._ty_args_cache_size = ty_args_cache_size
+        self.stats: DecodeStats = DecodeStats()
+
+    def decode(self, script: typing.Union[bytes, str]) -> stdlib.ScriptCall:
+        """decode BCS serialized `diem_types.Script` bytes or hex-encoded bytes
+
+        Raises `ValueError` if the script bytecode is unknown, or the bytes can't be deserialized.
+        """
+
+        data = bytes.fromhex(script) if isinstance(script, str) else script
+        code_len, offset = _read_uleb128(data, 0)
+        code_end = offset + code_len
+        if code_end > len(data):
+            raise st.DeserializationError("Input is too short")
+        code, decoder = self._find_script(memoryview(data)[offset:code_end])
+
+        ty_args_end = _skip_type_tags(data, code_end)
+        ty_args = self._find_ty_args(data[code_end:ty_args_end])
+
+        args_len, offset = _read_uleb128(data, ty_args_end)
+        args = []
+        for _ in range(args_len):
+            arg, offset = _read_transaction_argument(data, offset)
+            args.append(arg)
+        if offset != len(data):
+            raise st.DeserializationError("Some input bytes were not read")
+
+        self.stats.scripts += 1
+        return decoder(diem_types.Script(code=code, ty_args=list(ty_args), args=args))
+
+    def decode_transactions(
+        self,
+        txns: typing.Iterable[jsonrpc.Transaction],
+        executor: typing.Optional[Executor] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_pending_chunks: typing.Optional[int] = None,
+    ) -> typing.Iterator[typing.Optional[stdlib.ScriptCall]]:
+        """decode scripts of given transactions, yields results in the same order
+
+        Yields None for the transaction that has no script, e.g. block metadata transaction.
+        When an executor (e.g. `concurrent.futures.ProcessPoolExecutor`) is given, transactions are decoded in
+        chunks by the executor workers; hex-encoded script bytes and the custom `decoders` given to the constructor
+        are sent to the workers, so the custom decoders must be picklable for a process pool executor. Each worker
+        thread or process decodes by its own ScriptDecoder.
+        At most `max_pending_chunks` chunks (default 2 * executor workers) are submitted and not yielded yet,
+        so that the given transactions are read lazily as results are consumed.
+        """
+
+        if executor is None:
+            for txn in txns:
+                start = time.perf_counter()
+                script_bytes = txn.transaction.script_bytes
+                ret = self.decode(script_bytes) if script_bytes else None
+                self.stats.transactions += 1
+                self.stats.seconds += time.perf_counter() - start
+                yield ret
+            return
+
+        if max_pending_chunks is None:
+            max_pending_chunks = 2 * (getattr(executor, "_max_workers", None) or os.cpu_count() or 1)
+        chunks = _chunks((txn.transaction.script_bytes for txn in txns), chunk_size)
+        start = time.perf_counter()
+        pending: typing.Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_decode_chunk, chunk, self._custom_decoders, self._ty_args_cache_size))
+            if len(pending) >= max_pending_chunks:
+                yield from self._chunk_results(pending.popleft(), start)
+        while pending:
+            yield from self._chunk_results(pending.popleft(), start)
+
+    def _chunk_results(self, future: Future, start: float) -> typing.List[typing.Optional[stdlib.ScriptCall]]:
+        results = future.result()
+        self.stats.transactions += len(results)
+        self.stats.scripts += len(results) - results.count(None)
+        self.stats.seconds = time.perf_counter() - start
+        return results
+
+    def _find_script(self, code: memoryview) -> typing.Tuple[bytes, _ScriptDecoderFn]:
+        digest = hashlib.blake2b(code, digest_size=_DIGEST_SIZE).digest()
+        found = self._scripts.get(digest)
+        if found is None or found[0] != code:
+            code_bytes = code.tobytes()
+            decoder = self._decoders.get(code_bytes)
+            if decoder is None:
+                raise ValueError("Unknown script bytecode")
+            found = (code_bytes, decoder)
+            self._scripts[digest] = found
+        return found
+
+    def _find_ty_args(self, data: bytes) -> typing.List[diem_types.TypeTag]:
+        ty_args = self._ty_args.get(data)
+        if ty_args is None:
+            ty_args, _ = bcs.deserialize(data, typing.Sequence[diem_types.TypeTag])
+            self._ty_args[data] = ty_args
+            if len(self._ty_args) > self._ty_args_cache_size:
+                self._ty_args.popitem(last=False)
+        else:
+            self._ty_args.move_to_end(data)
+        return ty_args
+
+
+# ScriptDecoder of each executor worker thread or process, ScriptDecoder is not thread-safe
+_worker: threading.local = threading.local()
+
+
+def _decode_chunk(
+    scripts: typing.List[str],
+    decoders: typing.Optional[typing.Dict[bytes, _ScriptDecoderFn]],
+    ty_args_cache_size: int,
+) -> typing.List[typing.Optional[stdlib.ScriptCall]]:
+    decoder = getattr(_worker, "decoder", None)
+    if decoder is None or decoder._custom_decoders != decoders or decoder._ty_args_cache_size != ty_args_cache_size:
+        decoder = ScriptDecoder(decoders, ty_args_cache_size)
+        _worker.decoder = decoder
+    return [decoder.decode(script) if script else None for script in scripts]
+
+
+def _chunks(items: typing.Iterable[str], size: int) -> typing.Iterator[typing.List[str]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_uleb128(data: bytes, offset: int) -> typing.Tuple[int, int]:
+    value = 0
+    for shift in range(0, 32, 7):
+        if offset >= len(data):
+            raise st.DeserializationError("Input is too short")
+        byte = data[offset]
+        offset += 1
+        digit = byte & 0x7F
+        value |= digit << shift
+        if value > _MAX_U32:
+            break
+        if digit == byte:
+            if shift > 0 and digit == 0:
+                raise st.DeserializationError("Invalid uleb128 number (unexpected zero digit)")
+            return (value, offset)
+    raise st.DeserializationError("Overflow while parsing uleb128-encoded uint32 value")
+
+
+def _skip_bytes(data: bytes, offset: int) -> int:
+    length, offset = _read_uleb128(data, offset)
+    return offset + length
+
+
+def _skip_type_tags(data: bytes, offset: int) -> int:
+    length, offset = _read_uleb128(data, offset)
+    for _ in range(length):
+        offset = _skip_type_tag(data, offset)
+    return offset
+
+
+def _skip_type_tag(data: bytes, offset: int) -> int:
+    index, offset = _read_uleb128(data, offset)
+    if index == diem_types.TypeTag__Vector.INDEX:
+        return _skip_type_tag(data, offset)
+    if index == diem_types.TypeTag__Struct.INDEX:
+        offset += diem_types.AccountAddress.LENGTH
+        offset = _skip_bytes(data, offset)  # module
+        offset = _skip_bytes(data, offset)  # name
+        return _skip_type_tags(data, offset)  # type_params
+    # other variants have no value; invalid index is reported by the BCS deserializer
+    return offset
+
+
+def _read(data: bytes, offset: int, length: int) -> typing.Tuple[bytes, int]:
+    end = offset + length
+    if end > len(data):
+        raise st.DeserializationError("Input is too short")
+    return (data[offset:end], end)
+
+
+def _read_transaction_argument(data: bytes, offset: int) -> typing.Tuple[diem_types.TransactionArgument, int]:
+    index, offset = _read_uleb128(data, offset)
+    if index == diem_types.TransactionArgument__U8Vector.INDEX:
+        length, offset = _read_uleb128(data, offset)
+        value, offset = _read(data, offset, length)
+        return (diem_types.TransactionArgument__U8Vector(value=value), offset)
+    if index == diem_types.TransactionArgument__Address.INDEX:
+        value, offset = _read(data, offset, diem_types.AccountAddress.LENGTH)
+        return (diem_types.TransactionArgument__Address(value=diem_types.AccountAddress.from_bytes(value)), offset)
+    if index == diem_types.TransactionArgument__U64.INDEX:
+        value, offset = _read(data, offset, 8)
+        return (diem_types.TransactionArgument__U64(value=st.uint64(int.from_bytes(value, "little"))), offset)
+    if index == diem_types.TransactionArgument__U8.INDEX:
+        value, offset = _read(data, offset, 1)
+        return (diem_types.TransactionArgument__U8(value=st.uint8(value[0])), offset)
+    if index == diem_types.TransactionArgument__U128.INDEX:
+        value, offset = _read(data, offset, 16)
+        return (diem_types.TransactionArgument__U128(value=st.uint128(int.from_bytes(value, "little"))), offset)
+    if index == diem_types.TransactionArgument__Bool.INDEX:
+        value, offset = _read(data, offset, 1)
+        if value[0] > 1:
+            raise st.DeserializationError("Unexpected boolean value:", value[0])
+        return (diem_types.TransactionArgument__Bool(value=value[0] == 1), offset)
+    raise st.DeserializationError("Unexpected variant index", index)
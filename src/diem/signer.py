@@ -0,0 +1,295 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""This module provides signer interfaces for signing with keys held in or out of the process.
+
+`Signer` signs messages synchronously and `AsyncSigner` signs messages from an asyncio event loop; both have a
+batched `sign_many` variant, which a remote signing service can implement by one round trip. `LocalSigner` is the
+in-process implementation by an `Ed25519PrivateKey`.
+
+Signing by a remote service is dominated by the network latency, `PooledSigner` and `PooledAsyncSigner` wrap a
+signer for signing many messages at the same time:
+
+```python
+
+>>> from diem import offchain, signer
+>>> compliance_signer = signer.PooledSigner(RemoteSigner(...), max_concurrency=16)
+>>> requests_bytes = offchain.jws.serialize_many(requests, compliance_signer.sign_many)
+>>> client.send_command(command, compliance_signer.sign)
+>>> signed_txns = signer.PooledSigner(RemoteSigner(...)).sign_transactions(raw_txns)
+
+```
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from . import diem_types, hashing, utils
+
+import asyncio, threading, typing
+
+DEFAULT_MAX_CONCURRENCY: int = 16
+DEFAULT_BATCH_SIZE: int = 64
+
+RawTransactions = typing.Sequence[typing.Union[diem_types.RawTransaction, bytes]]
+
+
+class Signer(ABC):
+    """Signer signs messages by an ed25519 private key"""
+
+    @abstractmethod
+    def public_key_bytes(self) -> bytes: ...
+
+    @abstractmethod
+    def sign(self, msg: bytes) -> bytes: ...
+
+    def sign_many(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        """returns signatures of the messages in the same order, the default implementation signs one by one"""
+
+        return [self.sign(msg) for msg in msgs]
+
+    def sign_transaction(self, txn: typing.Union[diem_types.RawTransaction, bytes]) -> diem_types.SignedTransaction:
+        return self.sign_transactions([txn])[0]
+
+    def sign_transactions(self, txns: RawTransactions) -> typing.List[diem_types.SignedTransaction]:
+        """create signed transactions for given raw transactions or BCS serialized raw transaction bytes
+
+        The signing messages are signed by one `sign_many` call.
+        """
+
+        raw_txns, msgs = _raw_transactions_and_signing_msgs(txns)
+        return _signed_transactions(raw_txns, self.public_key_bytes(), self.sign_many(msgs))
+
+
+class AsyncSigner(ABC):
+    """AsyncSigner signs messages by an ed25519 private key from an asyncio event loop"""
+
+    @abstractmethod
+    def public_key_bytes(self) -> bytes: ...
+
+    @abstractmethod
+    async def sign(self, msg: bytes) -> bytes: ...
+
+    async def sign_many(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        """returns signatures of the messages in the same order, the default implementation signs concurrently"""
+
+        return list(await asyncio.gather(*[self.sign(msg) for msg in msgs]))
+
+    async def sign_transaction(
+        self, txn: typing.Union[diem_types.RawTransaction, bytes]
+    ) -> diem_types.SignedTransaction:
+        return (await self.sign_transactions([txn]))[0]
+
+    async def sign_transactions(self, txns: RawTransactions) -> typing.List[diem_types.SignedTransaction]:
+        raw_txns, msgs = _raw_transactions_and_signing_msgs(txns)
+        return _signed_transactions(raw_txns, self.public_key_bytes(), await self.sign_many(msgs))
+
+
+class LocalSigner(Signer):
+    """LocalSigner signs messages by the private key loaded in the process"""
+
+    def __init__(self, private_key: Ed25519PrivateKey) -> None:
+        self.private_key = private_key
+        self._public_key_bytes: bytes = utils.public_key_bytes(private_key.public_key())
+
+    def public_key_bytes(self) -> bytes:
+        return self._public_key_bytes
+
+    def sign(self, msg: bytes) -> bytes:
+        return self.private_key.sign(msg)
+
+
+class ExecutorAsyncSigner(AsyncSigner):
+    """ExecutorAsyncSigner runs a `Signer` by an executor, the default executor of the event loop is used if it
+    is not provided
+    """
+
+    def __init__(self, signer: Signer, executor: typing.Optional[Executor] = None) -> None:
+        self.signer = signer
+        self.executor = executor
+
+    def public_key_bytes(self) -> bytes:
+        return self.signer.public_key_bytes()
+
+    async def sign(self, msg: bytes) -> bytes:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.signer.sign, msg)
+
+    async def sign_many(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.signer.sign_many, list(msgs))
+
+
+class PooledSigner(Signer):
+    """PooledSigner signs messages by a bounded pool of worker threads calling the wrapped signer
+
+    1. Messages are signed by at most `max_concurrency` concurrent calls of the wrapped signer; messages of a
+       `sign_many` call are split into batches of `batch_size` for calling `sign_many` of the wrapped signer.
+    2. Requests for signing a message that is being signed are coalesced: they share the result of the first
+       request, as ed25519 signature of a message is deterministic.
+
+    Call `shutdown` to stop the worker threads when it is not used anymore.
+    """
+
+    def __init__(
+        self, signer: Signer, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        self.signer = signer
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="signer")
+        self._lock = threading.Lock()
+        self._signing: typing.Dict[bytes, "Future[bytes]"] = {}
+
+    def public_key_bytes(self) -> bytes:
+        return self.signer.public_key_bytes()
+
+    def sign(self, msg: bytes) -> bytes:
+        return self.submit(msg).result()
+
+    def sign_many(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        return [future.result() for future in self.submit_many(msgs)]
+
+    def submit(self, msg: bytes) -> "Future[bytes]":
+        return self.submit_many([msg])[0]
+
+    def submit_many(self, msgs: typing.Sequence[bytes]) -> typing.List["Future[bytes]"]:
+        """submit messages for signing, returns futures of the signatures in the same order"""
+
+        futures: typing.Dict[bytes, "Future[bytes]"] = {}
+        new_msgs = []
+        with self._lock:
+            for msg in msgs:
+                if msg in futures:
+                    continue
+                future = self._signing.get(msg)
+                if future is None:
+                    future = Future()
+                    self._signing[msg] = future
+                    new_msgs.append(msg)
+                futures[msg] = future
+
+        for i in range(0, len(new_msgs), self.batch_size):
+            batch = new_msgs[i : i + self.batch_size]
+            try:
+                self._executor.submit(self._sign_batch, batch)
+            except RuntimeError as e:
+                self._done(batch, None, e)
+        return [futures[msg] for msg in msgs]
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _sign_batch(self, msgs: typing.List[bytes]) -> None:
+        try:
+            sigs = self.signer.sign_many(msgs) if len(msgs) > 1 else [self.signer.sign(msgs[0])]
+        except Exception as e:
+            self._done(msgs, None, e)
+        else:
+            self._done(msgs, sigs, None)
+
+    def _done(
+        self, msgs: typing.List[bytes], sigs: typing.Optional[typing.List[bytes]], error: typing.Optional[Exception]
+    ) -> None:
+        if sigs is not None and len(sigs) != len(msgs):
+            sigs, error = None, _signatures_mismatch_error(msgs, sigs)
+        with self._lock:
+            futures = [self._signing.pop(msg) for msg in msgs]
+        for i, future in enumerate(futures):
+            # skips the future cancelled by the caller, it can't be resolved
+            if not future.set_running_or_notify_cancel():
+                continue
+            if sigs is None:
+                future.set_exception(typing.cast(Exception, error))
+            else:
+                future.set_result(sigs[i])
+
+
+class PooledAsyncSigner(AsyncSigner):
+    """PooledAsyncSigner is the asyncio version of `PooledSigner`
+
+    At most `max_concurrency` calls of the wrapped signer are awaited at the same time, and requests for signing
+    a message that is being signed are coalesced. Use it in one event loop.
+    """
+
+    def __init__(
+        self,
+        signer: AsyncSigner,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.signer = signer
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self._semaphore: typing.Optional[asyncio.Semaphore] = None
+        self._signing: typing.Dict[bytes, "asyncio.Future[bytes]"] = {}
+        # the event loop only keeps weak references to tasks
+        self._tasks: typing.Set["asyncio.Task[None]"] = set()
+
+    def public_key_bytes(self) -> bytes:
+        return self.signer.public_key_bytes()
+
+    async def sign(self, msg: bytes) -> bytes:
+        return (await self.sign_many([msg]))[0]
+
+    async def sign_many(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        if self._semaphore is None:
+            # created in the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        futures: typing.Dict[bytes, "asyncio.Future[bytes]"] = {}
+        new_msgs = []
+        for msg in msgs:
+            if msg in futures:
+                continue
+            future = self._signing.get(msg)
+            if future is None:
+                future = loop.create_future()
+                self._signing[msg] = future
+                new_msgs.append(msg)
+            futures[msg] = future
+
+        for i in range(0, len(new_msgs), self.batch_size):
+            task = loop.create_task(self._sign_batch(new_msgs[i : i + self.batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        # shielded, so that cancelling a caller does not cancel signing of the messages coalesced by other callers
+        return list(await asyncio.gather(*[asyncio.shield(futures[msg]) for msg in msgs]))
+
+    async def _sign_batch(self, msgs: typing.List[bytes]) -> None:
+        sigs = None
+        error = None
+        try:
+            async with typing.cast(asyncio.Semaphore, self._semaphore):
+                sigs = await self.signer.sign_many(msgs) if len(msgs) > 1 else [await self.signer.sign(msgs[0])]
+            if len(sigs) != len(msgs):
+                sigs, error = None, _signatures_mismatch_error(msgs, sigs)
+        except Exception as e:
+            error = e
+        finally:
+            # futures are resolved even if the task is cancelled, e.g. when the event loop is closing
+            for i, msg in enumerate(msgs):
+                future = self._signing.pop(msg)
+                if sigs is not None:
+                    future.set_result(sigs[i])
+                elif error is not None:
+                    future.set_exception(error)
+                else:
+                    future.cancel()
+
+
+def _signatures_mismatch_error(msgs: typing.List[bytes], sigs: typing.List[bytes]) -> ValueError:
+    return ValueError(f"expect {len(msgs)} signatures, but got {len(sigs)}")
+
+
+def _raw_transactions_and_signing_msgs(
+    txns: RawTransactions,
+) -> typing.Tuple[typing.List[diem_types.RawTransaction], typing.List[bytes]]:
+    raw_txns = [diem_types.RawTransaction.bcs_deserialize(t) if isinstance(t, bytes) else t for t in txns]
+    raw_txns_bytes = [t if isinstance(t, bytes) else t.bcs_serialize() for t in txns]
+    return (raw_txns, [hashing.raw_transaction_signing_msg(t) for t in raw_txns_bytes])
+
+
+def _signed_transactions(
+    raw_txns: typing.List[diem_types.RawTransaction], public_key_bytes: bytes, sigs: typing.List[bytes]
+) -> typing.List[diem_types.SignedTransaction]:
+    return [utils.create_signed_transaction(txn, public_key_bytes, sig) for txn, sig in zip(raw_txns, sigs)]
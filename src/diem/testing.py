@@ -0,0 +1,167 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Provides a stand-in JSON-RPC server of on-chain VASP accounts and a factory of offchain objects, for tests and
+benchmarks running without a Diem network.
+
+```python
+
+from diem import testing
+
+with testing.JsonRpcServer() as server:
+    sender = server.add_parent_vasp("http://localhost:8888")
+    client = server.offchain_client(sender)
+    payment = testing.Factory().new_payment_object(sender)
+
+```
+"""
+
+from . import diem_types, stdlib, testnet, offchain, identifier, jsonrpc, chain_ids, LocalAccount
+from .serde_types import uint64
+from http import server
+import json, threading, typing
+
+
+class Factory:
+    def hrp(self) -> str:
+        return identifier.TDM
+
+    def create_offchain_client(self, account, client):
+        return offchain.Client(account.account_address, client, self.hrp())
+
+    def new_payment_object(self, sender=LocalAccount.generate(), receiver=LocalAccount.generate()):
+        amount = 1_000_000_000_000
+        currency = testnet.TEST_CURRENCY_CODE
+        sender_account_id = sender.account_identifier(identifier.gen_subaddress())
+        sender_kyc_data = offchain.individual_kyc_data(
+            given_name="Jack",
+            surname="G",
+            address=offchain.AddressObject(city="San Francisco"),
+        )
+
+        receiver_account_id = receiver.account_identifier(identifier.gen_subaddress())
+
+        return offchain.new_payment_object(
+            sender_account_id,
+            sender_kyc_data,
+            receiver_account_id,
+            amount,
+            currency,
+        )
+
+    def new_sender_payment_command(self):
+        payment = self.new_payment_object()
+        return offchain.PaymentCommand(my_actor_address=payment.sender.address, payment=payment, inbound=False)
+
+    def new_raw_transaction(
+        self, sender: LocalAccount, sequence_number: int = 0, script: typing.Optional[diem_types.Script] = None
+    ) -> diem_types.RawTransaction:
+        if script is None:
+            script = stdlib.encode_rotate_dual_attestation_info_script(
+                new_url=b"http://localhost", new_key=sender.compliance_public_key_bytes
+            )
+        return diem_types.RawTransaction(  # pyre-ignore
+            sender=sender.account_address,
+            sequence_number=uint64(sequence_number),
+            payload=diem_types.TransactionPayload__Script(value=script),
+            max_gas_amount=uint64(1_000_000),
+            gas_unit_price=uint64(0),
+            gas_currency_code=testnet.TEST_CURRENCY_CODE,
+            expiration_timestamp_secs=uint64(1611792876),
+            chain_id=chain_ids.TESTNET,
+        )
+
+
+class JsonRpcServer:
+    """JsonRpcServer is a stand-in JSON-RPC server of on-chain VASP accounts
+
+    It responds accounts added, currencies and metadata, and accepts submitted transactions without executing
+    them. Methods are handled by the functions in `methods` taking the request params; replace or delete them
+    for changing responses, responses of methods not in `methods` are method not found errors.
+    """
+
+    def __init__(self) -> None:
+        self.accounts: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        self.calls: typing.Dict[str, int] = {}
+        self.submitted = 0
+        self.ledger_version = 1
+        self.methods: typing.Dict[str, typing.Callable[[typing.List[typing.Any]], typing.Any]] = {
+            "get_account": lambda params: self.accounts.get(params[0]),
+            "get_currencies": lambda params: [{"code": testnet.TEST_CURRENCY_CODE, "to_xdx_exchange_rate": 1.0}],
+            "get_metadata": lambda params: {"version": self.ledger_version, "dual_attestation_limit": 1_000_000_000},
+            "submit": self._submit,
+        }
+        self._lock = threading.Lock()
+        rpc = self
+
+        class Handler(server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                body = json.dumps(rpc.handle(request["id"], request["method"], request["params"])).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: typing.Any) -> None:
+                pass
+
+        self.httpd = server.ThreadingHTTPServer(("localhost", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://localhost:{self.httpd.server_address[1]}"
+
+    def handle(self, id: int, method: str, params: typing.List[typing.Any]) -> typing.Dict[str, typing.Any]:
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        resp: typing.Dict[str, typing.Any] = {"jsonrpc": "2.0", "id": id, "diem_chain_id": chain_ids.TESTNET.to_int()}
+        handler = self.methods.get(method)
+        if handler is None:
+            resp["error"] = {"code": -32601, "message": f"Method not found: {method}"}
+        else:
+            resp["result"] = handler(params)
+        # read after the method is handled, which may change the ledger version
+        resp["diem_ledger_version"] = self.ledger_version
+        resp["diem_ledger_timestampusec"] = self.ledger_version
+        return resp
+
+    def add_parent_vasp(self, base_url: str, account: typing.Optional[LocalAccount] = None) -> LocalAccount:
+        account = account or LocalAccount.generate()
+        address = account.account_address.to_hex()
+        self.accounts[address] = {
+            "address": address,
+            "role": {
+                "type": "parent_vasp",
+                "base_url": base_url,
+                "compliance_key": account.compliance_public_key_bytes.hex(),
+            },
+        }
+        return account
+
+    def add_child_vasp(self, parent: LocalAccount, account: typing.Optional[LocalAccount] = None) -> LocalAccount:
+        account = account or LocalAccount.generate()
+        address = account.account_address.to_hex()
+        self.accounts[address] = {
+            "address": address,
+            "role": {"type": "child_vasp", "parent_vasp_address": parent.account_address.to_hex()},
+        }
+        return account
+
+    def offchain_client(self, account: LocalAccount) -> offchain.Client:
+        return offchain.Client(account.account_address, jsonrpc.Client(self.url), identifier.TDM)
+
+    def _submit(self, params: typing.List[typing.Any]) -> None:
+        diem_types.SignedTransaction.bcs_deserialize(bytes.fromhex(params[0]))
+        with self._lock:
+            self.submitted += 1
+
+    def __enter__(self) -> "JsonRpcServer":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
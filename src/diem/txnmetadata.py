@@ -36,19 +36,28 @@ def travel_rule(
     """Create travel rule metadata bytes and signature message bytes.
 
     This is used for peer to peer transfer between 2 custodial accounts.
+    The result is same with BCS serializing `diem_types.Metadata__TravelRuleMetadata` and `Attest`, but the
+    bytes are concatenated directly.
     """
 
-    metadata = diem_types.Metadata__TravelRuleMetadata(
-        value=diem_types.TravelRuleMetadata__TravelRuleMetadataVersion0(
-            value=diem_types.TravelRuleMetadataV0(off_chain_reference_id=off_chain_reference_id)
-        )
-    )
+    # bcs(Metadata__TravelRuleMetadata(TravelRuleMetadata__TravelRuleMetadataVersion0(TravelRuleMetadataV0)))
+    if off_chain_reference_id is None:
+        metadata = _TRAVEL_RULE_METADATA_V0_PREFIX + b"\x00"
+    else:
+        reference_id = off_chain_reference_id.encode()
+        metadata = b"".join([_TRAVEL_RULE_METADATA_V0_PREFIX, b"\x01", utils.uleb128(len(reference_id)), reference_id])
 
     # receiver_bcs_data = bcs(metadata, sender_address, amount) + "@@$$DIEM_ATTEST$$@@" /*ASCII-encoded string*/
-    attest = Attest(metadata=metadata, sender_address=sender_address, amount=serde_types.uint64(amount))  # pyre-ignore
-    signing_msg = attest.bcs_serialize() + b"@@$$DIEM_ATTEST$$@@"
+    signing_msg = b"".join(
+        [metadata, sender_address.to_bytes(), int(amount).to_bytes(8, "little", signed=False), _ATTEST_SUFFIX]
+    )
+    return (metadata, signing_msg)
+
 
-    return (metadata.bcs_serialize(), signing_msg)
+_TRAVEL_RULE_METADATA_V0_PREFIX: bytes = utils.uleb128(diem_types.Metadata__TravelRuleMetadata.INDEX) + utils.uleb128(
+    diem_types.TravelRuleMetadata__TravelRuleMetadataVersion0.INDEX
+)
+_ATTEST_SUFFIX: bytes = b"@@$$DIEM_ATTEST$$@@"
 
 
 def decode_structure(
@@ -0,0 +1,134 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+"""Template based encoders for creating BCS serialized transaction payload and raw transaction bytes.
+
+The generic path for creating a peer to peer transaction builds `diem_types.Script` by
+`stdlib.encode_peer_to_peer_with_metadata_script`, wraps it with `diem_types.TransactionPayload__Script`
+and `diem_types.RawTransaction`, then serializes the whole object tree by the reflective BCS serializer.
+The functions in this module write the same bytes directly: the script bytecode and type arguments are
+constant for a currency, hence the payload bytes before the arguments are serialized once per currency
+by the generic serializer and cached.
+
+The output bytes are same with the generic path, and can be signed by `LocalAccount#sign_many` or
+`LocalAccount#sign_many_hex` directly:
+
+```python
+
+>>> from diem import txnpayload, testnet
+>>> payload = txnpayload.peer_to_peer_with_metadata_payload("XUS", payee, 1_000_000)
+>>> txn = txnpayload.raw_transaction_bytes(sender, seq, payload, 1_000_000, 0, "XUS", expire_at, testnet.CHAIN_ID)
+>>> signed_txn_hex = account.sign_many_hex([txn])[0]
+
+```
+"""
+
+import functools, typing
+
+from . import diem_types, stdlib, utils
+
+# BCS variant index of TransactionArgument used by the peer_to_peer_with_metadata script arguments.
+_ADDRESS_ARG: bytes = utils.uleb128(diem_types.TransactionArgument__Address.INDEX)
+_U64_ARG: bytes = utils.uleb128(diem_types.TransactionArgument__U64.INDEX)
+_U8_VECTOR_ARG: bytes = utils.uleb128(diem_types.TransactionArgument__U8Vector.INDEX)
+_P2P_ARGS_LEN: bytes = utils.uleb128(4)
+
+
+def peer_to_peer_with_metadata_payload(
+    currency: str,
+    payee: typing.Union[diem_types.AccountAddress, bytes, str],
+    amount: int,
+    metadata: bytes = b"",
+    metadata_signature: bytes = b"",
+) -> bytes:
+    """create BCS serialized `diem_types.TransactionPayload__Script` bytes for peer_to_peer_with_metadata script
+
+    The result is same with:
+
+    ```python
+    diem_types.TransactionPayload__Script(
+        value=stdlib.encode_peer_to_peer_with_metadata_script(
+            currency=utils.currency_code(currency),
+            payee=utils.account_address(payee),
+            amount=amount,
+            metadata=metadata,
+            metadata_signature=metadata_signature,
+        )
+    ).bcs_serialize()
+    ```
+    """
+
+    return b"".join(
+        [
+            _peer_to_peer_with_metadata_payload_prefix(currency),
+            _ADDRESS_ARG,
+            _address_bytes(payee),
+            _U64_ARG,
+            _u64(amount),
+            _U8_VECTOR_ARG,
+            utils.uleb128(len(metadata)),
+            metadata,
+            _U8_VECTOR_ARG,
+            utils.uleb128(len(metadata_signature)),
+            metadata_signature,
+        ]
+    )
+
+
+def raw_transaction_bytes(
+    sender: typing.Union[diem_types.AccountAddress, bytes, str],
+    sequence_number: int,
+    payload: bytes,
+    max_gas_amount: int,
+    gas_unit_price: int,
+    gas_currency_code: str,
+    expiration_timestamp_secs: int,
+    chain_id: typing.Union[diem_types.ChainId, int],
+) -> bytes:
+    """create BCS serialized `diem_types.RawTransaction` bytes with serialized transaction payload bytes
+
+    The payload bytes can be created by `peer_to_peer_with_metadata_payload` or by
+    `diem_types.TransactionPayload#bcs_serialize`.
+    """
+
+    chain_id_int = chain_id.to_int() if isinstance(chain_id, diem_types.ChainId) else chain_id
+    gas_currency_code_bytes = gas_currency_code.encode()
+    return b"".join(
+        [
+            _address_bytes(sender),
+            _u64(sequence_number),
+            payload,
+            _u64(max_gas_amount),
+            _u64(gas_unit_price),
+            utils.uleb128(len(gas_currency_code_bytes)),
+            gas_currency_code_bytes,
+            _u64(expiration_timestamp_secs),
+            int(chain_id_int).to_bytes(1, "little", signed=False),
+        ]
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _peer_to_peer_with_metadata_payload_prefix(currency: str) -> bytes:
+    # Script arguments is the last field of the payload, serialize the payload with no arguments by
+    # the generic serializer, and replace the empty arguments length with the arguments length.
+    payload = diem_types.TransactionPayload__Script(
+        value=diem_types.Script(
+            code=stdlib.PEER_TO_PEER_WITH_METADATA_CODE,
+            ty_args=[utils.currency_code(currency)],
+            args=[],
+        )
+    ).bcs_serialize()
+    return payload[:-1] + _P2P_ARGS_LEN
+
+
+def _address_bytes(address: typing.Union[diem_types.AccountAddress, bytes, str]) -> bytes:
+    if isinstance(address, bytes):
+        if len(address) != utils.ACCOUNT_ADDRESS_LEN:
+            raise utils.InvalidAccountAddressError(f"Incorrect length for an account address: {address.hex()}")
+        return address
+    return utils.account_address_bytes(address)
+
+
+def _u64(value: int) -> bytes:
+    return int(value).to_bytes(8, "little", signed=False)
@@ -3,17 +3,20 @@
 
 """Utilities for data type converting, construction and hashing."""
 
+from concurrent.futures import Executor
+from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey, Ed25519PrivateKey
+import functools
 import hashlib
 import typing
 
-from . import diem_types, jsonrpc, stdlib
+from . import diem_types, jsonrpc, stdlib, hashing
 
 
 ACCOUNT_ADDRESS_LEN: int = diem_types.AccountAddress.LENGTH
 SUB_ADDRESS_LEN: int = 8
-DIEM_HASH_PREFIX: bytes = b"DIEM::"
+DIEM_HASH_PREFIX: bytes = hashing.DIEM_HASH_PREFIX
 ROOT_ADDRESS: str = "0000000000000000000000000a550c18"
 TREASURY_ADDRESS: str = "0000000000000000000000000b1e55ed"
 CORE_CODE_ADDRESS: str = "00000000000000000000000000000001"
@@ -84,6 +87,56 @@ def public_key_bytes(public_key: Ed25519PublicKey) -> bytes:
     return public_key.public_bytes(encoding=serialization.Encoding.Raw, format=serialization.PublicFormat.Raw)
 
 
+@functools.lru_cache(maxsize=1024)
+def ed25519_public_key_from_hex(public_key_hex: str) -> Ed25519PublicKey:
+    """create Ed25519PublicKey from hex-encoded public key bytes, the result is cached by the given hex string
+
+    Ed25519PublicKey is immutable, the cached object is shared by callers.
+    """
+
+    return Ed25519PublicKey.from_public_bytes(bytes.fromhex(public_key_hex))
+
+
+SignatureTriple = typing.Tuple[typing.Union[Ed25519PublicKey, bytes], bytes, bytes]
+
+
+def verify_signatures(
+    triples: typing.Sequence[SignatureTriple],
+    executor: typing.Optional[Executor] = None,
+    chunk_size: int = 256,
+) -> typing.List[bool]:
+    """verify (public key, message, signature) triples of ed25519 signatures, returns results in the given order
+
+    A public key can be `Ed25519PublicKey` or raw public key bytes. When an `executor` is given, e.g.
+    `concurrent.futures.ProcessPoolExecutor`, the triples are verified by chunks of `chunk_size` on the executor
+    workers; public keys are converted into raw bytes, so that the chunks are picklable.
+    """
+
+    if executor is None:
+        return _verify_signatures(triples)
+    items = [(pk if isinstance(pk, bytes) else public_key_bytes(pk), msg, sig) for pk, msg, sig in triples]
+    chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    return [ok for results in executor.map(_verify_signatures, chunks) for ok in results]
+
+
+def _verify_signatures(triples: typing.Sequence[SignatureTriple]) -> typing.List[bool]:
+    ret = []
+    for public_key, msg, sig in triples:
+        try:
+            if isinstance(public_key, bytes):
+                public_key = _ed25519_public_key_from_bytes(public_key)
+            public_key.verify(sig, msg)
+            ret.append(True)
+        except (ValueError, InvalidSignature):
+            ret.append(False)
+    return ret
+
+
+@functools.lru_cache(maxsize=1024)
+def _ed25519_public_key_from_bytes(public_key: bytes) -> Ed25519PublicKey:
+    return Ed25519PublicKey.from_public_bytes(public_key)
+
+
 def private_key_bytes(private_key: Ed25519PrivateKey) -> bytes:
     """convert cryptography.hazmat.primitives.asymmetric.ed25519.Ed25519PrivateKey into raw bytes"""
 
@@ -117,10 +170,29 @@ def create_signed_transaction(
     return diem_types.SignedTransaction.from_raw_txn_and_ed25519_key(txn, public_key, signature)
 
 
+def signed_transaction_bytes(raw_txn_bytes: bytes, public_key: bytes, signature: bytes) -> bytes:
+    """create BCS serialized `diem_types.SignedTransaction` bytes from serialized raw transaction bytes
+
+    The result is same with `create_signed_transaction(txn, public_key, signature).bcs_serialize()`, but
+    it only concatenates the Ed25519 authenticator bytes to the given raw transaction bytes.
+    """
+
+    return b"".join(
+        [
+            raw_txn_bytes,
+            _ED25519_AUTHENTICATOR_INDEX,
+            uleb128(len(public_key)),
+            public_key,
+            uleb128(len(signature)),
+            signature,
+        ]
+    )
+
+
 def raw_transaction_signing_msg(txn: diem_types.RawTransaction) -> bytes:
     """create signing message from given `diem_types.RawTransaction`"""
 
-    return diem_hash_seed(b"RawTransaction") + txn.bcs_serialize()
+    return hashing.raw_transaction_signing_msg(txn.bcs_serialize())
 
 
 def transaction_hash(txn: diem_types.SignedTransaction) -> str:
@@ -129,12 +201,11 @@ def transaction_hash(txn: diem_types.SignedTransaction) -> str:
     This hash string matches jsonrpc.Transaction#hash returned from Diem JSON-RPC API.
     """
 
-    user_txn = diem_types.Transaction__UserTransaction(value=txn)
-    return hash(diem_hash_seed(b"Transaction"), user_txn.bcs_serialize()).hex()
+    return hashing.transaction_hash(txn)
 
 
 def diem_hash_seed(typ: bytes) -> bytes:
-    return hash(DIEM_HASH_PREFIX, typ)
+    return hashing.hash_seed(typ)
 
 
 def hash(b1: bytes, b2: bytes) -> bytes:
@@ -167,6 +238,20 @@ def decode_transaction_script(
     raise TypeError(f"unknown transaction type: {txn}")
 
 
+def uleb128(value: int) -> bytes:
+    """encode given unsigned integer as uleb128 bytes, which is used by BCS for sequence length and variant index"""
+
+    ret = bytearray()
+    while value >= 0x80:
+        ret.append((value & 0x7F) | 0x80)
+        value >>= 7
+    ret.append(value)
+    return bytes(ret)
+
+
+_ED25519_AUTHENTICATOR_INDEX: bytes = uleb128(diem_types.TransactionAuthenticator__Ed25519.INDEX)
+
+
 def balance(account: jsonrpc.Account, currency: str) -> int:
     for b in account.balances:
         if b.currency == currency:
@@ -2,7 +2,8 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
-from diem import testnet, offchain, identifier, chain_ids, LocalAccount
+from diem import testnet, chain_ids
+from diem.testing import Factory, JsonRpcServer
 from os import getenv, system
 import pytest
 
@@ -27,33 +28,7 @@ def factory():
     return Factory()
 
 
-class Factory:
-    def hrp(self) -> str:
-        return identifier.TDM
-
-    def create_offchain_client(self, account, client):
-        return offchain.Client(account.account_address, client, self.hrp())
-
-    def new_payment_object(self, sender=LocalAccount.generate(), receiver=LocalAccount.generate()):
-        amount = 1_000_000_000_000
-        currency = testnet.TEST_CURRENCY_CODE
-        sender_account_id = sender.account_identifier(identifier.gen_subaddress())
-        sender_kyc_data = offchain.individual_kyc_data(
-            given_name="Jack",
-            surname="G",
-            address=offchain.AddressObject(city="San Francisco"),
-        )
-
-        receiver_account_id = receiver.account_identifier(identifier.gen_subaddress())
-
-        return offchain.new_payment_object(
-            sender_account_id,
-            sender_kyc_data,
-            receiver_account_id,
-            amount,
-            currency,
-        )
-
-    def new_sender_payment_command(self):
-        payment = self.new_payment_object()
-        return offchain.PaymentCommand(my_actor_address=payment.sender.address, payment=payment, inbound=False)
+@pytest.fixture
+def json_rpc_server():
+    with JsonRpcServer() as rpc:
+        yield rpc
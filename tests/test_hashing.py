@@ -0,0 +1,52 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import diem_types, hashing, utils, LocalAccount
+import hashlib
+
+
+def test_hash_seed():
+    assert hashing.hash_seed(b"RawTransaction") == hashlib.sha3_256(b"DIEM::RawTransaction").digest()
+    assert hashing.hash_seed(b"Transaction") == hashlib.sha3_256(b"DIEM::Transaction").digest()
+    assert utils.diem_hash_seed(b"Transaction") == hashing.hash_seed(b"Transaction")
+
+
+def test_new_hasher_returns_independent_seeded_states():
+    h1 = hashing.new_hasher(b"Transaction")
+    h2 = hashing.new_hasher(b"Transaction")
+    h1.update(b"hello")
+    assert h2.digest() == hashlib.sha3_256(hashing.hash_seed(b"Transaction")).digest()
+    assert h1.digest() == utils.hash(hashing.hash_seed(b"Transaction"), b"hello")
+
+
+def test_raw_transaction_signing_msg(factory):
+    txn = signed_txn(factory).raw_txn
+    expected = hashlib.sha3_256(b"DIEM::RawTransaction").digest() + txn.bcs_serialize()
+    assert hashing.raw_transaction_signing_msg(txn.bcs_serialize()) == expected
+    assert utils.raw_transaction_signing_msg(txn) == expected
+
+
+def test_transaction_hash(factory):
+    txn = signed_txn(factory)
+    user_txn = diem_types.Transaction__UserTransaction(value=txn)
+    expected = utils.hash(hashlib.sha3_256(b"DIEM::Transaction").digest(), user_txn.bcs_serialize()).hex()
+
+    assert hashing.transaction_hash(txn) == expected
+    assert hashing.transaction_hash_from_bytes(txn.bcs_serialize()) == expected
+    assert utils.transaction_hash(txn) == expected
+
+
+def test_transaction_hashes(factory):
+    txns = [signed_txn(factory, seq) for seq in range(3)]
+    expected = [hashing.transaction_hash(txn) for txn in txns]
+    assert len(set(expected)) == 3
+
+    assert hashing.transaction_hashes(txns) == expected
+    assert hashing.transaction_hashes([txn.bcs_serialize() for txn in txns]) == expected
+    assert hashing.transaction_hashes([txn.bcs_serialize().hex() for txn in txns]) == expected
+    assert hashing.transaction_hashes([]) == []
+
+
+def signed_txn(factory, seq: int = 0) -> diem_types.SignedTransaction:
+    account = LocalAccount.generate()
+    return account.sign(factory.new_raw_transaction(account, seq))
@@ -0,0 +1,101 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import jsonrpc, txnmetadata, LocalAccount
+from diem.jsonrpc import columnar
+import numpy as np, typing
+
+SENDER = LocalAccount.generate().account_address
+RECEIVER = LocalAccount.generate().account_address
+LONG_REF_ID = "r" * 200
+
+
+def new_txn(version: int, metadata: typing.Optional[bytes]) -> jsonrpc.Transaction:
+    txn = jsonrpc.Transaction(version=version, gas_used=version * 10)
+    if metadata is None:
+        txn.transaction.type = "blockmetadata"
+        return txn
+    txn.transaction.type = "user"
+    txn.transaction.sender = SENDER.to_hex()
+    txn.transaction.sequence_number = version
+    script = txn.transaction.script
+    script.type = "peer_to_peer_with_metadata"
+    script.currency = "XUS"
+    script.amount = version * 1000
+    script.receiver = RECEIVER.to_hex()
+    script.metadata = metadata.hex()
+    return txn
+
+
+def sample_txns() -> typing.List[jsonrpc.Transaction]:
+    return [
+        new_txn(0, None),
+        new_txn(1, txnmetadata.travel_rule("ref-1", SENDER, 1000)[0]),
+        new_txn(2, b""),
+        new_txn(3, txnmetadata.general_metadata(bytes.fromhex("1122334455667788"), None)),
+        new_txn(4, txnmetadata.travel_rule(LONG_REF_ID, SENDER, 4000)[0]),
+        new_txn(5, txnmetadata.travel_rule("reference-5", SENDER, 5000)[0]),
+    ]
+
+
+def test_to_columns():
+    columns = columnar.to_columns(sample_txns())
+    assert list(columns) == list(columnar.COLUMNS)
+    assert columns["version"].tolist() == [0, 1, 2, 3, 4, 5]
+    assert columns["gas_used"].tolist() == [0, 10, 20, 30, 40, 50]
+    assert columns["sequence_number"].tolist() == [0, 1, 2, 3, 4, 5]
+    assert [bytes(a) for a in columns["sender"]] == [bytes(16)] + [SENDER.to_bytes()] * 5
+    assert [bytes(a) for a in columns["receiver"]] == [bytes(16)] + [RECEIVER.to_bytes()] * 5
+    assert columns["currency"].tolist() == [b"", b"XUS", b"XUS", b"XUS", b"XUS", b"XUS"]
+    assert columns["amount"].tolist() == [0, 1000, 2000, 3000, 4000, 5000]
+    assert columns["metadata_type"].tolist() == [-1, 2, -1, 1, 2, 2]
+    assert columns["reference_id"].tolist() == [b"", b"ref-1", b"", b"", LONG_REF_ID.encode(), b"reference-5"]
+
+    address = np.frombuffer(SENDER.to_bytes(), dtype=columnar.ADDRESS_DTYPE)[0]
+    assert (columns["sender"] == address).sum() == 5
+
+
+def test_to_columns_of_empty_batch():
+    columns = columnar.to_columns([])
+    assert [len(columns[name]) for name in columnar.COLUMNS] == [0] * len(columnar.COLUMNS)
+
+
+def test_export_and_read(tmp_path):
+    directory = str(tmp_path / "txns")
+    txns = sample_txns()
+    assert columnar.export(iter(txns), directory, batch_size=4) == 6
+    batches = list(columnar.read_batches(directory, ["version", "reference_id"]))
+    assert [b["version"].tolist() for b in batches] == [[0, 1, 2, 3], [4, 5]]
+    assert isinstance(batches[0]["version"], np.memmap)
+
+    # appends batches
+    assert columnar.export([new_txn(6, b"")], directory) == 1
+    columns = columnar.read(directory)
+    expected = columnar.to_columns(txns + [new_txn(6, b"")])
+    for name in columnar.COLUMNS:
+        assert columns[name].tolist() == expected[name].tolist()
+
+
+def test_read_empty_directory(tmp_path):
+    columns = columnar.read(str(tmp_path), ["version", "sender"])
+    assert columns["version"].dtype == np.uint64
+    assert columns["sender"].dtype == columnar.ADDRESS_DTYPE
+    assert len(columns["version"]) == 0
+
+
+def test_transactions_stream():
+    class Client:
+        def __init__(self) -> None:
+            self.calls: typing.List[typing.Tuple[int, int]] = []
+
+        def get_transactions(self, start_version: int, limit: int) -> typing.List[jsonrpc.Transaction]:
+            self.calls.append((start_version, limit))
+            return [new_txn(v, b"") for v in range(start_version, min(start_version + limit, 10))]
+
+    client = Client()
+    assert [t.version for t in columnar.transactions(client, 2, page_size=3)] == list(range(2, 10))
+    assert client.calls == [(2, 3), (5, 3), (8, 3), (10, 3)]
+
+    client = Client()
+    assert [t.version for t in columnar.transactions(client, 0, end_version=5, page_size=3)] == list(range(5))
+    assert client.calls == [(0, 3), (3, 2)]
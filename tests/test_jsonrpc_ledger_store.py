@@ -0,0 +1,131 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import jsonrpc
+import typing
+
+SENDERS = ["a" * 32, "b" * 32]
+
+
+class Client:
+    """serves a chain of transactions, odd versions are user transactions sent by senders in turn"""
+
+    def __init__(self, versions: int) -> None:
+        self.txns: typing.List[jsonrpc.Transaction] = [new_txn(v) for v in range(versions)]
+        self.calls: typing.List[typing.Tuple[typing.Any, ...]] = []
+
+    def get_transactions(
+        self, start_version: int, limit: int, include_events: typing.Optional[bool] = None
+    ) -> typing.List[jsonrpc.Transaction]:
+        self.calls.append(("get_transactions", start_version, limit))
+        return [copy(txn) for txn in self.txns[start_version : start_version + limit]]
+
+    def get_account_transactions(
+        self, account_address: str, sequence: int, limit: int, include_events: typing.Optional[bool] = None
+    ) -> typing.List[jsonrpc.Transaction]:
+        self.calls.append(("get_account_transactions", account_address, sequence, limit))
+        txns = [t for t in self.txns if t.transaction.sender == account_address]
+        return [copy(txn) for txn in txns[sequence : sequence + limit]]
+
+    def get_events(self, key: str, start: int, limit: int) -> typing.List[jsonrpc.Event]:
+        self.calls.append(("get_events", key, start, limit))
+        events = [e for t in self.txns for e in t.events if e.key == key]
+        return events[start : start + limit]
+
+
+def new_txn(version: int) -> jsonrpc.Transaction:
+    txn = jsonrpc.Transaction(version=version, hash="%064X" % (version * 0xABC))
+    if version % 2 == 0:
+        txn.transaction.type = "blockmetadata"
+        return txn
+    sender = SENDERS[(version // 2) % 2]
+    txn.transaction.type = "user"
+    txn.transaction.sender = sender
+    txn.transaction.sequence_number = version // 4
+    txn.events.add(key=sender + "00", sequence_number=version // 4, transaction_version=version)
+    return txn
+
+
+def copy(txn: jsonrpc.Transaction) -> jsonrpc.Transaction:
+    return jsonrpc.Transaction.FromString(txn.SerializeToString())
+
+
+def test_sync_and_serve_queries_locally(tmp_path):
+    client = Client(20)
+    store = jsonrpc.LedgerStore(str(tmp_path / "ledger.db"), client, mmap_size=1 << 20)
+    assert store.latest_version() is None
+    assert store.sync(limit=8) == 8
+    assert store.sync(limit=100) == 12
+    assert store.sync() == 0
+    assert len(store) == 20
+    assert store.latest_version() == 19
+    client.calls = []
+
+    assert store.get_transactions(3, 5) == [without_events(t) for t in client.txns[3:8]]
+    assert store.get_transactions(3, 5, include_events=True) == client.txns[3:8]
+    assert store.get_account_transactions(SENDERS[1], 1, 3, include_events=True) == [
+        client.txns[7],
+        client.txns[11],
+        client.txns[15],
+    ]
+    assert store.get_account_transaction(SENDERS[0], 0) == without_events(client.txns[1])
+    assert [e.transaction_version for e in store.get_events(SENDERS[0] + "00", 2, 3)] == [9, 13, 17]
+    assert store.get_transaction_by_hash("%064x" % (5 * 0xABC), include_events=True) == client.txns[5]
+    assert client.calls == []
+    assert store.stats.hits == 5
+    assert store.stats.misses == 0
+    # not found after syncing to the latest version of the chain
+    assert store.get_transaction_by_hash("%064x" % 100) is None
+    assert client.calls == [("get_transactions", 20, 1000)]
+    store.close()
+
+    # reopen
+    assert len(jsonrpc.LedgerStore(str(tmp_path / "ledger.db"), client)) == 20
+
+
+def test_fall_back_to_client_for_gaps(tmp_path):
+    client = Client(20)
+    store = jsonrpc.LedgerStore(str(tmp_path / "ledger.db"), client)
+    assert store.get_transactions(0, 4) == [without_events(t) for t in client.txns[0:4]]
+    assert client.calls == [("get_transactions", 0, 4)]
+    # only fetches versions not found
+    assert store.get_transactions(2, 6, include_events=True) == client.txns[2:8]
+    assert client.calls[-1] == ("get_transactions", 4, 4)
+    # version 8 is not in the store
+    assert store.get_transactions(7, 5, include_events=True) == client.txns[7:12]
+    assert client.calls[-1] == ("get_transactions", 8, 4)
+
+    # less than limit transactions are found locally, they may be not synced yet
+    assert store.get_account_transactions(SENDERS[0], 2, 10) == [without_events(t) for t in client.txns[9:20:4]]
+    assert client.calls[-1] == ("get_account_transactions", SENDERS[0], 2, 10)
+    assert store.get_account_transactions(SENDERS[0], 2, 3) == [without_events(t) for t in client.txns[9:20:4]]
+    assert client.calls[-1] == ("get_account_transactions", SENDERS[0], 2, 10)
+
+    key = SENDERS[1] + "00"
+    assert [e.transaction_version for e in store.get_events(key, 0, 3)] == [3, 7, 11]
+    assert [e.transaction_version for e in store.get_events(key, 0, 5)] == [3, 7, 11, 15, 19]
+    assert client.calls[-1] == ("get_events", key, 0, 5)
+    assert [e.transaction_version for e in store.get_events(key, 1, 4)] == [7, 11, 15, 19]
+    assert client.calls[-1] == ("get_events", key, 0, 5)
+    assert store.stats.hits == 3
+    assert store.stats.misses == 5
+
+
+def test_sync_transactions_added_by_queries_falling_back_to_client(tmp_path):
+    client = Client(40)
+    store = jsonrpc.LedgerStore(str(tmp_path / "ledger.db"), client)
+    assert store.get_account_transactions(SENDERS[1], 8, 1) == [without_events(client.txns[35])]
+    assert store.latest_version() == 35
+    assert store.synced_version() is None
+
+    # syncs by the hash lookup, as the transaction is not found
+    assert store.get_transaction_by_hash("%064x" % (5 * 0xABC), include_events=True) == client.txns[5]
+    assert store.synced_version() == 39
+    assert len(store) == 40
+    assert store.sync() == 0
+
+
+def without_events(txn: jsonrpc.Transaction) -> jsonrpc.Transaction:
+    ret = copy(txn)
+    del ret.events[:]
+    return ret
@@ -0,0 +1,157 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import jsonrpc
+from diem.testing import JsonRpcServer
+from concurrent.futures import ThreadPoolExecutor
+import pytest, typing
+
+
+class Hooks(jsonrpc.ClientHooks):
+    def __init__(self) -> None:
+        self.events: typing.List[typing.Tuple[typing.Any, ...]] = []
+
+    def request_start(self, method: str) -> None:
+        self.events.append(("request_start", method))
+
+    def request_end(self, method: str, duration_secs: float, error: typing.Optional[Exception]) -> None:
+        self.events.append(("request_end", method, type(error).__name__ if error else None))
+
+    def http_request(self, method: str, url: str, duration_secs: float, bytes_sent: int, bytes_received: int) -> None:
+        assert bytes_sent > 0 and bytes_received > 0
+        self.events.append(("http_request", method))
+
+    def retry(self, method: str, attempt: int) -> None:
+        self.events.append(("retry", method, attempt))
+
+    def stale_response(self, method: str, url: str, ignored: bool) -> None:
+        self.events.append(("stale_response", method, ignored))
+
+    def response_selected(self, method: str, url: str, primary: bool) -> None:
+        self.events.append(("response_selected", method, url, primary))
+
+    def parse(self, method: str, duration_secs: float) -> None:
+        self.events.append(("parse", method))
+
+
+def test_hooks_receive_request_events(json_rpc_server):
+    url = respond_ledger_versions(json_rpc_server, [10, 5, 11])
+    hooks = Hooks()
+    client = jsonrpc.Client(url, hooks=hooks, retry=jsonrpc.Retry(3, 0.001, jsonrpc.StaleResponseError))
+    client.get_metadata()
+    # second response is stale, and retried
+    client.get_metadata()
+
+    assert hooks.events == [
+        ("request_start", "get_metadata"),
+        ("http_request", "get_metadata"),
+        ("parse", "get_metadata"),
+        ("request_end", "get_metadata", None),
+        ("request_start", "get_metadata"),
+        ("http_request", "get_metadata"),
+        ("stale_response", "get_metadata", False),
+        ("request_end", "get_metadata", "StaleResponseError"),
+        ("retry", "get_metadata", 2),
+        ("request_start", "get_metadata"),
+        ("http_request", "get_metadata"),
+        ("parse", "get_metadata"),
+        ("request_end", "get_metadata", None),
+    ]
+
+
+def test_hooks_receive_selected_response_of_request_with_backups():
+    hooks = Hooks()
+    with ThreadPoolExecutor(2) as executor:
+        client = jsonrpc.Client(
+            "primary", rs=jsonrpc.RequestWithBackups(backups=["backup"], executor=executor), hooks=hooks
+        )
+
+        def send_request(url, request, ignore_stale_response):
+            if url == "primary":
+                raise jsonrpc.NetworkError("error")
+            return {"jsonrpc": "2.0", "id": 1, "result": {"version": 1}}
+
+        client._send_http_request = send_request
+        assert client.get_metadata().version == 1
+    assert ("response_selected", "get_metadata", "backup", False) in hooks.events
+
+
+def test_metrics_hooks_and_prometheus_text(json_rpc_server):
+    registry = jsonrpc.Registry()
+    client = jsonrpc.Client(
+        respond_ledger_versions(json_rpc_server, [10, 5, 11]),
+        hooks=jsonrpc.MetricsHooks(registry),
+        retry=jsonrpc.Retry(3, 0.001, jsonrpc.StaleResponseError),
+    )
+    client.get_metadata()
+    client.get_metadata()
+    with pytest.raises(jsonrpc.JsonRpcError):
+        client.get_account("00" * 16)
+
+    hooks = jsonrpc.MetricsHooks(registry)
+    assert hooks.requests.get("get_metadata", "success") == 2
+    assert hooks.requests.get("get_metadata", "StaleResponseError") == 1
+    assert hooks.requests.get("get_account", "JsonRpcError") == 1
+    assert hooks.retries.get("get_metadata") == 1
+    assert hooks.stale_responses.get("get_metadata", "false") == 1
+    assert hooks.in_flight.get("get_metadata") == 0
+    assert hooks.duration.count("get_metadata") == 3
+    assert hooks.parse_duration.count("get_metadata") == 2
+    assert hooks.bytes_received.get("get_metadata") > 0
+
+    text = registry.to_prometheus()
+    assert "# TYPE diem_jsonrpc_request_duration_seconds histogram\n" in text
+    assert 'diem_jsonrpc_request_duration_seconds_bucket{method="get_metadata",le="+Inf"} 3\n' in text
+    assert 'diem_jsonrpc_request_duration_seconds_count{method="get_metadata"} 3\n' in text
+    assert 'diem_jsonrpc_requests_total{method="get_metadata",result="success"} 2\n' in text
+    assert "# TYPE diem_jsonrpc_retries_total counter\n" in text
+
+
+def test_registry():
+    registry = jsonrpc.Registry()
+    counter = registry.counter("requests_total", "Requests.", ["path"])
+    assert registry.counter("requests_total", "Requests.", ["path"]) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests.", ["path"])
+
+    counter.inc('a"\\\n')
+    counter.inc("b", amount=2)
+    histogram = registry.histogram("latency_seconds", "Latency\nin seconds.", buckets=[0.1, 1])
+    for value in [0.05, 0.1, 0.5, 2]:
+        histogram.observe(value)
+    assert histogram.count() == 4
+    assert histogram.sum() == 2.65
+    assert registry.gauge("empty", "Empty.").samples() == []
+
+    assert registry.to_prometheus() == "\n".join(
+        [
+            "# HELP empty Empty.",
+            "# TYPE empty gauge",
+            "# HELP latency_seconds Latency\\nin seconds.",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 2.65",
+            "latency_seconds_count 4",
+            "# HELP requests_total Requests.",
+            "# TYPE requests_total counter",
+            'requests_total{path="a\\"\\\\\\n"} 1',
+            'requests_total{path="b"} 2',
+            "",
+        ]
+    )
+    assert jsonrpc.Registry().to_prometheus() == ""
+
+
+def respond_ledger_versions(json_rpc_server: JsonRpcServer, versions: typing.List[int]) -> str:
+    """responds get_metadata with the given ledger versions in order, and responds error for other methods"""
+
+    versions = list(versions)
+
+    def get_metadata(params: typing.List[typing.Any]) -> typing.Dict[str, int]:
+        json_rpc_server.ledger_version = versions.pop(0)
+        return {"version": json_rpc_server.ledger_version, "chain_id": 2}
+
+    json_rpc_server.methods = {"get_metadata": get_metadata}
+    return json_rpc_server.url
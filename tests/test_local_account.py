@@ -1,7 +1,10 @@
 # Copyright (c) The Diem Core Contributors
 # SPDX-License-Identifier: Apache-2.0
 
-from diem import identifier, utils, LocalAccount
+from diem import identifier, local_account, utils, AuthKey, LocalAccount, LocalAccountPool
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from concurrent.futures import ProcessPoolExecutor
+import pytest
 
 
 def test_from_private_key_hex():
@@ -49,3 +52,100 @@ def test_account_identifier():
     assert account.account_identifier(subaddress) == identifier.encode_account(
         account.account_address, subaddress, account.hrp
     )
+
+
+def test_sign_many(factory):
+    account = LocalAccount.generate()
+    txns = [factory.new_raw_transaction(account, seq) for seq in range(5)]
+    signed_txns = account.sign_many(txns)
+    assert signed_txns == [account.sign(txn) for txn in txns]
+
+    assert account.sign_many([txn.bcs_serialize() for txn in txns]) == signed_txns
+    assert account.sign_many_hex(txns) == [txn.bcs_serialize().hex() for txn in signed_txns]
+    assert account.sign_many([]) == []
+
+
+def test_sign_many_with_process_pool_executor(factory):
+    account = LocalAccount.generate()
+    txns = [factory.new_raw_transaction(account, seq) for seq in range(7)]
+    with ProcessPoolExecutor(2) as executor:
+        signed_txns = account.sign_many(txns, executor=executor, chunk_size=3)
+        hex_txns = account.sign_many_hex(txns, executor=executor, chunk_size=3)
+
+    assert signed_txns == [account.sign(txn) for txn in txns]
+    assert hex_txns == [txn.bcs_serialize().hex() for txn in signed_txns]
+
+
+def test_sign_many_creates_process_pool_executor(factory, monkeypatch):
+    pools = []
+
+    class Pool(ProcessPoolExecutor):
+        def __init__(self) -> None:
+            super().__init__(2)
+            pools.append(self)
+
+    monkeypatch.setattr(local_account, "ProcessPoolExecutor", Pool)
+    account = LocalAccount.generate()
+    txns = [factory.new_raw_transaction(account, seq) for seq in range(7)]
+    assert account.sign_many(txns[:3], chunk_size=3) == [account.sign(txn) for txn in txns[:3]]
+    assert pools == []
+
+    assert account.sign_many(txns, chunk_size=3) == [account.sign(txn) for txn in txns]
+    assert account.sign_many_hex(txns, chunk_size=3) == [account.sign(txn).bcs_serialize().hex() for txn in txns]
+    assert len(pools) == 2
+
+
+def test_cached_key_material_is_reset_when_key_changed():
+    account = LocalAccount.generate()
+    assert account.public_key_bytes == utils.public_key_bytes(account.private_key.public_key())
+    assert account.auth_key.hex() == AuthKey.from_public_key(account.private_key.public_key()).hex()
+    assert account.account_address == account.auth_key.account_address()
+    assert account.account_address is account.account_address
+
+    address = account.account_address
+    compliance_public_key_bytes = account.compliance_public_key_bytes
+    account.private_key = Ed25519PrivateKey.generate()
+    account.compliance_key = Ed25519PrivateKey.generate()
+    assert account.account_address != address
+    assert account.public_key_bytes == utils.public_key_bytes(account.private_key.public_key())
+    assert account.compliance_public_key_bytes != compliance_public_key_bytes
+    assert account.compliance_public_key_bytes == utils.public_key_bytes(account.compliance_key.public_key())
+
+
+def test_cached_key_material_is_not_exported():
+    account = LocalAccount.generate()
+    assert account.account_address
+    assert account.compliance_public_key_bytes
+    config = account.to_dict()
+    assert "_keys" not in config
+    assert "_compliance_keys" not in config
+    assert LocalAccount.from_dict(config).to_dict() == config
+
+
+def test_local_account_pool():
+    pool = LocalAccountPool.generate(5, hrp=identifier.DM, txn_gas_currency_code="XUS")
+    assert len(pool) == 5
+
+    accounts = list(pool)
+    assert len(accounts) == 5
+    assert len(set([a.account_address for a in accounts])) == 5
+    for i, account in enumerate(accounts):
+        assert account.to_dict() == pool[i].to_dict()
+        assert account.hrp == identifier.DM
+        assert account.txn_gas_currency_code == "XUS"
+        assert pool.account_address(i) == account.account_address
+        assert pool.auth_key(i).hex() == account.auth_key.hex()
+        assert pool.index_of(account.account_address) == i
+        assert pool.index_of(account.account_address.to_hex()) == i
+    assert pool[-1].to_dict() == accounts[-1].to_dict()
+
+    new_account = LocalAccount.generate()
+    assert pool.add(new_account) == 5
+    assert pool.index_of(new_account.account_address) == 5
+    expected = LocalAccount.from_dict({**new_account.to_dict(), "hrp": identifier.DM, "txn_gas_currency_code": "XUS"})
+    assert pool[5].to_dict() == expected.to_dict()
+
+    with pytest.raises(IndexError):
+        pool[6]
+    with pytest.raises(ValueError):
+        pool.index_of(LocalAccount.generate().account_address)
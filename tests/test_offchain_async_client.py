@@ -0,0 +1,132 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from diem import identifier, jsonrpc, offchain, signer, utils, LocalAccount
+from diem.offchain.async_client import AsyncClient
+from diem.testing import JsonRpcServer
+import asyncio, typing
+
+
+@pytest.mark.parametrize("async_signer", [False, True])
+def test_send_command(factory, json_rpc_server, async_signer):
+    sender = json_rpc_server.add_parent_vasp("http://localhost:8888")
+    receiver = LocalAccount.generate()
+    with receiver_server(json_rpc_server, receiver) as inbound:
+        json_rpc_server.add_parent_vasp(f"http://localhost:{inbound.port}", receiver)
+        payment = factory.new_payment_object(sender, receiver)
+        command = offchain.PaymentCommand(payment=payment, my_actor_address=payment.sender.address, inbound=False)
+
+        sign = sender.compliance_key.sign
+        if async_signer:
+            sign = signer.PooledAsyncSigner(signer.ExecutorAsyncSigner(signer.LocalSigner(sender.compliance_key)))
+
+        async def send():
+            async with AsyncClient(json_rpc_server.offchain_client(sender), json_rpc_server.url) as client:
+                return await client.send_command(command, sign)
+
+        resp = asyncio.run(send())
+        assert resp.status == offchain.CommandResponseStatus.success
+        assert resp.cid == command.cid
+
+
+def test_send_request_with_x_request_id(factory, json_rpc_server):
+    sender = json_rpc_server.add_parent_vasp("http://localhost:8888")
+    receiver = LocalAccount.generate()
+    x_request_ids = []
+    with receiver_server(json_rpc_server, receiver, x_request_ids) as inbound:
+        json_rpc_server.add_parent_vasp(f"http://localhost:{inbound.port}", receiver)
+        payment = factory.new_payment_object(sender, receiver)
+        command = offchain.PaymentCommand(payment=payment, my_actor_address=payment.sender.address, inbound=False)
+        request_bytes = offchain.jws.serialize(command.new_request(), sender.compliance_key.sign)
+
+        async def send():
+            async with AsyncClient(json_rpc_server.offchain_client(sender), json_rpc_server.url) as client:
+                await client.send_request(command.my_address(), command.opponent_address(), request_bytes, "req-id")
+                await client.send_request(command.my_address(), command.opponent_address(), request_bytes)
+
+        asyncio.run(send())
+    assert len(x_request_ids) == 2
+    assert x_request_ids[0] == "req-id"
+    assert x_request_ids[1] != "req-id"
+
+
+def test_send_command_failed(factory, json_rpc_server):
+    sender = json_rpc_server.add_parent_vasp("http://localhost:8888")
+    receiver = LocalAccount.generate()
+    with receiver_server(json_rpc_server, receiver) as inbound:
+        json_rpc_server.add_parent_vasp(f"http://localhost:{inbound.port}", receiver)
+        # receiver can't find the sender's account
+        json_rpc_server.accounts.pop(sender.account_address.to_hex())
+        payment = factory.new_payment_object(sender, receiver)
+        command = offchain.PaymentCommand(payment=payment, my_actor_address=payment.sender.address, inbound=False)
+
+        async def send():
+            async with AsyncClient(json_rpc_server.offchain_client(sender), json_rpc_server.url) as client:
+                await client.send_command(command, sender.compliance_key.sign)
+
+        with pytest.raises(offchain.CommandResponseError) as e:
+            asyncio.run(send())
+        assert e.value.resp.error.type == offchain.OffChainErrorType.protocol_error
+
+
+def test_account_not_found(json_rpc_server):
+    sender = json_rpc_server.add_parent_vasp("http://localhost:8888")
+
+    async def lookup():
+        async with AsyncClient(json_rpc_server.offchain_client(sender), json_rpc_server.url) as client:
+            account_id = identifier.encode_account(LocalAccount.generate().account_address, None, identifier.TDM)
+            await client.get_base_url_and_compliance_key(account_id)
+
+    with pytest.raises(jsonrpc.AccountNotFoundError):
+        asyncio.run(lookup())
+
+
+def test_concurrent_lookups_share_one_call(json_rpc_server):
+    sender = json_rpc_server.add_parent_vasp("http://localhost:8888")
+    receiver = json_rpc_server.add_parent_vasp("http://localhost:9999")
+    account_id = identifier.encode_account(receiver.account_address, None, identifier.TDM)
+
+    async def lookup():
+        async with AsyncClient(json_rpc_server.offchain_client(sender), json_rpc_server.url) as client:
+            return await asyncio.gather(*[client.get_base_url_and_compliance_key(account_id) for _ in range(10)])
+
+    results = asyncio.run(lookup())
+    assert json_rpc_server.calls["get_account"] == 1
+    for base_url, key in results:
+        assert base_url == "http://localhost:9999"
+        assert utils.public_key_bytes(key) == receiver.compliance_public_key_bytes
+
+
+def test_jsonrpc_error(json_rpc_server):
+    sender = json_rpc_server.add_parent_vasp("http://localhost:8888")
+
+    async def call():
+        async with AsyncClient(json_rpc_server.offchain_client(sender), json_rpc_server.url) as client:
+            await client.execute("unknown_method", [])
+
+    with pytest.raises(jsonrpc.JsonRpcError):
+        asyncio.run(call())
+
+
+def receiver_server(
+    json_rpc_server: JsonRpcServer, receiver: LocalAccount, x_request_ids: typing.Optional[typing.List[str]] = None
+) -> offchain.http_server.Server:
+    client = json_rpc_server.offchain_client(receiver)
+
+    def process_inbound_request(x_request_id: str, request_sender_address: str, content: bytes):
+        if x_request_ids is not None:
+            x_request_ids.append(x_request_id)
+        try:
+            command = client.process_inbound_request(request_sender_address, content)
+            resp = offchain.reply_request(command.id())
+            code = 200
+        except offchain.Error as e:
+            resp = offchain.reply_request(None, e.obj)
+            code = 400
+        return (code, offchain.jws.serialize(resp, receiver.compliance_key.sign))
+
+    return offchain.http_server.Server(process_inbound_request)
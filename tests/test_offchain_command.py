@@ -56,6 +56,21 @@ def test_travel_rule_metadata_and_sig_message(factory):
     assert sig_msg == cmd.travel_rule_metadata_signature_message(factory.hrp())
 
 
+def test_travel_rule_metadata_is_cached_on_command(factory):
+    cmd = factory.new_sender_payment_command()
+    ret = cmd.travel_rule_metadata_and_sig_msg(factory.hrp())
+    assert cmd.travel_rule_metadata_and_sig_msg(factory.hrp()) is ret
+    assert cmd == replace(cmd)
+    assert "_travel_rule" not in repr(cmd)
+    # the sender address is decoded by the hrp, a wrong hrp is not served by the cached result
+    with pytest.raises(ValueError, match="Can't decode"):
+        cmd.travel_rule_metadata_and_sig_msg(identifier.DM)
+    assert cmd.travel_rule_metadata_and_sig_msg(factory.hrp()) == ret
+
+    changed = replace(cmd, payment=replace(cmd.payment, action=replace(cmd.payment.action, amount=1)))
+    assert changed.travel_rule_metadata_and_sig_msg(factory.hrp()) != ret
+
+
 def test_to_json(factory):
     cmd = factory.new_sender_payment_command()
     assert cmd == offchain.from_json(offchain.to_json(cmd), offchain.PaymentCommand)
@@ -73,3 +88,25 @@ def test_new_command_raises_value_error_if_metadata_is_not_list(factory):
     cmd = factory.new_sender_payment_command()
     with pytest.raises(ValueError):
         cmd.new_command(metadata="hello")
+
+
+def test_state_is_cached_for_payment_object(factory):
+    cmd = factory.new_sender_payment_command()
+    state = cmd.state()
+    assert state == offchain.payment_state.S_INIT
+    assert cmd.state() is state
+    assert cmd == replace(cmd)
+    assert "_state" not in repr(cmd)
+    assert "_state" not in offchain.to_dict(cmd)
+    assert cmd == offchain.from_json(offchain.to_json(cmd), offchain.PaymentCommand)
+
+    invalid = replace(
+        cmd,
+        payment=replace(
+            cmd.payment,
+            receiver=offchain.replace_payment_actor(cmd.payment.receiver, status=offchain.Status.ready_for_settlement),
+        ),
+    )
+    for _ in range(2):
+        with pytest.raises(offchain.Error):
+            invalid.state()
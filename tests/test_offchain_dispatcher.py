@@ -0,0 +1,158 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import identifier, jsonrpc, offchain, LocalAccount
+from concurrent.futures import CancelledError
+import pytest, requests, threading, typing
+
+
+def test_send_commands_in_order_by_reference_id(factory):
+    sent = []
+    running = set()
+
+    def send(cmd: offchain.Command) -> str:
+        assert cmd.reference_id() not in running
+        running.add(cmd.reference_id())
+        threading.Event().wait(0.01)
+        sent.append(cmd)
+        running.discard(cmd.reference_id())
+        return cmd.id()
+
+    receiver = LocalAccount.generate()
+    commands = commands_of(new_command(factory, receiver), 5)
+    dispatcher = offchain.dispatcher.Dispatcher(send, identifier.TDM, coalesce=False)
+    futures = [dispatcher.submit(cmd) for cmd in commands]
+    assert [f.result(timeout=5) for f in futures] == [cmd.id() for cmd in commands]
+    assert sent == commands
+    dispatcher.shutdown()
+
+    metrics = dispatcher.metrics()
+    assert metrics.submitted == 5
+    assert metrics.sent == 5
+    assert metrics.queue_depth == 0
+    assert metrics.in_flight == 0
+    assert metrics.average_send_seconds() > 0
+
+
+def test_send_commands_in_parallel_with_counterparty_limit(factory):
+    lock = threading.Lock()
+    running: typing.Dict[str, int] = {}
+    max_running: typing.Dict[str, int] = {}
+    barrier = threading.Barrier(4, timeout=5)
+
+    def send(cmd: offchain.Command) -> None:
+        counterparty = dispatcher.counterparty(cmd)
+        with lock:
+            running[counterparty] = running.get(counterparty, 0) + 1
+            max_running[counterparty] = max(max_running.get(counterparty, 0), running[counterparty])
+        barrier.wait()
+        with lock:
+            running[counterparty] -= 1
+
+    receivers = [LocalAccount.generate(), LocalAccount.generate()]
+    dispatcher = offchain.dispatcher.Dispatcher(send, identifier.TDM, workers=8, limit_per_counterparty=2)
+    futures = [dispatcher.submit(new_command(factory, receivers[i % 2])) for i in range(8)]
+    for f in futures:
+        f.result(timeout=5)
+    dispatcher.shutdown()
+    assert max_running == {receiver.account_address.to_hex(): 2 for receiver in receivers}
+
+
+def test_coalesce_pending_commands_by_reference_id(factory):
+    started = threading.Event()
+    resume = threading.Event()
+    sent = []
+
+    def send(cmd: offchain.Command) -> str:
+        started.set()
+        resume.wait(5)
+        sent.append(cmd)
+        return cmd.id()
+
+    commands = commands_of(new_command(factory, LocalAccount.generate()), 4)
+    dispatcher = offchain.dispatcher.Dispatcher(send, identifier.TDM)
+    first = dispatcher.submit(commands[0])
+    assert started.wait(5)
+    futures = [dispatcher.submit(cmd) for cmd in commands[1:]]
+    assert dispatcher.metrics().queue_depth == 1
+    resume.set()
+
+    assert first.result(timeout=5) == commands[0].id()
+    assert [f.result(timeout=5) for f in futures] == [commands[-1].id()] * 3
+    assert sent == [commands[0], commands[-1]]
+    dispatcher.shutdown()
+    assert dispatcher.metrics().coalesced == 2
+
+
+def test_retry_transient_errors(factory):
+    calls = []
+
+    def send(cmd: offchain.Command) -> str:
+        calls.append(cmd)
+        if len(calls) < 3:
+            raise requests.exceptions.ConnectionError("connection refused")
+        return cmd.id()
+
+    cmd = new_command(factory, LocalAccount.generate())
+    dispatcher = offchain.dispatcher.Dispatcher(send, identifier.TDM, retry=retry(3))
+    assert dispatcher.submit(cmd).result(timeout=5) == cmd.id()
+    dispatcher.shutdown()
+    assert len(calls) == 3
+    assert dispatcher.metrics().retries == 2
+
+
+def test_fail_after_max_retries_or_on_non_transient_error(factory):
+    errors = [requests.exceptions.ConnectionError("connection refused"), ValueError("invalid")]
+
+    def send(cmd: offchain.Command) -> str:
+        raise errors[0] if cmd.reference_id() == ref_id else errors[1]
+
+    dispatcher = offchain.dispatcher.Dispatcher(send, identifier.TDM, retry=retry(2))
+    cmd = new_command(factory, LocalAccount.generate())
+    ref_id = cmd.reference_id()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        dispatcher.submit(cmd).result(timeout=5)
+    with pytest.raises(ValueError):
+        dispatcher.submit(new_command(factory, LocalAccount.generate())).result(timeout=5)
+    dispatcher.shutdown()
+
+    metrics = dispatcher.metrics()
+    assert metrics.failed == 2
+    assert metrics.retries == 1
+
+
+def test_shutdown_cancels_pending_commands(factory):
+    started = threading.Event()
+    resume = threading.Event()
+
+    def send(cmd: offchain.Command) -> str:
+        started.set()
+        resume.wait(5)
+        return cmd.id()
+
+    commands = commands_of(new_command(factory, LocalAccount.generate()), 2)
+    dispatcher = offchain.dispatcher.Dispatcher(send, identifier.TDM)
+    first = dispatcher.submit(commands[0])
+    assert started.wait(5)
+    second = dispatcher.submit(commands[1])
+
+    dispatcher.shutdown(wait=False)
+    with pytest.raises(CancelledError):
+        second.result(timeout=5)
+    with pytest.raises(RuntimeError, match="shutdown"):
+        dispatcher.submit(commands[1])
+    resume.set()
+    assert first.result(timeout=5) == commands[0].id()
+
+
+def new_command(factory, receiver: LocalAccount) -> offchain.PaymentCommand:
+    payment = factory.new_payment_object(LocalAccount.generate(), receiver)
+    return offchain.PaymentCommand(payment=payment, my_actor_address=payment.sender.address, inbound=False)
+
+
+def commands_of(cmd: offchain.PaymentCommand, count: int) -> typing.List[offchain.Command]:
+    return [cmd] + [cmd.new_command(additional_kyc_data=str(i)) for i in range(count - 1)]
+
+
+def retry(max_retries: int) -> jsonrpc.Retry:
+    return jsonrpc.Retry(max_retries, 0.001, requests.RequestException)
@@ -0,0 +1,204 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import offchain
+from concurrent.futures import ThreadPoolExecutor
+import http.client, requests, socket, threading, time, typing
+
+HEADERS: typing.Dict[str, str] = {offchain.X_REQUEST_ID: "id", offchain.X_REQUEST_SENDER_ADDRESS: "a"}
+
+
+def echo(x_request_id: str, sender_address: str, content: bytes) -> typing.Tuple[int, bytes]:
+    return (200, b"|".join([x_request_id.encode(), sender_address.encode(), content]))
+
+
+def test_process_requests_with_keep_alive_connection():
+    with offchain.http_server.Server(echo) as server:
+        conn = http.client.HTTPConnection("localhost", server.port)
+        for i in range(3):
+            body = b"hello %d" % i
+            conn.request(
+                "POST", "/v1/command", body, {offchain.X_REQUEST_ID: "id", offchain.X_REQUEST_SENDER_ADDRESS: "addr"}
+            )
+            resp = conn.getresponse()
+            assert resp.status == 200
+            assert resp.getheader(offchain.X_REQUEST_ID) == "id"
+            assert resp.read() == b"id|addr|" + body
+        conn.close()
+
+
+def test_process_requests_concurrently():
+    barrier = threading.Barrier(4, timeout=5)
+
+    def process(x_request_id: str, sender_address: str, content: bytes) -> typing.Tuple[int, bytes]:
+        barrier.wait()
+        return (200, content)
+
+    with offchain.http_server.Server(process, workers=4) as server:
+        url = f"http://localhost:{server.port}"
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            resps = list(executor.map(lambda i: requests.post(url, data=b"%d" % i), range(4)))
+    assert [resp.content for resp in resps] == [b"0", b"1", b"2", b"3"]
+
+
+def test_respond_503_when_too_many_pending_requests():
+    started = threading.Event()
+    release = threading.Event()
+
+    def process(x_request_id: str, sender_address: str, content: bytes) -> typing.Tuple[int, bytes]:
+        started.set()
+        release.wait(5)
+        return (200, content)
+
+    with offchain.http_server.Server(process, workers=1, max_pending_requests=0) as server:
+        url = f"http://localhost:{server.port}"
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(requests.post, url, data=b"hello", headers={"Connection": "close"})
+            assert started.wait(5)
+
+            resp = requests.post(url, data=b"world")
+            assert resp.status_code == 503
+            assert resp.headers["Retry-After"] == "1"
+
+            release.set()
+            assert future.result().content == b"hello"
+        # the worker is released after the first connection is closed
+        for _ in range(50):
+            resp = requests.post(url, data=b"world")
+            if resp.status_code == 200:
+                break
+            time.sleep(0.01)
+        assert resp.content == b"world"
+
+
+def test_idle_keep_alive_connections_do_not_take_workers():
+    with offchain.http_server.Server(echo, workers=2, max_pending_requests=0) as server:
+        idle = [http.client.HTTPConnection("localhost", server.port) for _ in range(2)]
+        for conn in idle:
+            conn.request("POST", "/", b"idle", HEADERS)
+            assert conn.getresponse().read() == b"id|a|idle"
+
+        start = time.monotonic()
+        resp = requests.post(f"http://localhost:{server.port}", data=b"hello", headers=HEADERS)
+        assert resp.status_code == 200
+        assert time.monotonic() - start < 1
+
+        for conn in idle:
+            conn.request("POST", "/", b"again", HEADERS)
+            assert conn.getresponse().read() == b"id|a|again"
+            conn.close()
+
+
+def test_process_pipelined_requests():
+    with offchain.http_server.Server(echo) as server:
+        request = b"POST / HTTP/1.1\r\n%s: id\r\n%s: a\r\nContent-Length: 5\r\n\r\n" % (
+            offchain.X_REQUEST_ID.encode(),
+            offchain.X_REQUEST_SENDER_ADDRESS.encode(),
+        )
+        with socket.create_connection(("localhost", server.port), timeout=2) as sock:
+            # the second request is read into the buffer of the connection with the first one
+            sock.sendall(request + b"hello" + request + b"world")
+            with sock.makefile("rb") as f:
+                assert read_response(f) == (b"HTTP/1.1 200 OK\r\n", b"id|a|hello")
+                assert read_response(f) == (b"HTTP/1.1 200 OK\r\n", b"id|a|world")
+
+
+def test_close_idle_connection_after_keep_alive_timeout():
+    with offchain.http_server.Server(echo, keep_alive_timeout=0.1) as server:
+        conn = http.client.HTTPConnection("localhost", server.port)
+        conn.request("POST", "/", b"hello", HEADERS)
+        assert conn.getresponse().read() == b"id|a|hello"
+        conn.sock.settimeout(5)
+        assert conn.sock.recv(1) == b""
+        conn.close()
+
+
+def read_response(f: typing.BinaryIO) -> typing.Tuple[bytes, bytes]:
+    status = f.readline()
+    length = 0
+    for line in iter(f.readline, b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            length = int(value)
+    return (status, f.read(length))
+
+
+def test_request_size_and_content_length():
+    with offchain.http_server.Server(echo, max_request_size=10) as server:
+        url = f"http://localhost:{server.port}"
+        headers = {offchain.X_REQUEST_ID: "id", offchain.X_REQUEST_SENDER_ADDRESS: "addr"}
+        assert requests.post(url, data=b"a" * 10, headers=headers).status_code == 200
+        assert requests.post(url, data=b"a" * 11, headers=headers).status_code == 413
+
+        conn = http.client.HTTPConnection("localhost", server.port)
+        conn.putrequest("POST", "/")
+        conn.endheaders()
+        assert conn.getresponse().status == 411
+        conn.close()
+
+
+def test_respond_500_when_process_request_failed():
+    def process(x_request_id: str, sender_address: str, content: bytes) -> typing.Tuple[int, bytes]:
+        raise ValueError("failed")
+
+    with offchain.http_server.Server(process) as server:
+        assert requests.post(f"http://localhost:{server.port}", data=b"hello").status_code == 500
+
+
+def test_keep_serving_when_setting_up_connection_failed(monkeypatch):
+    init = offchain.http_server._Connection.__init__
+    failures = [OSError("connection reset by peer")]
+
+    def reset_once(conn: typing.Any, *args: typing.Any) -> None:  # pyre-ignore
+        if failures:
+            raise failures.pop()
+        init(conn, *args)
+
+    monkeypatch.setattr(offchain.http_server._Connection, "__init__", reset_once)
+    with offchain.http_server.Server(echo) as server:
+        with socket.create_connection(("localhost", server.port), timeout=5) as sock:
+            assert sock.recv(1) == b""
+        assert requests.post(f"http://localhost:{server.port}", data=b"hello", headers=HEADERS).status_code == 200
+    assert failures == []
+
+
+def test_shutdown_before_serving_thread_runs(monkeypatch):
+    errors = []
+    monkeypatch.setattr(threading, "excepthook", errors.append)
+    serve = offchain.http_server.Server._serve
+
+    def delayed_serve(server: offchain.http_server.Server) -> None:
+        time.sleep(0.1)
+        serve(server)
+
+    monkeypatch.setattr(offchain.http_server.Server, "_serve", delayed_serve)
+    server = offchain.http_server.Server(echo).start()
+    assert server.shutdown(timeout=5)
+    assert not server._serving
+    assert errors == []
+
+
+def test_graceful_shutdown():
+    started = threading.Event()
+
+    def process(x_request_id: str, sender_address: str, content: bytes) -> typing.Tuple[int, bytes]:
+        started.set()
+        time.sleep(0.2)
+        return (200, content)
+
+    server = offchain.http_server.Server(process).start()
+    url = f"http://localhost:{server.port}"
+    idle = http.client.HTTPConnection("localhost", server.port)
+    idle.request("POST", "/", b"idle")
+    assert idle.getresponse().read() == b"idle"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        started.clear()
+        future = executor.submit(requests.post, url, data=b"hello")
+        assert started.wait(5)
+        assert server.shutdown(timeout=5)
+
+        resp = future.result()
+        assert resp.content == b"hello"
+        assert resp.headers["Connection"] == "close"
+    idle.close()
@@ -0,0 +1,111 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import offchain, LocalAccount
+from diem.offchain.idempotency import IdempotencyCache, InMemoryIdempotencyBackend, SqliteIdempotencyBackend
+import typing
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Processor:
+    def __init__(self, code: int = 200) -> None:
+        self.code = code
+        self.calls = 0
+
+    def __call__(
+        self, x_request_id: str, request_sender_address: str, request_bytes: bytes
+    ) -> typing.Tuple[int, bytes]:
+        self.calls += 1
+        return (self.code, b"response %d" % self.calls)
+
+
+def test_replay_response_of_duplicated_request(factory):
+    processor = Processor()
+    cache = IdempotencyCache()
+    process = cache.wrap(processor)
+    request = new_request(factory)
+
+    assert process("id1", "sender", request) == (200, b"response 1")
+    assert process("id2", "sender", request) == (200, b"response 1")
+    assert processor.calls == 1
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+    # different sender address
+    assert process("id3", "other", request) == (200, b"response 2")
+    assert processor.calls == 2
+
+
+def test_process_request_with_same_cid_but_different_body(factory):
+    processor = Processor()
+    cache = IdempotencyCache()
+    process = cache.wrap(processor)
+    account = LocalAccount.generate()
+    request = offchain.new_payment_request(factory.new_payment_object(), cid="cid")
+
+    assert process("id", "sender", offchain.jws.serialize(request, account.compliance_key.sign)) == (200, b"response 1")
+    other = offchain.jws.serialize(request, LocalAccount.generate().compliance_key.sign)
+    assert process("id", "sender", other) == (200, b"response 2")
+    assert cache.stats.conflicts == 1
+
+
+def test_not_cache_error_response_or_invalid_request(factory):
+    processor = Processor(code=400)
+    process = IdempotencyCache().wrap(processor)
+    request = new_request(factory)
+    assert process("id", "sender", request) == (400, b"response 1")
+    assert process("id", "sender", request) == (400, b"response 2")
+
+    processor.code = 200
+    for invalid in [b"invalid", b"a.b.c", request.replace(b".", b"-", 1)]:
+        assert process("id", "sender", invalid)[0] == 200
+        assert process("id", "sender", invalid)[0] == 200
+    assert process("id", "", request)[0] == 200
+    assert process("id", "", request)[0] == 200
+    assert processor.calls == 10
+
+
+def test_in_memory_backend_ttl_and_max_entries():
+    clock = Clock()
+    backend = InMemoryIdempotencyBackend(max_entries=2, clock=clock)
+    backend.set("a", b"1", 10)
+    backend.set("b", b"2", 10)
+    assert backend.get("a") == b"1"
+    backend.set("c", b"3", 10)
+    # "b" is least recently used
+    assert backend.get("b") is None
+    assert len(backend) == 2
+
+    clock.now += 10
+    assert backend.get("a") is None
+    assert backend.get("c") is None
+    assert len(backend) == 0
+
+
+def test_sqlite_backend_shared_by_caches(factory, tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "idempotency.db")
+    processor = Processor()
+    request = new_request(factory)
+
+    process1 = IdempotencyCache(SqliteIdempotencyBackend(path, clock=clock), ttl_secs=10).wrap(processor)
+    process2 = IdempotencyCache(SqliteIdempotencyBackend(path, clock=clock), ttl_secs=10).wrap(processor)
+    assert process1("id", "sender", request) == (200, b"response 1")
+    assert process2("id", "sender", request) == (200, b"response 1")
+
+    clock.now += 10
+    assert process2("id", "sender", request) == (200, b"response 2")
+    clock.now += 10
+    assert SqliteIdempotencyBackend(path, clock=clock).evict() == 1
+
+
+def new_request(factory) -> bytes:
+    request = offchain.new_payment_request(factory.new_payment_object())
+    return offchain.jws.serialize(request, LocalAccount.generate().compliance_key.sign)
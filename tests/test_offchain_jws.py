@@ -3,7 +3,7 @@
 
 from diem import offchain, LocalAccount
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
-import cryptography, pytest
+import asyncio, cryptography, pytest
 
 
 def test_serialize_deserialize():
@@ -22,6 +22,25 @@ def test_serialize_deserialize():
     assert resp == response
 
 
+def test_serialize_many_and_serialize_async():
+    account = LocalAccount.generate()
+    responses = [offchain.reply_request(cid=str(i)) for i in range(3)]
+    calls = []
+
+    def sign_many(msgs):
+        calls.append(msgs)
+        return [account.compliance_key.sign(msg) for msg in msgs]
+
+    expected = [offchain.jws.serialize(resp, account.compliance_key.sign) for resp in responses]
+    assert offchain.jws.serialize_many(responses, sign_many) == expected
+    assert len(calls) == 1
+
+    async def sign(msg):
+        return account.compliance_key.sign(msg)
+
+    assert asyncio.run(offchain.jws.serialize_async(responses[0], sign)) == expected[0]
+
+
 def test_deserialize_error_if_not_3_parts():
     with pytest.raises(
         ValueError, match="invalid JWS compact message: header.payload, expect 3 parts: <header>.<payload>.<signature>"
@@ -67,3 +86,25 @@ def test_deserialize_example_jws():
 
     key = Ed25519PublicKey.from_public_bytes(bytes.fromhex(public_key))
     key.verify(sig, msg)
+
+
+def test_deserialize_bytes():
+    account = LocalAccount.generate()
+    # payload lengths cover base64 encoded bytes with and without padding
+    for body in ["", "a", "ab", "abc", "abcd", '{"hello": "world"}']:
+        msg = offchain.jws.serialize_string(body, account.private_key.sign)
+        payload, sig, signing_msg = offchain.jws.deserialize_bytes(msg)
+        assert payload == body.encode("utf-8")
+        assert signing_msg == msg[: msg.rindex(b".")]
+        assert signing_msg == offchain.jws.signing_message(msg.split(b".")[1])
+        account.private_key.public_key().verify(sig, signing_msg)
+        assert offchain.jws.deserialize_string(msg) == (body, sig, signing_msg)
+
+
+def test_deserialize_error_if_more_than_3_parts():
+    with pytest.raises(ValueError, match="expect 3 parts"):
+        offchain.jws.deserialize_bytes(b".".join([offchain.jws.PROTECTED_HEADER, b"payload", b"sig", b"sig"]))
+    with pytest.raises(ValueError, match="expect 3 parts"):
+        offchain.jws.deserialize_bytes(b"header")
+    with pytest.raises(ValueError, match="invalid JWS message header: eyJhbGciOiJFZERTQSJ, expect"):
+        offchain.jws.deserialize_bytes(b".".join([offchain.jws.PROTECTED_HEADER[:-1], b"payload", b"sig"]))
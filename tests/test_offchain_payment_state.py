@@ -12,6 +12,7 @@ from diem.offchain.payment_state import (
     follow_up_action,
     Actor,
     MACHINE as machine,
+    COMPILED_MACHINE,
     S_INIT,
     R_SEND,
     R_ABORT,
@@ -63,3 +64,33 @@ def test_follow_up_action():
     assert follow_up_action(Actor.RECEIVER, R_SEND) is None
     assert follow_up_action(Actor.SENDER, R_ABORT) is None
     assert follow_up_action(Actor.RECEIVER, R_ABORT) is None
+
+
+def test_compiled_machine_matches_same_states(factory):
+    payment = factory.new_payment_object()
+    kyc_data = individual_kyc_data(given_name="Rose")
+    statuses = [Status.none, Status.needs_kyc_data, Status.ready_for_settlement, Status.abort, Status.soft_match]
+    for sender_status in statuses:
+        for receiver_status in statuses:
+            for additional_kyc_data in [None, "additional"]:
+                obj = dataclasses.replace(
+                    payment,
+                    sender=replace_payment_actor(
+                        payment.sender, status=sender_status, additional_kyc_data=additional_kyc_data
+                    ),
+                    receiver=replace_payment_actor(
+                        payment.receiver,
+                        status=receiver_status,
+                        kyc_data=kyc_data,
+                        additional_kyc_data=additional_kyc_data,
+                    ),
+                    recipient_signature="signature",
+                )
+                assert COMPILED_MACHINE.match_states(obj) == machine.match_states(obj)
+
+    invalid_payment = dataclasses.replace(
+        payment,
+        receiver=replace_payment_actor(payment.receiver, status=Status.ready_for_settlement),
+    )
+    with pytest.raises(state.ConditionValidationError):
+        COMPILED_MACHINE.match_state(invalid_payment)
@@ -0,0 +1,167 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import offchain
+from diem.offchain.scheduler import Job, JobPersistence, Scheduler
+from concurrent.futures import ProcessPoolExecutor
+import pytest, threading, typing
+
+EVALUATE = offchain.Action.EVALUATE_KYC_DATA
+SUBMIT = offchain.Action.SUBMIT_TXN
+
+
+def test_run_jobs_by_priority():
+    done = []
+    handlers = {EVALUATE: done.append, SUBMIT: done.append}
+    scheduler = Scheduler(handlers, workers=1)
+    jobs = [
+        scheduler.enqueue(EVALUATE, "ref-1", priority=1),
+        scheduler.enqueue(SUBMIT, "ref-2", priority=0),
+        scheduler.enqueue(EVALUATE, "ref-3", priority=1),
+        scheduler.enqueue(EVALUATE, "ref-4", priority=-1),
+    ]
+    assert scheduler.pending() == 4
+    scheduler.start()
+    assert scheduler.join(timeout=5)
+    scheduler.shutdown()
+    assert done == [jobs[3], jobs[1], jobs[0], jobs[2]]
+    assert scheduler.stats.completed == 4
+
+
+def test_shutdown_leaves_pending_jobs():
+    started = threading.Event()
+    release = threading.Event()
+    done = []
+
+    def handle(job: Job) -> None:
+        started.set()
+        release.wait(5)
+        done.append(job)
+
+    scheduler = Scheduler({EVALUATE: handle}, workers=1)
+    jobs = [scheduler.enqueue(EVALUATE, f"ref-{i}") for i in range(10)]
+    scheduler.start()
+    assert started.wait(5)
+    threading.Timer(0.05, release.set).start()
+    scheduler.shutdown()
+    assert done == jobs[:1]
+    assert scheduler.pending() == 9
+
+
+def test_enqueue_after_shutdown():
+    scheduler = Scheduler({EVALUATE: lambda job: None}, workers=1).start()
+    scheduler.shutdown()
+    with pytest.raises(RuntimeError, match="after shutdown"):
+        scheduler.enqueue(EVALUATE, "ref")
+    assert scheduler.pending() == 0
+    assert scheduler.persistence.load() == []
+
+    scheduler.start()
+    assert scheduler.enqueue(EVALUATE, "ref")
+    assert scheduler.join(timeout=5)
+    scheduler.shutdown()
+
+
+def test_limit_concurrent_jobs_by_action():
+    lock = threading.Lock()
+    running: typing.Dict[offchain.Action, int] = {EVALUATE: 0, SUBMIT: 0}
+    max_running: typing.Dict[offchain.Action, int] = {EVALUATE: 0, SUBMIT: 0}
+
+    def handle(job: Job) -> None:
+        with lock:
+            running[job.action] += 1
+            max_running[job.action] = max(max_running[job.action], running[job.action])
+        threading.Event().wait(0.01)
+        with lock:
+            running[job.action] -= 1
+
+    scheduler = Scheduler({EVALUATE: handle, SUBMIT: handle}, workers=6, limits={SUBMIT: 2})
+    scheduler.start()
+    for i in range(12):
+        scheduler.enqueue(SUBMIT if i % 3 else EVALUATE, f"ref-{i}")
+    assert scheduler.join(timeout=5)
+    scheduler.shutdown()
+    assert max_running[SUBMIT] == 2
+    assert max_running[EVALUATE] > 0
+
+
+def test_retry_and_dead_letter():
+    attempts: typing.Dict[str, int] = {}
+
+    def handle(job: Job) -> None:
+        attempts[job.reference_id] = job.attempts + 1
+        if job.reference_id == "bad" or job.attempts < 2:
+            raise ConnectionError("try again")
+
+    def reject(job: Job) -> None:
+        raise ValueError("invalid")
+
+    scheduler = Scheduler({SUBMIT: handle, EVALUATE: reject}, max_attempts=3, retry_on=ConnectionError)
+    scheduler.retry_delay_secs = 0.001
+    scheduler.start()
+    scheduler.enqueue(SUBMIT, "good")
+    bad = scheduler.enqueue(SUBMIT, "bad")
+    invalid = scheduler.enqueue(EVALUATE, "invalid")
+    assert scheduler.join(timeout=5)
+    scheduler.shutdown()
+
+    assert attempts == {"good": 3, "bad": 3}
+    dead_letters = {d.job.reference_id: d for d in scheduler.dead_letters()}
+    assert dead_letters["bad"].job.id == bad.id
+    assert dead_letters["bad"].job.attempts == 2
+    assert isinstance(dead_letters["bad"].error, ConnectionError)
+    assert dead_letters["invalid"].job == invalid
+    assert scheduler.stats.completed == 1
+    assert scheduler.stats.retried == 4
+    assert scheduler.stats.dead == 2
+
+
+def test_persistence_hooks():
+    class Persistence(JobPersistence):
+        def __init__(self, jobs: typing.List[Job]) -> None:
+            self.jobs = {job.id: job for job in jobs}
+            self.dead: typing.List[Job] = []
+
+        def load(self) -> typing.List[Job]:
+            return list(self.jobs.values())
+
+        def save(self, job: Job) -> None:
+            self.jobs[job.id] = job
+
+        def delete(self, job: Job) -> None:
+            del self.jobs[job.id]
+
+        def dead_letter(self, job: Job, error: Exception) -> None:
+            del self.jobs[job.id]
+            self.dead.append(job)
+
+    done = []
+    persistence = Persistence([Job(action=SUBMIT, reference_id="loaded")])
+    scheduler = Scheduler({SUBMIT: lambda job: done.append(job.reference_id)}, persistence=persistence)
+    with pytest.raises(ValueError, match="no handler"):
+        scheduler.enqueue(EVALUATE, "ref")
+    scheduler.enqueue(SUBMIT, "enqueued")
+    assert len(persistence.jobs) == 2
+
+    scheduler.start()
+    assert scheduler.join(timeout=5)
+    scheduler.shutdown()
+    assert sorted(done) == ["enqueued", "loaded"]
+    assert persistence.jobs == {}
+
+
+def test_run_jobs_by_process_pool_executor():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        scheduler = Scheduler({SUBMIT: fail_odd_reference_id}, workers=2, max_attempts=1, executor=executor)
+        scheduler.start()
+        for i in range(4):
+            scheduler.enqueue(SUBMIT, str(i))
+        assert scheduler.join(timeout=30)
+        scheduler.shutdown()
+    assert scheduler.stats.completed == 2
+    assert sorted(d.job.reference_id for d in scheduler.dead_letters()) == ["1", "3"]
+
+
+def fail_odd_reference_id(job: Job) -> None:
+    if int(job.reference_id) % 2:
+        raise ValueError("odd")
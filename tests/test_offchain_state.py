@@ -170,3 +170,47 @@ def test_require_empty_matches_anything():
 
     assert a.match(None) == MatchResult(success=True)
     assert a.match(Object()) == MatchResult(success=True)
+
+
+def test_compiled_machine_matches_same_states():
+    a = State(id="a", require=require(Value(path="a", value="hello"), Field(path="b", not_set=True)))
+    b = State(id="b", require=require(Value(path="a", value="hello"), Field(path="b")))
+    c = State(id="c", require=require(Value(path="a", value="world"), Value(path="b.a", value="hello")))
+    d = State(id="d", require=require(Field(path="c")))
+    e = State(id="e", require=require(Value(path="a", value="hi"), validation=Field(path="c.a")))
+    m = build_machine([new_transition(a, b), new_transition(b, c), new_transition(c, d), new_transition(d, e)])
+
+    objects = [
+        None,
+        Object(),
+        Object(a="hello"),
+        Object(a="hello", b=Object()),
+        Object(a="world", b=Object(a="hello")),
+        Object(a="world", b=Object(a="world")),
+        Object(a="hello", c=Object()),
+        Object(a="hi", c=Object(a="!")),
+        Object(b=Object(), c=Object()),
+    ]
+    for index_paths in [[], ["a"], ["a", "b.a"]]:
+        compiled = m.compile(index_paths)
+        for obj in objects:
+            assert compiled.match_states(obj) == m.match_states(obj)
+            assert compiled.match_states_and_results(obj) == m.match_states_and_results(obj)
+
+        with pytest.raises(ConditionValidationError) as e1:
+            m.match_state(Object(a="hi", c=Object()))
+        with pytest.raises(ConditionValidationError) as e2:
+            compiled.match_state(Object(a="hi", c=Object()))
+        assert e1.value.match_result == e2.value.match_result
+        assert e1.value.validation == e2.value.validation
+
+        assert compiled.match_state(Object(a="hello")) == a
+        with pytest.raises(TooManyStatesMatchedError):
+            compiled.match_state(Object(a="hello", b=Object(), c=Object()))
+        with pytest.raises(NoStateMatchedError):
+            compiled.match_state(Object(a="world"))
+
+        assert compiled.is_initial(a)
+        assert not compiled.is_initial(b)
+        assert compiled.is_valid_transition(a, b, None)
+        assert not compiled.is_valid_transition(a, c, None)
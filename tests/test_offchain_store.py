@@ -0,0 +1,112 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import offchain, LocalAccount
+from concurrent.futures import ThreadPoolExecutor
+import pytest, typing
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def clock_and_store(request, tmp_path) -> typing.Tuple[Clock, offchain.store.CommandStore]:
+    clock = Clock()
+    if request.param == "memory":
+        return (clock, offchain.store.InMemoryCommandStore(shards=4, clock=clock))
+    return (clock, offchain.store.SqliteCommandStore(str(tmp_path / "commands.db"), clock=clock))
+
+
+def test_save_and_find_commands(factory, clock_and_store):
+    _, store = clock_and_store
+    cmd = new_command(factory)
+    assert store.save(cmd)
+    assert not store.save(cmd)
+    assert len(store) == 1
+    assert store.get(cmd.reference_id()) == cmd
+    assert store.get_by_cid(cmd.id()) == cmd
+    assert store.find_by_status("S_INIT") == [cmd]
+
+    aborted = receiver_abort(cmd)
+    assert store.save(aborted)
+    assert len(store) == 1
+    assert store.get(cmd.reference_id()) == aborted
+    assert store.get_by_cid(cmd.id()) is None
+    assert store.get_by_cid(aborted.id()) == aborted
+    assert store.find_by_status("S_INIT") == []
+    assert store.find_by_status("R_ABORT") == [aborted]
+
+    assert store.delete(cmd.reference_id())
+    assert not store.delete(cmd.reference_id())
+    assert store.get(cmd.reference_id()) is None
+    assert store.get_by_cid(aborted.id()) is None
+    assert len(store) == 0
+
+
+def test_save_invalid_command(factory, clock_and_store):
+    _, store = clock_and_store
+    cmd = new_command(factory)
+    with pytest.raises(offchain.Error, match="invalid_initial_or_prior_not_found"):
+        store.save(receiver_abort(cmd))
+    assert len(store) == 0
+
+    store.save(cmd)
+    with pytest.raises(offchain.Error, match="invalid_transition"):
+        store.save(offchain.PaymentCommand(my_actor_address=cmd.my_actor_address, payment=cmd.payment, inbound=False))
+    assert store.get(cmd.reference_id()) == cmd
+
+
+def test_find_by_status_with_limit(factory, clock_and_store):
+    _, store = clock_and_store
+    commands = [new_command(factory) for _ in range(5)]
+    for cmd in commands:
+        store.save(cmd)
+    assert len(store.find_by_status("S_INIT", limit=3)) == 3
+    found = store.find_by_status("S_INIT")
+    assert sorted(cmd.id() for cmd in found) == sorted(cmd.id() for cmd in commands)
+
+
+def test_evict_final_commands(factory, clock_and_store):
+    clock, store = clock_and_store
+    commands = [new_command(factory) for _ in range(4)]
+    for cmd in commands:
+        store.save(cmd)
+    store.save(receiver_abort(commands[0]))
+    clock.now += 10
+    store.save(receiver_abort(commands[1]))
+
+    assert store.evict(max_age_secs=20) == 0
+    assert store.evict(max_age_secs=5) == 1
+    assert store.get(commands[0].reference_id()) is None
+    assert store.evict() == 1
+    assert store.get(commands[1].reference_id()) is None
+    assert len(store) == 2
+
+
+def test_save_commands_concurrently(factory, clock_and_store):
+    _, store = clock_and_store
+    commands = [new_command(factory) for _ in range(20)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        saved = list(executor.map(store.save, commands * 2))
+    assert sum(saved) == 20
+    assert len(store) == 20
+
+
+def new_command(factory) -> offchain.PaymentCommand:
+    payment = factory.new_payment_object(LocalAccount.generate(), LocalAccount.generate())
+    return offchain.PaymentCommand(payment=payment, my_actor_address=payment.sender.address, inbound=False)
+
+
+def receiver_abort(cmd: offchain.PaymentCommand) -> offchain.PaymentCommand:
+    receiver = offchain.PaymentCommand(
+        my_actor_address=cmd.payment.receiver.address, payment=cmd.payment, inbound=False
+    )
+    aborted = receiver.new_command(
+        status=offchain.Status.abort, abort_code=offchain.AbortCode.reject_kyc_data, abort_message="rejected"
+    )
+    return offchain.PaymentCommand(my_actor_address=cmd.my_actor_address, payment=aborted.payment, inbound=True)
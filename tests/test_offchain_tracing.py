@@ -0,0 +1,108 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import jsonrpc, offchain, LocalAccount
+from diem.offchain.tracing import LatencyExporter, LoggingTracer, Tracer, percentile, span_factory
+import logging, pytest, typing
+
+
+class RecordingTracer(Tracer):
+    def __init__(self) -> None:
+        self.spans: typing.List[typing.Tuple[str, str, typing.Optional[str]]] = []
+
+    def span(self, request_id: str, stage: str, duration_secs: float, error: typing.Optional[BaseException]) -> None:
+        assert duration_secs >= 0
+        self.spans.append((request_id, stage, type(error).__name__ if error else None))
+
+
+class JsonRpcClient:
+    """responds the sender's compliance key, no accounts and no currencies"""
+
+    def __init__(self, sender: LocalAccount) -> None:
+        self.sender = sender
+
+    def get_base_url_and_compliance_key(self, account_address: typing.Any) -> typing.Tuple[str, typing.Any]:
+        return ("http://localhost", self.sender.compliance_key.public_key())
+
+    def get_account(self, account_address: typing.Any) -> None:
+        return None
+
+    def get_currencies(self) -> typing.List[jsonrpc.CurrencyInfo]:
+        return []
+
+
+def test_process_inbound_request_spans(factory):
+    sender = LocalAccount.generate()
+    receiver = LocalAccount.generate()
+    tracer = RecordingTracer()
+    client = offchain.Client(receiver.account_address, JsonRpcClient(sender), factory.hrp(), tracer=tracer)
+    payment = factory.new_payment_object(sender, receiver)
+    request = offchain.jws.serialize(offchain.new_payment_request(payment), sender.compliance_key.sign)
+
+    with pytest.raises(offchain.Error) as e:
+        client.process_inbound_request(payment.sender.address, request, x_request_id="id1")
+    # no currencies are found
+    assert e.value.obj.code == offchain.ErrorCode.invalid_field_value
+    assert tracer.spans == [
+        ("id1", "lookup_sender_key", None),
+        ("id1", "jws_parse", None),
+        ("id1", "verify_signature", None),
+        ("id1", "decode", None),
+        ("id1", "validate_addresses", None),
+        ("id1", "create_command", None),
+        ("id1", "dual_attestation", "Error"),
+        ("id1", "total", "Error"),
+    ]
+
+    tracer.spans = []
+    invalid = offchain.jws.serialize(offchain.new_payment_request(payment), receiver.compliance_key.sign)
+    with pytest.raises(offchain.Error):
+        client.process_inbound_request(payment.sender.address, invalid)
+    assert [stage for _, stage, _ in tracer.spans] == ["lookup_sender_key", "jws_parse", "verify_signature", "total"]
+    assert tracer.spans[-2] == ("", "verify_signature", "InvalidSignature")
+
+
+def test_latency_exporter_summary():
+    exporter = LatencyExporter(max_samples=100)
+    for i in range(1, 201):
+        exporter.span("id", "decode", i / 1000, None)
+    exporter.span("id", "total", 0.5, ValueError())
+
+    summary = exporter.summary(percentiles=[50, 99, 100])
+    assert list(summary.keys()) == ["decode", "total"]
+    decode = summary["decode"]
+    assert decode.count == 200
+    assert decode.errors == 0
+    assert decode.mean_secs == pytest.approx(0.1005)
+    assert decode.max_secs == 0.2
+    # percentiles are calculated from the latest 100 samples
+    assert decode.percentiles == {50: 0.15, 99: 0.199, 100: 0.2}
+    assert summary["total"].errors == 1
+    assert summary["total"].percentiles == {50: 0.5, 99: 0.5, 100: 0.5}
+
+    lines = exporter.format_summary().splitlines()
+    assert lines[0].split() == ["stage", "count", "errors", "mean", "p50", "p90", "p99", "max"]
+    assert lines[1].split() == ["decode", "200", "0", "100.500", "150.000", "190.000", "199.000", "200.000"]
+    assert lines[2].split() == ["total", "1", "1", "500.000", "500.000", "500.000", "500.000", "500.000"]
+
+    exporter.reset()
+    assert exporter.summary() == {}
+
+
+def test_logging_tracer(caplog):
+    caplog.set_level(logging.DEBUG)
+    span = span_factory(LoggingTracer(), "id1")
+    with span("decode"):
+        pass
+    with pytest.raises(ValueError):
+        with span("total"):
+            raise ValueError("invalid")
+    assert len(caplog.records) == 2
+    assert caplog.records[0].getMessage().startswith("[id1] decode ")
+    assert caplog.records[1].getMessage().endswith("failed: ValueError('invalid')")
+
+
+def test_percentile():
+    samples = [0.1, 0.2, 0.3, 0.4]
+    assert [percentile(samples, p) for p in (0, 25, 50, 90, 100)] == [0.1, 0.1, 0.2, 0.4, 0.4]
+    assert percentile([], 50) == 0.0
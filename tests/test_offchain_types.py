@@ -2,7 +2,8 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from diem import identifier, offchain, LocalAccount
-import dataclasses, json, pytest, uuid
+from concurrent.futures import ThreadPoolExecutor
+import copy, dataclasses, json, pickle, pytest, sys, threading, typing, uuid
 
 
 def test_entity_kyc_data():
@@ -311,6 +312,94 @@ def test_validate_write_once_fields_raises_overwrite_error_when_set_value_to_non
         offchain.validate_write_once_fields("actor", actor2, actor1)
 
 
+def test_validate_write_once_fields_same_as_generic_validation():
+    payment = offchain.PaymentObject(
+        reference_id="4185027f-0574-6f55-2668-3a38fdb5de98",
+        sender=offchain.PaymentActorObject(
+            address="lbr1p7ujcndcl7nudzwt8fglhx6wxn08kgs5tm6mz4usw5p72t",
+            status=offchain.StatusObject(status=offchain.Status.needs_kyc_data),
+            kyc_data=offchain.individual_kyc_data(given_name="hello"),
+        ),
+        receiver=offchain.PaymentActorObject(
+            address="lbr1p7ujcndcl7nudzwt8fglhx6wxnvqqqqqqqqqqqqelu3xv",
+            status=offchain.StatusObject(status=offchain.Status.none),
+        ),
+        action=offchain.PaymentActionObject(amount=1_000_000_000_000, currency="XUS", timestamp=1604902048),
+        original_payment_reference_id="0185027f-0574-6f55-2668-3a38fdb5de98",
+    )
+    sender, receiver = payment.sender, payment.receiver
+    changes = [
+        dict(reference_id="5185027f-0574-6f55-2668-3a38fdb5de98"),
+        dict(original_payment_reference_id="1185027f-0574-6f55-2668-3a38fdb5de98"),
+        dict(original_payment_reference_id=None),
+        dict(description="desc"),
+        dict(recipient_signature="sig"),
+        dict(action=dataclasses.replace(payment.action, amount=1)),
+        dict(action=dataclasses.replace(payment.action)),
+        dict(sender=offchain.replace_payment_actor(sender, kyc_data=offchain.individual_kyc_data(given_name="hi"))),
+        dict(sender=offchain.replace_payment_actor(sender, kyc_data=offchain.individual_kyc_data(given_name="hello"))),
+        dict(sender=offchain.replace_payment_actor(sender, status=offchain.Status.ready_for_settlement)),
+        dict(sender=dataclasses.replace(sender, address=receiver.address)),
+        dict(sender=dataclasses.replace(sender, kyc_data=None)),
+        dict(receiver=offchain.replace_payment_actor(receiver, kyc_data=offchain.individual_kyc_data())),
+        dict(receiver=offchain.replace_payment_actor(receiver, additional_kyc_data="data")),
+        dict(receiver=dataclasses.replace(receiver, metadata=["metadata"])),
+        dict(receiver=dataclasses.replace(receiver, status=1)),
+        dict(receiver=dataclasses.replace(receiver, status=offchain.StatusObject(status=1))),
+    ]
+    for change in changes:
+        new_payment = dataclasses.replace(payment, **change)
+        for new, prior in [(new_payment, payment), (payment, new_payment)]:
+            expected = error_of(generic_validate_write_once_fields, new, prior)
+            assert error_of(offchain.validate_write_once_fields, new, prior) == expected
+
+
+def test_validate_write_once_fields_of_recursive_type():
+    prior = Node(name="a", child=Node(name="b"))
+    offchain.validate_write_once_fields("node", Node(name="a", child=Node(name="b", child=Node(name="c"))), prior)
+    with pytest.raises(offchain.InvalidOverwriteError, match="node.child.name"):
+        offchain.validate_write_once_fields("node", Node(name="a", child=Node(name="c")), prior)
+    with pytest.raises(TypeError, match="node.child.child"):
+        offchain.validate_write_once_fields(
+            "node",
+            Node(name="a", child=Node(name="b", child=1)),
+            Node(name="a", child=Node(name="b", child=Node(name="c"))),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class Node:
+    name: str = dataclasses.field(metadata={"immutable": True})
+    child: typing.Optional["Node"] = dataclasses.field(default=None)
+
+
+def error_of(validate, new, prior) -> typing.Optional[str]:  # pyre-ignore
+    try:
+        validate("payment", new, prior)
+    except (offchain.InvalidOverwriteError, TypeError) as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def generic_validate_write_once_fields(path: str, new: typing.Any, prior: typing.Any) -> None:  # pyre-ignore
+    if new is None or prior is None:
+        return
+    new_type = type(new)
+    if type(prior) != new_type:
+        raise TypeError(f"field {path} type is different, expect {type(prior)}, but got {new_type}")
+    if not dataclasses.is_dataclass(new_type):
+        return
+    for field in dataclasses.fields(new_type):
+        prior_value = getattr(prior, field.name)
+        new_value = getattr(new, field.name)
+        field_path = path + "." + field.name
+        if field.metadata.get("immutable") and prior_value != new_value:
+            raise offchain.InvalidOverwriteError(field_path, prior_value, new_value, "immutable")
+        if field.metadata.get("write_once") and prior_value is not None and prior_value != new_value:
+            raise offchain.InvalidOverwriteError(field_path, prior_value, new_value, "write once")
+        generic_validate_write_once_fields(field_path, new_value, prior_value)
+
+
 def test_invalid_object():
     request_json = "1111"
     with pytest.raises(offchain.FieldError, match="expect json object, but got int: ") as e:
@@ -433,6 +522,157 @@ def test_missing_required_field():
     )
 
 
+def test_from_dict_does_not_change_input_dict():
+    request_json = sample_request_json()
+    request_json["command"]["payment"]["sender"]["metadata"] = ["hello", "world"]
+    expected = json.dumps(request_json)
+
+    request = offchain.from_dict(request_json, None)
+    assert json.dumps(request_json) == expected
+    assert request.command.payment.sender.metadata == ["hello", "world"]
+    assert request.command.payment.receiver.metadata is None
+    assert offchain.from_json(offchain.to_json(request)) == request
+
+
+def test_invalid_field_value_type():
+    request_json = set_field(sample_request_json(), {"command.payment.sender.metadata": ["hello", 1]})
+    assert_field_error(
+        request_json, "invalid_field_value", "command.payment.sender.metadata", "expect type str, but got int"
+    )
+
+    request_json = set_field(sample_request_json(), {"command.payment.sender.metadata": "hello"})
+    assert_field_error(
+        request_json, "invalid_field_value", "command.payment.sender.metadata", "expect type list, but got str"
+    )
+
+    request_json = set_field(sample_request_json(), {"command.payment.sender.status": "none"})
+    assert_field_error(
+        request_json, "invalid_field_value", "command.payment.sender.status", "expect type StatusObject, but got str"
+    )
+
+    request_json = set_field(sample_request_json(), {"command.payment.action.amount": "100"})
+    assert_field_error(
+        request_json, "invalid_field_value", "command.payment.action.amount", "expect type int, but got str"
+    )
+
+
+def test_to_json_output_is_same_with_asdict_without_none_values(factory):
+    request = offchain.from_json(json.dumps(sample_request_json()))
+    payment = factory.new_payment_object()
+    payment = dataclasses.replace(
+        payment,
+        sender=offchain.replace_payment_actor(payment.sender, metadata=["hello", "world"]),
+        receiver=offchain.replace_payment_actor(
+            payment.receiver,
+            status=offchain.Status.abort,
+            abort_code=offchain.AbortCode.reject_kyc_data,
+            kyc_data=offchain.entity_kyc_data(legal_entity_name="foo", address=offchain.AddressObject(city="SF")),
+        ),
+    )
+    objects = [
+        request,
+        payment,
+        offchain.new_payment_request(payment),
+        offchain.reply_request(cid="cid"),
+        offchain.reply_request(cid=None, err=offchain.OffChainErrorObject(type="command_error", code="code")),
+        [payment.sender, payment.receiver],
+        {"key": None, "list": [{"a": None, "b": 1}, None], "obj": payment.action},
+        "hello",
+        None,
+    ]
+    for obj in objects:
+        for indent in [None, 2]:
+            assert offchain.to_json(obj, indent=indent) == asdict_to_json(obj, indent=indent)
+
+    assert offchain.to_dict(payment.action) == dataclasses.asdict(payment.action)
+    assert "recipient_signature" not in offchain.to_dict(payment)
+    with pytest.raises(TypeError):
+        offchain.to_json(["hello"])
+
+
+def test_set_json_dumps():
+    obj = offchain.StatusObject(status=offchain.Status.none)
+    try:
+        offchain.set_json_dumps(lambda obj, indent: json.dumps(obj, indent=indent, separators=(",", ":")))
+        assert offchain.to_json(obj) == '{"status":"none"}'
+    finally:
+        offchain.set_json_dumps(None)
+    assert offchain.to_json(obj) == '{"status": "none"}'
+
+
+def test_slotted_payment_objects(factory):
+    payment = factory.new_payment_object()
+    for obj in [payment, payment.sender, payment.sender.status, payment.sender.kyc_data, payment.action]:
+        assert not hasattr(obj, "__dict__")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            obj.foo = "bar"
+
+    assert pickle.loads(pickle.dumps(payment)) == payment
+    assert copy.copy(payment) == payment
+    assert copy.deepcopy(payment) == payment
+    assert hash(copy.deepcopy(payment)) == hash(payment)
+    assert dataclasses.replace(payment.action, amount=1).amount == 1
+    assert offchain.AddressObject().city is None
+
+    command = offchain.PaymentCommand(my_actor_address=payment.sender.address, payment=payment, inbound=False)
+    assert offchain.from_json(offchain.to_json(payment), offchain.PaymentObject) == payment
+    assert pickle.loads(pickle.dumps(command)) == command
+
+
+def test_intern_repeated_strings_of_decoded_objects():
+    request = sample_request_json()
+    payment1 = offchain.from_dict(request, offchain.CommandRequestObject).command.payment
+    payment2 = offchain.from_json(json.dumps(request), offchain.CommandRequestObject).command.payment
+
+    assert payment1.sender.status.status is payment2.sender.status.status
+    assert payment1.action.currency is payment2.action.currency
+    assert payment1.sender.kyc_data.type is payment2.sender.kyc_data.type
+    # account identifiers are not interned
+    assert payment1.sender.address is not payment2.sender.address
+    assert payment1 == payment2
+
+
+def test_decode_concurrently_while_decoders_are_compiled(monkeypatch):
+    request_json = json.dumps(sample_request_json())
+    expected = offchain.from_json(request_json, offchain.CommandRequestObject)
+    switch_interval = sys.getswitchinterval()
+    # switch threads as often as possible, so that a thread runs while the others are compiling decoders
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(20):
+            monkeypatch.setattr(offchain.types, "_DECODERS", {})
+            barrier = threading.Barrier(8)
+
+            def decode() -> offchain.CommandRequestObject:
+                barrier.wait()
+                return offchain.from_json(request_json, offchain.CommandRequestObject)
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = [executor.submit(decode) for _ in range(8)]
+                assert [f.result() for f in futures] == [expected] * 8
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+def asdict_to_json(obj, indent=None) -> str:
+    def delete_none(obj):
+        if isinstance(obj, dict):
+            return {key: delete_none(val) for key, val in obj.items() if val is not None}
+        if isinstance(obj, list):
+            return [delete_none(val) for val in obj]
+        return obj
+
+    if dataclasses.is_dataclass(obj):
+        raw = dataclasses.asdict(obj)
+    elif isinstance(obj, list):
+        raw = list(map(dataclasses.asdict, obj))
+    elif isinstance(obj, dict):
+        raw = {key: dataclasses.asdict(val) if dataclasses.is_dataclass(val) else val for key, val in obj.items()}
+    else:
+        raw = obj
+    return json.dumps(delete_none(raw), indent=indent)
+
+
 def assert_cid(cid: str):
     assert isinstance(cid, str)
     assert uuid.UUID(cid)
@@ -0,0 +1,179 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from diem import bcs, diem_types, jsonrpc, script_decoder, stdlib, utils, LocalAccount
+from diem.serde_types import uint8, uint64, uint128, DeserializationError
+import pytest, threading, typing
+
+
+def test_decode_matches_decode_transaction_script():
+    decoder = script_decoder.ScriptDecoder()
+    for script in scripts():
+        script_hex = script.bcs_serialize().hex()
+        expected = utils.decode_transaction_script(script_hex)
+        assert decoder.decode(script_hex) == expected
+        assert decoder.decode(bytes.fromhex(script_hex)) == expected
+    assert decoder.stats.scripts == len(scripts()) * 2
+
+
+def test_decode_shares_bytecode_and_type_arguments():
+    decoder = script_decoder.ScriptDecoder()
+    s1 = p2p_script("XUS", 1)
+    s2 = p2p_script("XUS", 2)
+    ret1 = decoder.decode(s1.bcs_serialize())
+    ret2 = decoder.decode(s2.bcs_serialize())
+    assert ret1.amount == 1
+    assert ret2.amount == 2
+
+    assert len(decoder._scripts) == 1
+    assert len(decoder._ty_args) == 1
+    # different currency shares bytecode, but not type arguments
+    assert decoder.decode(p2p_script("XDX", 3).bcs_serialize()).currency == utils.currency_code("XDX")
+    assert len(decoder._scripts) == 1
+    assert len(decoder._ty_args) == 2
+
+
+def test_type_arguments_cache_evicts_least_recently_used():
+    decoder = script_decoder.ScriptDecoder(ty_args_cache_size=2)
+    decoder.decode(p2p_script("XUS", 1).bcs_serialize())
+    decoder.decode(p2p_script("XDX", 1).bcs_serialize())
+    decoder.decode(p2p_script("XUS", 1).bcs_serialize())
+    decoder.decode(p2p_script("Coin1", 1).bcs_serialize())
+    assert [bcs.deserialize(k, typing.Sequence[diem_types.TypeTag])[0] for k in decoder._ty_args] == [
+        [utils.currency_code("XUS")],
+        [utils.currency_code("Coin1")],
+    ]
+
+
+def test_decode_all_transaction_argument_types():
+    script = diem_types.Script(
+        code=b"code",
+        ty_args=[diem_types.TypeTag__Vector(value=utils.currency_code("XUS")), diem_types.TypeTag__U8()],
+        args=[
+            diem_types.TransactionArgument__U8(value=uint8(255)),
+            diem_types.TransactionArgument__U64(value=uint64(2**64 - 1)),
+            diem_types.TransactionArgument__U128(value=uint128(2**128 - 1)),
+            diem_types.TransactionArgument__Address(value=LocalAccount.generate().account_address),
+            diem_types.TransactionArgument__U8Vector(value=b"\x01" * 200),
+            diem_types.TransactionArgument__Bool(value=True),
+            diem_types.TransactionArgument__Bool(value=False),
+        ],
+    )
+    decoder = script_decoder.ScriptDecoder(decoders={b"code": lambda s: s})
+    assert decoder.decode(script.bcs_serialize()) == script
+
+
+def test_decode_transactions():
+    txns = [txn(script) for script in scripts()] + [jsonrpc.Transaction()]
+    expected = [utils.decode_transaction_script(t) for t in txns[:-1]] + [None]
+
+    decoder = script_decoder.ScriptDecoder()
+    assert list(decoder.decode_transactions(txns)) == expected
+    assert decoder.stats.transactions == len(txns)
+    assert decoder.stats.scripts == len(txns) - 1
+    assert decoder.stats.transactions_per_second() > 0
+
+
+def test_decode_transactions_by_executor():
+    txns = [txn(script) for script in scripts()] * 3 + [jsonrpc.Transaction()]
+    expected = list(script_decoder.ScriptDecoder().decode_transactions(txns))
+
+    decoder = script_decoder.ScriptDecoder()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert list(decoder.decode_transactions(txns, executor=executor, chunk_size=4)) == expected
+    assert decoder.stats.transactions == len(txns)
+    assert decoder.stats.scripts == len(txns) - 1
+
+
+def test_decode_transactions_by_executor_reads_transactions_lazily():
+    read = []
+
+    def stream() -> typing.Iterator[jsonrpc.Transaction]:
+        for i in range(100):
+            read.append(i)
+            yield txn(p2p_script("XUS", i))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = script_decoder.ScriptDecoder().decode_transactions(stream(), executor=executor, chunk_size=5)
+        assert next(results).amount == 0
+        # 4 chunks are pending (2 * workers) when the first result is yielded
+        assert len(read) == 20
+        assert [r.amount for r in results] == list(range(1, 100))
+    assert len(read) == 100
+
+
+def test_decode_transactions_by_executor_with_custom_decoders():
+    threads = set()
+
+    def decode_amount(script: diem_types.Script) -> int:
+        threads.add(threading.get_ident())
+        return typing.cast(diem_types.TransactionArgument__U64, script.args[1]).value
+
+    code = p2p_script("XUS", 0).code
+    decoder = script_decoder.ScriptDecoder(decoders={code: decode_amount})
+    txns = [txn(p2p_script("XUS", i)) for i in range(20)]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert list(decoder.decode_transactions(txns, executor=executor, chunk_size=2)) == list(range(20))
+    assert threading.get_ident() not in threads
+
+
+def test_decode_unknown_script_bytecode():
+    script = diem_types.Script(code=b"unknown", ty_args=[], args=[])
+    with pytest.raises(ValueError, match="Unknown script bytecode"):
+        script_decoder.ScriptDecoder().decode(script.bcs_serialize())
+
+
+def test_decode_invalid_script_bytes():
+    decoder = script_decoder.ScriptDecoder()
+    data = p2p_script("XUS", 1).bcs_serialize()
+    with pytest.raises(DeserializationError):
+        decoder.decode(data[:-1])
+    with pytest.raises(DeserializationError):
+        decoder.decode(data + b"\x00")
+
+    script = stdlib.encode_update_minting_ability_script(utils.currency_code("XUS"), True).bcs_serialize()
+    assert script[-1] == 1
+    with pytest.raises(DeserializationError):
+        decoder.decode(script[:-1] + b"\x02")
+
+
+def txn(script: diem_types.Script) -> jsonrpc.Transaction:
+    return jsonrpc.Transaction(transaction=jsonrpc.TransactionData(script_bytes=script.bcs_serialize().hex()))
+
+
+def p2p_script(currency: str, amount: int) -> diem_types.Script:
+    return stdlib.encode_peer_to_peer_with_metadata_script(
+        currency=utils.currency_code(currency),
+        payee=LocalAccount.generate().account_address,
+        amount=uint64(amount),
+        metadata=b"metadata",
+        metadata_signature=b"signature" * 20,
+    )
+
+
+def scripts() -> typing.List[diem_types.Script]:
+    account = LocalAccount.generate()
+    return [
+        p2p_script("XUS", 2**64 - 1),
+        p2p_script("XDX", 0),
+        stdlib.encode_rotate_dual_attestation_info_script(
+            new_url=b"http://localhost", new_key=account.compliance_public_key_bytes
+        ),
+        stdlib.encode_create_parent_vasp_account_script(
+            coin_type=utils.currency_code("XUS"),
+            sliding_nonce=uint64(0),
+            new_account_address=account.account_address,
+            auth_key_prefix=account.auth_key.prefix(),
+            human_name=b"vasp",
+            add_all_currencies=False,
+        ),
+        stdlib.encode_update_minting_ability_script(utils.currency_code("XUS"), True),
+        stdlib.encode_create_recovery_address_script(),
+        stdlib.encode_update_exchange_rate_script(
+            currency=utils.currency_code("XDX"),
+            sliding_nonce=uint64(1),
+            new_exchange_rate_numerator=uint64(2),
+            new_exchange_rate_denominator=uint64(3),
+        ),
+    ]
@@ -0,0 +1,181 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import signer, LocalAccount
+from concurrent.futures import ThreadPoolExecutor
+import asyncio, pytest, threading, time, typing
+
+
+class RemoteSigner(signer.Signer):
+    """signs by a local key with latency, records calls and max concurrent calls"""
+
+    def __init__(self, account: LocalAccount, latency_secs: float = 0.01) -> None:
+        self.local = signer.LocalSigner(account.compliance_key)
+        self.latency_secs = latency_secs
+        self.calls: typing.List[typing.List[bytes]] = []
+        self.running = 0
+        self.max_running = 0
+        self.fail = False
+        self.truncate = False
+        self._lock = threading.Lock()
+
+    def public_key_bytes(self) -> bytes:
+        return self.local.public_key_bytes()
+
+    def sign(self, msg: bytes) -> bytes:
+        return self.sign_many([msg])[0]
+
+    def sign_many(self, msgs: typing.Sequence[bytes]) -> typing.List[bytes]:
+        with self._lock:
+            self.calls.append(list(msgs))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.latency_secs)
+        with self._lock:
+            self.running -= 1
+        if self.fail:
+            raise ConnectionError("remote signer is unavailable")
+        sigs = self.local.sign_many(msgs)
+        return sigs[:-1] if self.truncate else sigs
+
+
+def test_local_signer_sign_transactions(factory):
+    account = LocalAccount.generate()
+    local = signer.LocalSigner(account.private_key)
+    assert local.public_key_bytes() == account.public_key_bytes
+    assert local.sign(b"msg") == account.private_key.sign(b"msg")
+
+    txns = [factory.new_raw_transaction(account, i) for i in range(3)]
+    expected = [account.sign(txn) for txn in txns]
+    assert local.sign_transactions(txns) == expected
+    assert local.sign_transactions([txn.bcs_serialize() for txn in txns]) == expected
+    assert local.sign_transaction(txns[0]) == expected[0]
+
+
+def test_pooled_signer_signs_batches_concurrently():
+    account = LocalAccount.generate()
+    remote = RemoteSigner(account)
+    pooled = signer.PooledSigner(remote, max_concurrency=3, batch_size=10)
+    msgs = [b"msg %d" % i for i in range(100)]
+    try:
+        assert pooled.sign_many(msgs) == [account.compliance_key.sign(msg) for msg in msgs]
+        assert len(remote.calls) == 10
+        assert remote.max_running == 3
+        assert pooled.public_key_bytes() == account.compliance_public_key_bytes
+    finally:
+        pooled.shutdown()
+
+
+def test_pooled_signer_coalesces_requests_of_same_message():
+    account = LocalAccount.generate()
+    remote = RemoteSigner(account, latency_secs=0.05)
+    pooled = signer.PooledSigner(remote)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            sigs = list(executor.map(lambda _: pooled.sign(b"msg"), range(8)))
+        assert sigs == [account.compliance_key.sign(b"msg")] * 8
+        assert len(remote.calls) < 8
+        assert pooled.sign_many([b"a", b"b", b"a"]) == [account.compliance_key.sign(m) for m in [b"a", b"b", b"a"]]
+        assert remote.calls[-1] == [b"a", b"b"]
+    finally:
+        pooled.shutdown()
+
+
+def test_pooled_signer_raises_error_of_wrapped_signer():
+    remote = RemoteSigner(LocalAccount.generate())
+    remote.fail = True
+    pooled = signer.PooledSigner(remote)
+    with pytest.raises(ConnectionError):
+        pooled.sign(b"msg")
+    remote.fail = False
+    assert pooled.sign(b"msg")
+
+    pooled.shutdown()
+    with pytest.raises(RuntimeError):
+        pooled.sign(b"msg")
+
+
+def test_pooled_signer_fails_all_messages_when_signatures_mismatched():
+    account = LocalAccount.generate()
+    remote = RemoteSigner(account)
+    remote.truncate = True
+    pooled = signer.PooledSigner(remote)
+    try:
+        for future in pooled.submit_many([b"a", b"b", b"c"]):
+            with pytest.raises(ValueError, match="expect 3 signatures, but got 2"):
+                future.result(timeout=5)
+        remote.truncate = False
+        assert pooled.sign_many([b"a", b"b"]) == [account.compliance_key.sign(m) for m in [b"a", b"b"]]
+    finally:
+        pooled.shutdown()
+
+
+def test_pooled_signer_resolves_other_futures_when_one_is_cancelled():
+    account = LocalAccount.generate()
+    pooled = signer.PooledSigner(RemoteSigner(account, latency_secs=0.05))
+    try:
+        futures = pooled.submit_many([b"a", b"b", b"c"])
+        assert futures[1].cancel()
+        assert futures[0].result(timeout=5) == account.compliance_key.sign(b"a")
+        assert futures[2].result(timeout=5) == account.compliance_key.sign(b"c")
+        assert pooled.sign(b"b") == account.compliance_key.sign(b"b")
+    finally:
+        pooled.shutdown()
+
+
+def test_pooled_async_signer():
+    account = LocalAccount.generate()
+    remote = RemoteSigner(account)
+    pooled = signer.PooledAsyncSigner(signer.ExecutorAsyncSigner(remote), max_concurrency=2, batch_size=5)
+    msgs = [b"msg %d" % (i % 20) for i in range(40)]
+
+    async def sign():
+        return await asyncio.gather(pooled.sign_many(msgs), pooled.sign(b"msg 1"), pooled.sign(b"other"))
+
+    sigs, sig1, other = asyncio.run(sign())
+    assert sigs == [account.compliance_key.sign(msg) for msg in msgs]
+    assert sig1 == sigs[1]
+    assert other == account.compliance_key.sign(b"other")
+    assert sorted(len(call) for call in remote.calls) == [1, 5, 5, 5, 5]
+    assert remote.max_running <= 2
+
+    remote.fail = True
+    pooled = signer.PooledAsyncSigner(signer.ExecutorAsyncSigner(remote))
+    with pytest.raises(ConnectionError):
+        asyncio.run(pooled.sign(b"new"))
+
+
+def test_async_signer_sign_transactions(factory):
+    account = LocalAccount.generate()
+    async_signer = signer.ExecutorAsyncSigner(signer.LocalSigner(account.private_key))
+    txns = [factory.new_raw_transaction(account, i) for i in range(3)]
+    assert asyncio.run(async_signer.sign_transactions(txns)) == [account.sign(txn) for txn in txns]
+
+
+def test_pooled_async_signer_resolves_futures_when_batch_failed_or_cancelled():
+    remote = RemoteSigner(LocalAccount.generate())
+    remote.truncate = True
+    pooled = signer.PooledAsyncSigner(signer.ExecutorAsyncSigner(remote))
+    with pytest.raises(ValueError, match="expect 2 signatures, but got 1"):
+        asyncio.run(pooled.sign_many([b"a", b"b"]))
+    assert pooled._signing == {}
+
+    class BlockedSigner(signer.AsyncSigner):
+        def public_key_bytes(self) -> bytes:
+            return b""
+
+        async def sign(self, msg: bytes) -> bytes:
+            await asyncio.Event().wait()
+            return b""
+
+    async def cancel_signing() -> None:
+        pooled = signer.PooledAsyncSigner(BlockedSigner())
+        sign = asyncio.ensure_future(pooled.sign(b"msg"))
+        await asyncio.sleep(0.01)
+        for task in list(pooled._tasks):
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(sign, 1)
+        assert pooled._signing == {}
+
+    asyncio.run(cancel_signing())
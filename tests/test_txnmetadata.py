@@ -2,7 +2,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import pytest
-from diem import utils, txnmetadata, jsonrpc, diem_types
+from diem import utils, txnmetadata, jsonrpc, diem_types, serde_types
 
 
 def test_travel_rule_metadata():
@@ -16,6 +16,22 @@ def test_travel_rule_metadata():
     )
 
 
+def test_travel_rule_metadata_is_same_with_bcs_serialized_attest():
+    address = utils.account_address("f72589b71ff4f8d139674a3f7369c69b")
+    for reference_id, amount in [("", 0), ("参考" * 100, (1 << 64) - 1), (None, 1)]:
+        metadata = diem_types.Metadata__TravelRuleMetadata(
+            value=diem_types.TravelRuleMetadata__TravelRuleMetadataVersion0(
+                value=diem_types.TravelRuleMetadataV0(off_chain_reference_id=reference_id)
+            )
+        )
+        attest = txnmetadata.Attest(metadata=metadata, sender_address=address, amount=serde_types.uint64(amount))
+        expected = (metadata.bcs_serialize(), attest.bcs_serialize() + b"@@$$DIEM_ATTEST$$@@")
+        assert txnmetadata.travel_rule(reference_id, address, amount) == expected
+
+    with pytest.raises(OverflowError):
+        txnmetadata.travel_rule("id", address, -1)
+
+
 def test_new_general_metadata_for_nones():
     ret = txnmetadata.general_metadata(None, None)
     assert ret == b""
@@ -0,0 +1,106 @@
+# Copyright (c) The Diem Core Contributors
+# SPDX-License-Identifier: Apache-2.0
+
+from diem import diem_types, stdlib, txnmetadata, txnpayload, utils, InvalidAccountAddressError, LocalAccount
+from diem.serde_types import uint64
+import random, secrets, pytest
+
+CURRENCIES = ["XUS", "XDX", "Coin1", "LongCurrencyCodeName"]
+# metadata lengths cover 1, 2 and 3 bytes uleb128 encoding
+BYTES_LENGTHS = [0, 1, 64, 127, 128, 300, 16383, 16384]
+
+
+def test_peer_to_peer_with_metadata_payload_matches_generic_encoder():
+    rand = random.Random(42)
+    for _ in range(200):
+        currency = rand.choice(CURRENCIES)
+        payee = secrets.token_bytes(16)
+        amount = rand.choice([0, 1, 2**63, 2**64 - 1, rand.randrange(2**64)])
+        metadata = secrets.token_bytes(rand.choice(BYTES_LENGTHS))
+        signature = secrets.token_bytes(rand.choice(BYTES_LENGTHS))
+
+        expected = generic_payload(currency, payee, amount, metadata, signature)
+        assert txnpayload.peer_to_peer_with_metadata_payload(currency, payee, amount, metadata, signature) == expected
+        assert (
+            txnpayload.peer_to_peer_with_metadata_payload(
+                currency, utils.account_address(payee), amount, metadata, signature
+            )
+            == expected
+        )
+        assert (
+            txnpayload.peer_to_peer_with_metadata_payload(currency, payee.hex(), amount, metadata, signature)
+            == expected
+        )
+
+
+def test_peer_to_peer_with_metadata_payload_with_travel_rule_metadata():
+    sender = LocalAccount.generate()
+    receiver = LocalAccount.generate()
+    metadata, sig_msg = txnmetadata.travel_rule("ref-id", sender.account_address, 1_000)
+    signature = receiver.compliance_key.sign(sig_msg)
+
+    payload = txnpayload.peer_to_peer_with_metadata_payload("XUS", receiver.account_address, 1_000, metadata, signature)
+    assert payload == generic_payload("XUS", receiver.account_address.to_bytes(), 1_000, metadata, signature)
+
+    script_call = stdlib.decode_script(diem_types.TransactionPayload.bcs_deserialize(payload).value)
+    assert script_call.payee == receiver.account_address
+    assert script_call.metadata == metadata
+    assert script_call.metadata_signature == signature
+
+
+def test_raw_transaction_bytes_matches_generic_encoder():
+    rand = random.Random(7)
+    for _ in range(100):
+        sender = secrets.token_bytes(16)
+        payload = txnpayload.peer_to_peer_with_metadata_payload(
+            rand.choice(CURRENCIES), secrets.token_bytes(16), rand.randrange(2**64)
+        )
+        seq = rand.randrange(2**64)
+        max_gas = rand.randrange(2**64)
+        gas_price = rand.randrange(2**64)
+        gas_currency = rand.choice(CURRENCIES)
+        expiration = rand.randrange(2**64)
+        chain_id = rand.randrange(256)
+
+        expected = diem_types.RawTransaction(  # pyre-ignore
+            sender=utils.account_address(sender),
+            sequence_number=uint64(seq),
+            payload=diem_types.TransactionPayload.bcs_deserialize(payload),
+            max_gas_amount=uint64(max_gas),
+            gas_unit_price=uint64(gas_price),
+            gas_currency_code=gas_currency,
+            expiration_timestamp_secs=uint64(expiration),
+            chain_id=diem_types.ChainId.from_int(chain_id),
+        ).bcs_serialize()
+
+        args = [payload, max_gas, gas_price, gas_currency, expiration]
+        assert txnpayload.raw_transaction_bytes(sender, seq, *args, chain_id) == expected
+        assert txnpayload.raw_transaction_bytes(sender, seq, *args, diem_types.ChainId.from_int(chain_id)) == expected
+
+
+def test_signed_raw_transaction_bytes():
+    account = LocalAccount.generate()
+    payload = txnpayload.peer_to_peer_with_metadata_payload("XUS", LocalAccount.generate().account_address, 10)
+    txn = txnpayload.raw_transaction_bytes(account.account_address, 0, payload, 1_000_000, 0, "XUS", 1611792876, 2)
+
+    signed_txn = account.sign_many([txn])[0]
+    assert signed_txn == account.sign(diem_types.RawTransaction.bcs_deserialize(txn))
+
+
+def test_invalid_address():
+    with pytest.raises(InvalidAccountAddressError):
+        txnpayload.peer_to_peer_with_metadata_payload("XUS", b"\x00", 10)
+    with pytest.raises(InvalidAccountAddressError):
+        txnpayload.peer_to_peer_with_metadata_payload("XUS", "aaaa", 10)
+
+
+def generic_payload(currency: str, payee: bytes, amount: int, metadata: bytes, metadata_signature: bytes) -> bytes:
+    return diem_types.TransactionPayload__Script(
+        value=stdlib.encode_peer_to_peer_with_metadata_script(
+            currency=utils.currency_code(currency),
+            payee=utils.account_address(payee),
+            amount=uint64(amount),
+            metadata=metadata,
+            metadata_signature=metadata_signature,
+        )
+    ).bcs_serialize()
@@ -2,7 +2,8 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
-from diem import diem_types, utils, InvalidAccountAddressError, InvalidSubAddressError, jsonrpc
+from diem import diem_types, utils, InvalidAccountAddressError, InvalidSubAddressError, jsonrpc, LocalAccount
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
@@ -83,3 +84,40 @@ def test_balance():
     assert utils.balance(account, "XUS") == 32
     assert utils.balance(account, "XDX") == 33
     assert utils.balance(account, "unknown") == 0
+
+
+def test_signed_transaction_bytes(factory):
+    account = LocalAccount.generate()
+    txn = factory.new_raw_transaction(account, 12)
+    signature = account.private_key.sign(utils.raw_transaction_signing_msg(txn))
+    expected = utils.create_signed_transaction(txn, account.public_key_bytes, signature).bcs_serialize()
+    assert utils.signed_transaction_bytes(txn.bcs_serialize(), account.public_key_bytes, signature) == expected
+
+
+def test_ed25519_public_key_from_hex():
+    account = LocalAccount.generate()
+    key_hex = account.compliance_public_key_bytes.hex()
+    key = utils.ed25519_public_key_from_hex(key_hex)
+    assert utils.public_key_bytes(key) == account.compliance_public_key_bytes
+    assert utils.ed25519_public_key_from_hex(key_hex) is key
+
+    with pytest.raises(ValueError):
+        utils.ed25519_public_key_from_hex("invalid")
+
+
+def test_verify_signatures():
+    accounts = [LocalAccount.generate() for _ in range(3)]
+    triples = []
+    for i, account in enumerate(accounts):
+        msg = b"msg %d" % i
+        sig = account.compliance_key.sign(msg)
+        triples.append((account.compliance_key.public_key(), msg, sig))
+        triples.append((account.compliance_public_key_bytes, msg, sig))
+        triples.append((account.compliance_public_key_bytes, b"other", sig))
+    triples.append((b"invalid", b"msg", b"sig"))
+    expected = [True, True, False] * len(accounts) + [False]
+
+    assert utils.verify_signatures(triples) == expected
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert utils.verify_signatures(triples, executor=executor, chunk_size=2) == expected
+    assert utils.verify_signatures([]) == []